@@ -1,5 +1,68 @@
-from sdm_modbus_modified.meter import *
-from sdm_modbus_modified.sdm import *
-from sdm_modbus_modified.garo import *
-from sdm_modbus_modified.espp1 import *
-from sdm_modbus_modified.taiyedq import *
\ No newline at end of file
+import importlib
+
+from sdm_modbus_modified import registry
+
+# Public names of the package and the module defining them, imported on first access.
+_EXPORTS = {
+    "Meter": "meter",
+    "connectionType": "meter",
+    "registerType": "meter",
+    "registerDataType": "meter",
+    "RETRIES": "meter",
+    "TIMEOUT": "meter",
+    "UNIT": "meter",
+    "Endian": "meter",
+    "SDM": "sdm",
+    "SDM72V2": "sdm",
+    "SDM72": "sdm",
+    "SDM120": "sdm",
+    "SDM230": "sdm",
+    "SDM630": "sdm",
+    "SDM54_2T": "sdm",
+    "GARO": "garo",
+    "GNM3D": "garo",
+    "ESPP1": "espp1",
+    "TAC4300_CT": "taiyedq",
+    "WS100": "ws100",
+    "WS100_19XX": "ws100",
+}
+
+# Names the package used to star-import along with the models, kept for code relying on them.
+_COMPAT = {
+    "ModbusTcpClient": "pymodbus.client",
+    "ModbusUdpClient": "pymodbus.client",
+    "ModbusSerialClient": "pymodbus.client",
+    "BinaryPayloadBuilder": "pymodbus.payload",
+    "ReadInputRegistersResponse": "pymodbus.pdu.register_message",
+    "ReadHoldingRegistersResponse": "pymodbus.pdu.register_message",
+}
+
+_SUBMODULES = ("meter", "sdm", "garo", "espp1", "taiyedq", "ws100")
+
+__all__ = list(_EXPORTS) + list(_COMPAT)
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        return importlib.import_module(f"{__name__}.{name}")
+
+    if name in _EXPORTS:
+        module = importlib.import_module(f"{__name__}.{_EXPORTS[name]}")
+    elif name in _COMPAT:
+        module = importlib.import_module(_COMPAT[name])
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = globals()[name] = getattr(module, name)
+
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS) | set(_COMPAT) | set(_SUBMODULES))
+
+
+def model(name):
+    """Returns the Meter class registered under `name`, e.g. model("WS100-19"), see registry."""
+
+    return registry.get(name)
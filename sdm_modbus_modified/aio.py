@@ -0,0 +1,407 @@
+import asyncio
+import time
+import weakref
+
+import pymodbus.exceptions
+
+from sdm_modbus_modified import meter
+from sdm_modbus_modified import metrics
+from sdm_modbus_modified import stream
+from sdm_modbus_modified import vector
+from sdm_modbus_modified import sdm
+from sdm_modbus_modified import garo
+from sdm_modbus_modified import espp1
+from sdm_modbus_modified import taiyedq
+from sdm_modbus_modified import ws100
+
+# One lock per async client, held from Policy.prepare() until the response so
+# meters sharing the client through parent= cannot swap its timeout meanwhile.
+_locks = weakref.WeakKeyDictionary()
+
+
+def _lock(client):
+    lock = _locks.get(client)
+
+    if lock is None:
+        lock = _locks[client] = asyncio.Lock()
+
+    return lock
+
+
+class AsyncMeter(meter.Meter):
+    """asyncio variant of Meter, built on the pymodbus AsyncModbus*Client classes.
+
+    Does not connect on construction: await connect() or use `async with`.
+    Combine it with a model through `asynchronous()`. Async clients are never
+    taken from the connection pool.
+    """
+
+    shared = False
+
+    def __init__(self, **kwargs):
+        self._configure(**kwargs)
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *args):
+        self.disconnect()
+
+    def _create_client(self, **client_args):
+        from pymodbus.client import AsyncModbusTcpClient, AsyncModbusUdpClient, AsyncModbusSerialClient
+
+        if self.mode is meter.connectionType.RTU:
+            return AsyncModbusSerialClient(
+                port=self.device,
+                stopbits=self.stopbits,
+                parity=self.parity,
+                baudrate=self.baud,
+                timeout=self.timeout,
+                **client_args
+            )
+        elif self.mode is meter.connectionType.UDP:
+            return AsyncModbusUdpClient(
+                host=self.host,
+                port=self.port,
+                timeout=self.timeout,
+                **client_args
+            )
+        elif self.mode is meter.connectionType.TCP:
+            return AsyncModbusTcpClient(
+                host=self.host,
+                port=self.port,
+                timeout=self.timeout,
+                **client_args
+            )
+        else:
+            raise NotImplementedError(self.mode)
+
+    async def _read_registers(self, read, function, address, length):
+        if self.policy is not None:
+            return await self._read_adaptive(read, function, address, length)
+
+        stats = self.metrics
+
+        for attempt in range(self.retries):
+            if not self.connected():
+                if stats is not None:
+                    stats.reconnect(self.unit, function)
+
+                await self.connect()
+                await asyncio.sleep(0.1)
+                continue
+
+            if stats is None:
+                result = await read(address=address, count=length, slave=self.unit)
+            else:
+                if attempt:
+                    stats.retry(self.unit, function)
+
+                result = await self._timed(read, function, length, address=address, count=length, slave=self.unit)
+
+            if result is None or result.isError():
+                continue
+            if not hasattr(result, "registers") or len(result.registers) != length:
+                continue
+
+            return result.registers
+
+        return None
+
+    async def _read_adaptive(self, read, function, address, length):
+        adaptive = self.policy
+        stats = self.metrics
+        unit = self.unit
+        key = (meter.bus_key(self), unit)
+        error = None
+
+        adaptive.allow(key)
+
+        for attempt in range(adaptive.attempts(key)):
+            if not self.connected():
+                if stats is not None:
+                    stats.reconnect(unit, function)
+
+                if not await self.connect():
+                    adaptive.failure(key)
+                    break
+
+            if attempt and stats is not None:
+                stats.retry(unit, function)
+
+            async with _lock(self.client):
+                saved = adaptive.prepare(self.client, key)
+                start = time.perf_counter()
+
+                try:
+                    if stats is None:
+                        result = await read(address=address, count=length, slave=unit)
+                    else:
+                        result = await self._timed(read, function, length, address=address, count=length, slave=unit)
+                except pymodbus.exceptions.ModbusIOException as e:
+                    adaptive.failure(key)
+                    error = e
+                    continue
+                finally:
+                    adaptive.restore(self.client, saved)
+
+            if result is None:
+                adaptive.failure(key)
+                continue
+
+            adaptive.success(key, time.perf_counter() - start)
+
+            if result.isError():
+                continue
+            if not hasattr(result, "registers") or len(result.registers) != length:
+                continue
+
+            return result.registers
+
+        if error is not None:
+            raise error
+
+        return None
+
+    async def _timed(self, request, function, length, **kwargs):
+        start = time.perf_counter()
+
+        try:
+            result = await request(**kwargs)
+        except pymodbus.exceptions.ModbusIOException:
+            self.metrics.request(self.unit, function, time.perf_counter() - start, "timeout")
+            raise
+        except Exception:
+            self.metrics.request(self.unit, function, time.perf_counter() - start, "error")
+            raise
+
+        self.metrics.request(self.unit, function, time.perf_counter() - start, meter._outcome(result, length))
+
+        return result
+
+    async def _read_input_registers(self, address, length):
+        return await self._read_registers(self.client.read_input_registers, metrics.READ_INPUT, address, length)
+
+    async def _read_holding_registers(self, address, length):
+        return await self._read_registers(self.client.read_holding_registers, metrics.READ_HOLDING, address, length)
+
+    async def _write_holding_register(self, address, value):
+        if self.metrics is None:
+            return await self.client.write_registers(address=address, values=value, slave=self.unit)
+
+        return await self._timed(self.client.write_registers, metrics.WRITE_MULTIPLE, None,
+                                 address=address, values=value, slave=self.unit)
+
+    async def _read(self, field):
+        if field.rtype == meter.registerType.INPUT:
+            data = await self._read_input_registers(field.address, field.length)
+        elif field.rtype == meter.registerType.HOLDING:
+            data = await self._read_holding_registers(field.address, field.length)
+        else:
+            raise NotImplementedError(field.rtype)
+
+        return self._decode_value(data, field.length, field.dtype, field.vtype)
+
+    async def _read_block(self, block):
+        if block.rtype == meter.registerType.INPUT:
+            data = await self._read_input_registers(block.address, block.count)
+        elif block.rtype == meter.registerType.HOLDING:
+            data = await self._read_holding_registers(block.address, block.count)
+        else:
+            raise NotImplementedError(block.rtype)
+
+        if data and self.metrics is not None:
+            self.metrics.block(self.unit, meter._function(block.rtype), block.count, block.used)
+
+        return data
+
+    async def _read_all(self, block, scaling=False):
+        data = await self._read_block(block)
+
+        if not data:
+            return {}
+
+        return block.decode(data, scaling, self.normalise)
+
+    async def _write(self, field, data):
+        if field.rtype == meter.registerType.HOLDING:
+            return await self._write_holding_register(field.address, self._encode_value(data, field.dtype, field.length))
+        else:
+            raise NotImplementedError(field.rtype)
+
+    async def connect(self):
+        return await self.client.connect()
+
+    def connected(self):
+        return self.client.connected
+
+    async def read(self, key, scaling=False):
+        register_map = self.register_map
+
+        if key not in register_map:
+            raise KeyError(key)
+
+        field = register_map[key]
+        factor = self._factor(field)
+
+        if scaling and factor is not None:
+            return await self._read(field) * factor
+        else:
+            return await self._read(field)
+
+    async def write(self, key, data):
+        register_map = self.register_map
+
+        if key not in register_map:
+            raise KeyError(key)
+
+        field = register_map[key]
+        factor = self._factor(field)
+
+        return await self._write(field, data if factor is None else data / factor)
+
+    async def write_many(self, settings, verify=True):
+        words = self._encode_settings(settings)
+        results = {}
+
+        for block in self._write_plan(words):
+            try:
+                response = await self._write_holding_register(block.address, [w for key in block.keys for w in words[key]])
+                written = response is not None and not response.isError()
+            except pymodbus.exceptions.ModbusIOException:
+                written = False
+
+            results.update(dict.fromkeys(block.keys, written))
+
+        if verify:
+            results.update(await self._verify(words, [key for key, written in results.items() if written]))
+
+        return results
+
+    async def _verify(self, words, keys):
+        results = dict.fromkeys(keys, False)
+
+        if not keys:
+            return results
+
+        for block in self.register_map.plan(meter.registerType.HOLDING, self.max_registers, self.max_gap, keys):
+            try:
+                data = await self._read_holding_registers(block.address, block.count)
+            except pymodbus.exceptions.ModbusIOException:
+                continue
+
+            if not data:
+                continue
+
+            for key, offset, _ in block.fields:
+                results[key] = list(data[offset:offset + len(words[key])]) == words[key]
+
+        return results
+
+    async def read_all(self, rtype=meter.registerType.INPUT, scaling=False):
+        register_map = self.register_map
+        results = {}
+
+        for block in register_map.plan(rtype, self.max_registers, self.max_gap):
+            results.update(await self._read_all(block, scaling))
+
+        return results
+
+    async def read_record(self, rtype=meter.registerType.INPUT, scaling=False):
+        results = await self.read_all(rtype, scaling)
+
+        return results, vector.records([results], self.register_map.rtypes[rtype])[0]
+
+    async def read_many(self, keys, scaling=False):
+        register_map = self.register_map
+        keys = frozenset(keys)
+
+        for key in keys:
+            if key not in register_map:
+                raise KeyError(key)
+
+        results = {}
+
+        for rtype in register_map.rtypes:
+            for block in register_map.plan(rtype, self.max_registers, self.max_gap, keys):
+                results.update(await self._read_all(block, scaling))
+
+        return results
+
+    async def stream(self, keys=None, interval=1.0, rtype=meter.registerType.INPUT, scaling=False, samples=None):
+        """Async generator yielding a stream.Sample every `interval` seconds, see stream.stream."""
+
+        keys = None if keys is None else frozenset(keys)
+        sequence = 0
+
+        async for missed in stream._ticks_async(interval, samples):
+            timestamp = time.time()
+
+            try:
+                if keys is None:
+                    values = await self.read_all(rtype, scaling=scaling)
+                else:
+                    values = await self.read_many(keys, scaling=scaling)
+                error = None
+            except Exception as e:
+                values = None
+                error = e
+
+            yield stream.Sample(timestamp, self.unit, self.model, sequence, missed, values, error)
+            sequence += 1
+
+
+_models = {}
+
+
+def asynchronous(model):
+    """Returns the AsyncMeter subclass for a Meter model class, e.g. asynchronous(sdm.SDM630)."""
+
+    try:
+        return _models[model]
+    except KeyError:
+        pass
+
+    if issubclass(model, AsyncMeter):
+        return model
+
+    cls = _models[model] = type(f"Async{model.__name__}", (AsyncMeter, model), {"__module__": __name__})
+
+    return cls
+
+
+AsyncSDM72V2 = asynchronous(sdm.SDM72V2)
+AsyncSDM72 = asynchronous(sdm.SDM72)
+AsyncSDM120 = asynchronous(sdm.SDM120)
+AsyncSDM230 = asynchronous(sdm.SDM230)
+AsyncSDM630 = asynchronous(sdm.SDM630)
+AsyncSDM54_2T = asynchronous(sdm.SDM54_2T)
+AsyncGNM3D = asynchronous(garo.GNM3D)
+AsyncESPP1 = asynchronous(espp1.ESPP1)
+AsyncTAC4300_CT = asynchronous(taiyedq.TAC4300_CT)
+
+
+class AsyncWS100_19XX(AsyncMeter, ws100.WS100_19XX):
+
+    async def read_scaled(self, key):
+        """Reads a register and scales the data"""
+        if key not in self.register_map:
+            raise KeyError(key)
+
+        field = self.register_map[key]
+        return ws100.scaled(field, await self._read(field))
+
+    async def read_all_scaled(self):
+        """Reads all registers with their scales, one block read per planned block"""
+        result = {}
+        for block in ws100.planned_blocks(self):
+            try:
+                values = await self._read_all(block, scaling=True)
+            except pymodbus.exceptions.ModbusIOException:
+                values = {}
+            ws100.merge_scaled(result, block, values)
+        return result
+
+
+_models[ws100.WS100_19XX] = AsyncWS100_19XX
@@ -0,0 +1,172 @@
+import threading
+
+from sdm_modbus_modified import meter
+from sdm_modbus_modified import pool
+
+
+class Bus:
+    """One serial port or TCP gateway, shared by meters of any model at different unit ids.
+
+    Takes the connection keyword arguments of a Meter and opens one client; meters
+    added are created with parent= on it. See poller.Poller for many buses.
+    """
+
+    def __init__(self, devices=None, **kwargs):
+        self.root = meter.Meter(**kwargs)
+        self.meters = {}
+        self.errors = {}
+        self._lock = self.root.client.lock if isinstance(self.root.client, pool.SharedClient) else threading.RLock()
+
+        for unit, model in (devices or {}).items():
+            self.add(unit, model)
+
+    def __repr__(self):
+        return f"Bus({self.root}, units={list(self.meters)})"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __getitem__(self, unit):
+        return self.meters[unit]
+
+    def __contains__(self, unit):
+        return unit in self.meters
+
+    def __iter__(self):
+        return iter(self.meters)
+
+    def __len__(self):
+        return len(self.meters)
+
+    def add(self, unit, model, **kwargs):
+        """Adds a meter of class `model` at `unit`, replacing any meter at that id, and returns it."""
+
+        if unit in self.meters:
+            self.remove(unit)
+
+        device = self.meters[unit] = model(parent=self.root, unit=unit, **kwargs)
+
+        return device
+
+    def remove(self, unit):
+        device = self.meters.pop(unit)
+        self.errors.pop(unit, None)
+
+        if isinstance(device.client, pool.SharedClient):
+            device.client.close()
+
+    def detect(self, units, detector=None, refresh=False):
+        """Fingerprints `units` with a detect.Detector and adds a meter for every one identified."""
+
+        from sdm_modbus_modified import detect
+
+        if detector is None:
+            detector = detect.Detector()
+
+        detections = detector.detect_bus(self.root, units, refresh)
+
+        for unit, detection in detections.items():
+            if detection.model is not None:
+                self.add(unit, detection.model)
+
+        return detections
+
+    def read_all(self, rtype=meter.registerType.INPUT, scaling=False):
+        """Reads every unit once, returns {unit: read_all results, or None if the unit failed}.
+
+        The exception raised by each failed unit is kept in `errors`.
+        """
+
+        results = {}
+
+        with self._lock:
+            if not self.root.connected():
+                self.root.connect()
+
+            for unit, device in self.meters.items():
+                try:
+                    results[unit] = device.read_all(rtype, scaling)
+                except Exception as e:
+                    self.errors[unit] = e
+                    results[unit] = None
+                else:
+                    self.errors.pop(unit, None)
+
+        return results
+
+    def collect(self, rtypes=(meter.registerType.INPUT,)):
+        """Reads every unit once without decoding, returns {unit: [pipeline.RawReading], or None if the unit failed}."""
+
+        from sdm_modbus_modified import pipeline
+
+        results = {}
+
+        with self._lock:
+            if not self.root.connected():
+                self.root.connect()
+
+            for unit, device in self.meters.items():
+                try:
+                    results[unit] = pipeline.collect(device, rtypes)
+                except Exception as e:
+                    self.errors[unit] = e
+                    results[unit] = None
+                else:
+                    self.errors.pop(unit, None)
+
+        return results
+
+    def read_many(self, keys, scaling=False):
+        """Reads `keys` from every unit that has them, see Meter.read_many."""
+
+        results = {}
+
+        with self._lock:
+            if not self.root.connected():
+                self.root.connect()
+
+            for unit, device in self.meters.items():
+                register_map = device.register_map
+                unit_keys = [key for key in keys if key in register_map]
+
+                try:
+                    results[unit] = device.read_many(unit_keys, scaling)
+                except Exception as e:
+                    self.errors[unit] = e
+                    results[unit] = None
+                else:
+                    self.errors.pop(unit, None)
+
+        return results
+
+    def write_many(self, settings, units=None, verify=True):
+        """Writes the same holding-register settings to `units` (default: every unit), see Meter.write_many.
+
+        Returns {unit: {key: verified} or None if the unit failed}.
+        """
+
+        results = {}
+
+        with self._lock:
+            if not self.root.connected():
+                self.root.connect()
+
+            for unit in (self.meters if units is None else units):
+                try:
+                    results[unit] = self.meters[unit].write_many(settings, verify)
+                except Exception as e:
+                    self.errors[unit] = e
+                    results[unit] = None
+                else:
+                    self.errors.pop(unit, None)
+
+        return results
+
+    def close(self):
+        for unit in list(self.meters):
+            self.remove(unit)
+
+        self.root.disconnect()
@@ -0,0 +1,257 @@
+import inspect
+import struct
+import time
+
+from pymodbus.exceptions import ModbusIOException
+
+from sdm_modbus_modified.metrics import READ_HOLDING, READ_INPUT
+
+MAGIC = b"SDMR"
+VERSION = 1
+
+_file_header = struct.Struct("<4sH")
+_record = struct.Struct("<dBBHHB")
+
+
+class Record:
+    """One captured read: `registers` is None when the read failed or timed out."""
+
+    __slots__ = ("timestamp", "unit", "function", "address", "count", "registers")
+
+    def __init__(self, timestamp, unit, function, address, count, registers):
+        self.timestamp = timestamp
+        self.unit = unit
+        self.function = function
+        self.address = address
+        self.count = count
+        self.registers = registers
+
+    def __repr__(self):
+        return f"Record(t={self.timestamp:.3f}, unit={self.unit}, function={self.function}, address={hex(self.address)}, count={self.count})"
+
+
+class Capture:
+    """Binary log of raw register blocks.
+
+    After a magic and version, each read is a little-endian header (timestamp,
+    unit, function, address, count, status) followed by the words if it succeeded.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "ab")
+        self.records = 0
+
+        if self.file.tell() == 0:
+            self.file.write(_file_header.pack(MAGIC, VERSION))
+
+    def __repr__(self):
+        return f"Capture({self.path}, records={self.records})"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def write(self, unit, function, address, count, registers, timestamp=None):
+        if timestamp is None:
+            timestamp = time.time()
+
+        if registers is None:
+            self.file.write(_record.pack(timestamp, unit, function, address, count, 1))
+        else:
+            self.file.write(_record.pack(timestamp, unit, function, address, count, 0))
+            self.file.write(struct.pack(f"<{count}H", *registers))
+
+        self.records += 1
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class CaptureClient:
+    """Wraps a sync or async pymodbus client and logs every register read to a Capture.
+
+    Reads that raise ModbusIOException are logged as failed and re-raised.
+    """
+
+    def __init__(self, client, capture):
+        self.client = client
+        self.capture = capture
+
+    def __repr__(self):
+        return f"CaptureClient({self.client}, {self.capture})"
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def _log(self, function, address, count, slave, response):
+        if response is None or response.isError() or len(getattr(response, "registers", ())) != count:
+            registers = None
+        else:
+            registers = response.registers
+
+        self.capture.write(slave, function, address, count, registers)
+
+        return response
+
+    async def _log_async(self, function, address, count, slave, response):
+        try:
+            response = await response
+        except ModbusIOException:
+            self._log(function, address, count, slave, None)
+            raise
+
+        return self._log(function, address, count, slave, response)
+
+    def _read(self, function, method, address, count, slave, **kwargs):
+        try:
+            response = method(address=address, count=count, slave=slave, **kwargs)
+        except ModbusIOException:
+            self._log(function, address, count, slave, None)
+            raise
+
+        if inspect.isawaitable(response):
+            return self._log_async(function, address, count, slave, response)
+
+        return self._log(function, address, count, slave, response)
+
+    def read_input_registers(self, address, count=1, slave=1, **kwargs):
+        return self._read(READ_INPUT, self.client.read_input_registers, address, count, slave, **kwargs)
+
+    def read_holding_registers(self, address, count=1, slave=1, **kwargs):
+        return self._read(READ_HOLDING, self.client.read_holding_registers, address, count, slave, **kwargs)
+
+
+class Response:
+    """Minimal stand-in for a pymodbus read response."""
+
+    __slots__ = ("registers", "error")
+
+    def __init__(self, registers, error=False):
+        self.registers = registers
+        self.error = error
+
+    def isError(self):
+        return self.error
+
+
+class ReplayClient:
+    """Serves captured register blocks to a synchronous Meter in place of a pymodbus client.
+
+    Reads get the next capture of the same request, or are assembled from the last
+    captured value of each register. Use it as client=, e.g.
+    sdm.SDM630(host="replay", client=ReplayClient("bus.cap")).
+    """
+
+    def __init__(self, path, loop=True):
+        self.path = path
+        self.loop = loop
+        self.blocks = {}
+        self.images = {}
+        self.cursors = {}
+        self.connected = True
+
+        for record in read(path):
+            key = (record.unit, record.function, record.address, record.count)
+            self.blocks.setdefault(key, []).append(record.registers)
+
+            if record.registers is not None:
+                image = self.images.setdefault((record.unit, record.function), {})
+
+                for i, word in enumerate(record.registers):
+                    image[record.address + i] = word
+
+    def __repr__(self):
+        return f"ReplayClient({self.path}, blocks={sum(len(b) for b in self.blocks.values())})"
+
+    def connect(self):
+        return True
+
+    def close(self):
+        pass
+
+    def is_socket_open(self):
+        return True
+
+    def _read(self, function, address, count, slave):
+        key = (slave, function, address, count)
+        blocks = self.blocks.get(key)
+
+        if blocks:
+            cursor = self.cursors.get(key, 0)
+
+            if cursor >= len(blocks):
+                cursor = 0 if self.loop else len(blocks) - 1
+
+            self.cursors[key] = cursor + 1
+            registers = blocks[cursor]
+        else:
+            image = self.images.get((slave, function), {})
+
+            try:
+                registers = [image[address + i] for i in range(count)]
+            except KeyError:
+                registers = None
+
+        if registers is None:
+            return Response([], error=True)
+
+        return Response(list(registers))
+
+    def read_input_registers(self, address, count=1, slave=1, **kwargs):
+        return self._read(READ_INPUT, address, count, slave)
+
+    def read_holding_registers(self, address, count=1, slave=1, **kwargs):
+        return self._read(READ_HOLDING, address, count, slave)
+
+    def write_registers(self, address, values, slave=1, **kwargs):
+        return Response([])
+
+
+def read(path):
+    """Yields the Records of a capture file in order."""
+
+    with open(path, "rb") as f:
+        magic, version = _file_header.unpack(f.read(_file_header.size))
+
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a register capture")
+
+        while True:
+            header = f.read(_record.size)
+
+            if len(header) < _record.size:
+                break
+
+            timestamp, unit, function, address, count, status = _record.unpack(header)
+
+            if status:
+                registers = None
+            else:
+                data = f.read(2 * count)
+
+                if len(data) < 2 * count:
+                    break
+
+                registers = struct.unpack(f"<{count}H", data)
+
+            yield Record(timestamp, unit, function, address, count, registers)
+
+
+def attach(device, path):
+    """Logs every register read of `device` to the capture file `path`, returns the Capture."""
+
+    capture = path if isinstance(path, Capture) else Capture(path)
+    device.client = CaptureClient(device.client, capture)
+
+    return capture
+
+
+def detach(device):
+    if isinstance(device.client, CaptureClient):
+        device.client = device.client.client
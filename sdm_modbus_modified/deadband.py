@@ -0,0 +1,124 @@
+import time
+
+from sdm_modbus_modified import meter
+
+KEYFRAME = 60.0
+
+_MISSING = object()
+
+
+def thresholds(device, scaling=False, deadbands=None):
+    """Resolves the deadbands of every register of `device` into {key: (absolute, relative)}.
+
+    `deadbands` maps a key or a unit to an absolute threshold in scaled units,
+    or an (absolute, relative) tuple; key entries win over unit entries.
+    """
+
+    if deadbands is None:
+        deadbands = device.deadbands
+
+    normalise = scaling and device.normalise
+    result = {}
+
+    for key, field in device.register_map.fields.items():
+        unit = field.normalised_unit if normalise else field.unit
+        spec = deadbands.get(key)
+
+        if spec is None and isinstance(unit, str):
+            spec = deadbands.get(unit)
+        if spec is None:
+            continue
+
+        if isinstance(spec, (int, float)):
+            absolute, relative = spec, 0.0
+        else:
+            absolute, relative = spec
+
+        if not scaling:
+            factor = field.factor
+
+            if factor:
+                absolute /= abs(factor)
+
+        result[key] = (absolute, relative)
+
+    return result
+
+
+class Deadband:
+    """Change-detection stage on top of a meter's read_all and read.
+
+    Only values that moved past their deadband are returned, and a value not
+    emitted for `keyframe` seconds is emitted again so consumers can
+    resynchronise. `last` maps each key to (value, time emitted).
+    """
+
+    def __init__(self, device, keyframe=KEYFRAME, deadbands=None, clock=time.monotonic):
+        self.device = device
+        self.keyframe = keyframe
+        self.deadbands = deadbands
+        self.clock = clock
+        self.last = {}
+        self.received = 0
+        self.emitted = 0
+        self._thresholds = {}
+
+    def __repr__(self):
+        return f"Deadband({self.device}, emitted={self.emitted}/{self.received})"
+
+    def thresholds(self, scaling=False):
+        key = (scaling, self.device.normalise)
+        resolved = self._thresholds.get(key)
+
+        if resolved is None:
+            resolved = self._thresholds[key] = thresholds(self.device, scaling, self.deadbands)
+
+        return resolved
+
+    def filter(self, values, scaling=False, now=None):
+        """Returns the entries of `values` to pass on and remembers them as the last emitted ones."""
+
+        if now is None:
+            now = self.clock()
+
+        self.received += len(values)
+
+        limits = self.thresholds(scaling)
+        last = self.last
+        changes = {}
+        due = now - self.keyframe
+
+        for key, value in values.items():
+            previous, emitted = last.get(key, (_MISSING, None))
+
+            if previous is not _MISSING and emitted > due:
+                limit = limits.get(key)
+
+                if limit is None:
+                    if value == previous:
+                        continue
+                elif abs(value - previous) <= max(limit[0], limit[1] * abs(previous)):
+                    continue
+
+            changes[key] = value
+            last[key] = (value, now)
+
+        self.emitted += len(changes)
+
+        return changes
+
+    def read_all(self, rtype=meter.registerType.INPUT, scaling=False):
+        return self.filter(self.device.read_all(rtype, scaling), scaling)
+
+    def read_many(self, keys, scaling=False):
+        return self.filter(self.device.read_many(keys, scaling), scaling)
+
+    def read(self, key, scaling=False):
+        """Returns the value of `key` if it moved past its deadband, else None."""
+
+        return self.filter({key: self.device.read(key, scaling)}, scaling).get(key)
+
+    def reset(self):
+        """Forgets the emitted values, the next read is a keyframe."""
+
+        self.last = {}
@@ -0,0 +1,270 @@
+import importlib
+import json
+import logging
+import math
+import os
+
+from sdm_modbus_modified import espp1
+from sdm_modbus_modified import garo
+from sdm_modbus_modified import meter
+from sdm_modbus_modified import planner
+from sdm_modbus_modified import pool
+from sdm_modbus_modified import regmap
+from sdm_modbus_modified import sdm
+from sdm_modbus_modified import taiyedq
+from sdm_modbus_modified import ws100
+
+MODELS = (
+    sdm.SDM630,
+    sdm.SDM54_2T,
+    sdm.SDM72V2,
+    sdm.SDM72,
+    sdm.SDM120,
+    sdm.SDM230,
+    taiyedq.TAC4300_CT,
+    garo.GNM3D,
+    espp1.ESPP1,
+    ws100.WS100_19XX,
+)
+
+RANGES = {
+    "Hz": (45.0, 65.0),
+    "V": (50.0, 1000.0),
+}
+
+MIN_SCORE = 1
+
+logger = logging.getLogger(__name__)
+
+bus_key = meter.bus_key
+
+
+class Detection:
+    """Outcome of probing one unit: the best scoring model and the score of every candidate."""
+
+    def __init__(self, unit, model, scores, cached=False):
+        self.unit = unit
+        self.model = model
+        self.scores = scores
+        self.cached = cached
+
+    def __repr__(self):
+        name = self.model.__name__ if self.model else None
+        return f"Detection(unit={self.unit}, model={name}, cached={self.cached})"
+
+
+class FingerprintCache:
+    """JSON file mapping bus -> unit id -> model class, so known buses are not probed again."""
+
+    def __init__(self, path=None):
+        self.path = path or default_cache_path()
+        self.entries = {}
+
+        try:
+            with open(self.path) as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def __repr__(self):
+        return f"FingerprintCache({self.path})"
+
+    def get(self, bus, unit):
+        name = self.entries.get(bus, {}).get(str(unit))
+
+        if name is None:
+            return None
+
+        module_name, _, class_name = name.rpartition(".")
+
+        try:
+            return getattr(importlib.import_module(module_name), class_name)
+        except (ImportError, AttributeError):
+            return None
+
+    def set(self, bus, unit, model):
+        self.entries.setdefault(bus, {})[str(unit)] = f"{model.__module__}.{model.__name__}"
+
+    def forget(self, bus, unit=None):
+        if unit is None:
+            self.entries.pop(bus, None)
+        else:
+            self.entries.get(bus, {}).pop(str(unit), None)
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        tmp = f"{self.path}.tmp"
+
+        with open(tmp, "w") as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+
+        os.replace(tmp, self.path)
+
+
+class Detector:
+    """Identifies the model of a unit from a few discriminating registers.
+
+    Each candidate is scored on its frequency and voltage registers, which must
+    read plausible values, and on the registers that set it apart from the other
+    candidates. Ties go to the candidate listed first; a unit whose best score is
+    below `min_score` is not identified.
+    """
+
+    def __init__(self, candidates=MODELS, cache=None, max_gap=0, min_score=MIN_SCORE):
+        self.candidates = tuple(candidates)
+        self.cache = cache
+        self.max_gap = max_gap
+        self.min_score = min_score
+        self.probes = {model: self._probes(model) for model in self.candidates}
+
+        spans = {}
+
+        for fields in self.probes.values():
+            for f, _ in fields:
+                spans[(f.rtype, f.address, f.length)] = (f.rtype, f.address, f.length)
+
+        self.plans = {
+            rtype: planner.plan_reads(
+                ((span, span[1], span[2]) for span in spans if span[0] == rtype),
+                planner.MAX_REGISTERS,
+                max_gap,
+            )
+            for rtype in meter.registerType
+        }
+
+    def __repr__(self):
+        return f"Detector({[model.__name__ for model in self.candidates]})"
+
+    def _probes(self, model):
+        fields = regmap.for_model(model).fields
+        probes = []
+
+        for unit in RANGES:
+            for f in fields.values():
+                if f.unit == unit and f.format is not None and f.scale is not None:
+                    probes.append((f, False))
+                    break
+
+        signatures = {
+            other: {(f.rtype, f.address, f.length, f.dtype) for f in regmap.for_model(other).fields.values()}
+            for other in self.candidates if other is not model
+        }
+        distinct = {
+            f: {other for other, signature in signatures.items() if (f.rtype, f.address, f.length, f.dtype) not in signature}
+            for f in fields.values() if f.format is not None
+        }
+        remaining = {other for others in distinct.values() for other in others}
+
+        while remaining:
+            f = max(
+                distinct,
+                key=lambda f: (len(distinct[f] & remaining), f.rtype == meter.registerType.INPUT, -f.address)
+            )
+            remaining -= distinct.pop(f)
+            probes.append((f, True))
+
+        return tuple(probes)
+
+    def _read(self, device):
+        words = {}
+
+        for rtype, plan in self.plans.items():
+            for block in plan:
+                try:
+                    if rtype == meter.registerType.INPUT:
+                        data = device._read_input_registers(block.address, block.count)
+                    else:
+                        data = device._read_holding_registers(block.address, block.count)
+                except Exception:
+                    data = None
+
+                for span, offset, length in block.fields:
+                    words[span] = data[offset:offset + length] if data else None
+
+        return words
+
+    def score(self, model, words):
+        score = 0
+
+        for f, distinguishing in self.probes[model]:
+            data = words.get((f.rtype, f.address, f.length))
+
+            if data is None:
+                score -= 1
+                continue
+
+            try:
+                value = regmap.value_decoder(f.dtype, f.length, f.vtype, model.byteorder, model.wordorder)(data)
+            except Exception:
+                score -= 1
+                continue
+
+            if distinguishing:
+                score += 1
+                continue
+
+            value = value * f.scale * (10 ** -(f.decimals or 0))
+            low, high = RANGES[f.unit]
+
+            if math.isfinite(value) and low <= abs(value) <= high:
+                score += 2
+            else:
+                score -= 2
+
+        return score
+
+    def detect(self, device, refresh=False):
+        """Detects the model of the unit `device` (any Meter) talks to, using the cache when set."""
+
+        bus = bus_key(device)
+
+        if self.cache is not None and not refresh:
+            model = self.cache.get(bus, device.unit)
+
+            if model in self.candidates:
+                return Detection(device.unit, model, {}, cached=True)
+            elif model is not None:
+                logger.warning("Ignoring cached %s for unit %d on %s: not a candidate, probing again",
+                               model.__name__, device.unit, bus)
+
+        words = self._read(device)
+
+        if not any(data is not None for data in words.values()):
+            return Detection(device.unit, None, {})
+
+        scores = {model: self.score(model, words) for model in self.candidates}
+        model = max(self.candidates, key=lambda m: scores[m])
+
+        if scores[model] < self.min_score:
+            return Detection(device.unit, None, scores)
+
+        if self.cache is not None:
+            self.cache.set(bus, device.unit, model)
+
+        return Detection(device.unit, model, scores)
+
+    def detect_bus(self, root, units, refresh=False):
+        """Detects every unit behind `root`'s client, returns {unit: Detection} and saves the cache."""
+
+        results = {}
+
+        for unit in units:
+            device = meter.Meter(parent=root, unit=unit)
+            results[unit] = self.detect(device, refresh)
+
+            if isinstance(device.client, pool.SharedClient):
+                device.client.close()
+
+        if self.cache is not None:
+            self.cache.save()
+
+        return results
+
+
+def default_cache_path():
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "sdm_modbus_modified", "fingerprints.json")
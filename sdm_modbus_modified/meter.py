@@ -1,13 +1,16 @@
+import contextlib
 import enum
 import importlib
 import time
-import struct
 from pymodbus.constants import Endian
-from pymodbus.client import ModbusTcpClient
-from pymodbus.client import ModbusUdpClient
-from pymodbus.client import ModbusSerialClient
-from pymodbus.payload import BinaryPayloadBuilder
-from pymodbus.pdu.register_message import ReadInputRegistersResponse, ReadHoldingRegistersResponse
+from pymodbus.exceptions import ModbusIOException
+
+from sdm_modbus_modified import metrics
+from sdm_modbus_modified import planner
+from sdm_modbus_modified import pool
+from sdm_modbus_modified import regmap
+from sdm_modbus_modified import stream
+from sdm_modbus_modified import vector
 
 
 class connectionType(enum.Enum):
@@ -34,6 +37,7 @@ class registerDataType(enum.Enum):
     FLOAT16 = 10
     FLOAT32 = 11
     STRING = 12
+    BYTES = 13
 
 
 RETRIES = 3
@@ -41,6 +45,33 @@ TIMEOUT = 1
 UNIT = 1
 
 
+def _function(rtype):
+    if rtype == registerType.INPUT:
+        return metrics.READ_INPUT
+    else:
+        return metrics.READ_HOLDING
+
+
+def bus_key(device):
+    """Returns the serial port settings or host:port `device` talks through, e.g. "/dev/ttyUSB0@9600N1"."""
+
+    if device.mode is connectionType.RTU:
+        return f"{device.device}@{device.baud}{device.parity or 'N'}{device.stopbits}"
+    else:
+        return f"{device.host}:{device.port}"
+
+
+def _outcome(result, length):
+    if result is None:
+        return "timeout"
+    if result.isError():
+        return "timeout" if isinstance(result, ModbusIOException) else "error"
+    if length is not None and len(getattr(result, "registers", ())) != length:
+        return "error"
+
+    return None
+
+
 class Meter:
     model = "Generic"
     registers = {}
@@ -51,18 +82,53 @@ class Meter:
 
     wordorder = Endian.BIG
     byteorder = Endian.BIG
+
+    max_registers = planner.MAX_REGISTERS
+    max_gap = planner.MAX_GAP
+
+    # Change-detection thresholds per unit or register key, see deadband.thresholds.
+    deadbands = {
+        "V": 0.5,
+        "A": 0.05,
+        "Hz": 0.02,
+        "W": 10,
+        "kW": 0.01,
+        "VA": 10,
+        "kVA": 0.01,
+        "VAr": 10,
+        "kVAr": 0.01,
+        "var": 10,
+        "kvar": 0.01,
+        "%": 0.5,
+        "°": 1,
+    }
     
     udp = False
+    shared = False
+    metrics = None
+    policy = None
+    normalise = False
 
     def __init__(self, **kwargs):
+        self._configure(**kwargs)
+        self.connect()
+
+    def _configure(self, **kwargs):
         parent = kwargs.get("parent")
 
         if parent:
             self.client = parent.client
+            self.shared = parent.shared
             self.mode = parent.mode
             self.timeout = parent.timeout
             self.retries = parent.retries
             self.framer = parent.framer
+            self.metrics = kwargs.get("metrics", parent.metrics)
+            self.policy = kwargs.get("policy", parent.policy)
+            self.normalise = kwargs.get("normalise", parent.normalise)
+            self.max_registers = kwargs.get("max_registers", parent.max_registers)
+            self.max_gap = kwargs.get("max_gap", parent.max_gap)
+            self.deadbands = kwargs.get("deadbands", self.deadbands)
 
             unit = kwargs.get("unit")
 
@@ -84,11 +150,22 @@ class Meter:
                 self.port = parent.port
             else:
                 raise NotImplementedError(self.mode)
+
+            if isinstance(self.client, pool.SharedClient):
+                self.client.retain()
         else:
             self.timeout = kwargs.get("timeout", TIMEOUT)
             self.retries = kwargs.get("retries", RETRIES)
             self.unit = kwargs.get("unit", UNIT)
-
+            self.max_registers = kwargs.get("max_registers", self.max_registers)
+            self.max_gap = kwargs.get("max_gap", self.max_gap)
+            self.deadbands = kwargs.get("deadbands", self.deadbands)
+            self.shared = kwargs.get("shared", self.shared)
+            self.metrics = kwargs.get("metrics", self.metrics)
+            self.policy = kwargs.get("policy", self.policy)
+            self.normalise = kwargs.get("normalise", self.normalise)
+
+            client = kwargs.get("client")
             client_args = {}
 
             framer_name = kwargs.get("framer")
@@ -129,40 +206,65 @@ class Meter:
                     self.baud = baud
 
                 self.mode = connectionType.RTU
-                self.client = ModbusSerialClient(
-                    port=self.device,
-                    stopbits=self.stopbits,
-                    parity=self.parity,
-                    baudrate=self.baud,
-                    timeout=self.timeout,
-                    **client_args
-                )
+                self.client = client or self._open_client(**client_args)
             elif udp:
                 self.host = kwargs.get("host")
                 self.port = kwargs.get("port", 502)
                 
                 self.mode = connectionType.UDP
 
-                self.client = ModbusUdpClient(
-                    host=self.host,
-                    port=self.port,
-                    timeout=self.timeout,
-                    **client_args
-                )
+                self.client = client or self._open_client(**client_args)
             else:
                 self.host = kwargs.get("host")
                 self.port = kwargs.get("port", 502)
                 
                 self.mode = connectionType.TCP
 
-                self.client = ModbusTcpClient(
-                    host=self.host,
-                    port=self.port,
-                    timeout=self.timeout,
-                    **client_args
-                )
+                self.client = client or self._open_client(**client_args)
 
-        self.connect()
+    def _open_client(self, **client_args):
+        if not self.shared:
+            return self._create_client(**client_args)
+
+        framer = client_args.get("framer")
+
+        if self.mode is connectionType.RTU:
+            key = (self.mode, self.device, self.baud, self.parity, self.stopbits, framer)
+        else:
+            key = (self.mode, self.host, self.port, framer)
+
+        # Retries are applied per meter by _read_registers, only the timeout is a client setting.
+        return pool.acquire(key, lambda: self._create_client(**client_args), {"timeout": self.timeout})
+
+    def _create_client(self, **client_args):
+        # The client classes load most of pymodbus, so they are only imported once a client is needed.
+        from pymodbus.client import ModbusTcpClient, ModbusUdpClient, ModbusSerialClient
+
+        if self.mode is connectionType.RTU:
+            return ModbusSerialClient(
+                port=self.device,
+                stopbits=self.stopbits,
+                parity=self.parity,
+                baudrate=self.baud,
+                timeout=self.timeout,
+                **client_args
+            )
+        elif self.mode is connectionType.UDP:
+            return ModbusUdpClient(
+                host=self.host,
+                port=self.port,
+                timeout=self.timeout,
+                **client_args
+            )
+        elif self.mode is connectionType.TCP:
+            return ModbusTcpClient(
+                host=self.host,
+                port=self.port,
+                timeout=self.timeout,
+                **client_args
+            )
+        else:
+            raise NotImplementedError(self.mode)
 
     def __repr__(self):
         framer_name = self.framer.__name__ if self.framer is not None else "default"
@@ -176,14 +278,28 @@ class Meter:
             return f"<{self.__class__.__module__}.{self.__class__.__name__} object at {hex(id(self))}>"
 
 
-    def _read_input_registers(self, address, length):
-        for _ in range(self.retries):
+    def _read_registers(self, read, function, address, length):
+        if self.policy is not None:
+            return self._read_adaptive(read, function, address, length)
+
+        stats = self.metrics
+
+        for attempt in range(self.retries):
             if not self.connected():
+                if stats is not None:
+                    stats.reconnect(self.unit, function)
+
                 self.connect()
                 time.sleep(0.1)
                 continue
 
-            result = self.client.read_input_registers(address=address, count=length, slave=self.unit)
+            if stats is None:
+                result = read(address=address, count=length, slave=self.unit)
+            else:
+                if attempt:
+                    stats.retry(self.unit, function)
+
+                result = self._timed(read, function, length, address=address, count=length, slave=self.unit)
 
             if result is None or result.isError():
                 continue
@@ -194,139 +310,173 @@ class Meter:
 
         return None
 
+    def _read_adaptive(self, read, function, address, length):
+        adaptive = self.policy
+        stats = self.metrics
+        unit = self.unit
+        key = (bus_key(self), unit)
+        error = None
 
-    def _read_holding_registers(self, address, length):
-        for _ in range(self.retries):
+        adaptive.allow(key)
+
+        for attempt in range(adaptive.attempts(key)):
             if not self.connected():
-                self.connect()
-                time.sleep(0.1)
+                if stats is not None:
+                    stats.reconnect(unit, function)
+
+                if not self.connect():
+                    adaptive.failure(key)
+                    break
+
+            if attempt and stats is not None:
+                stats.retry(unit, function)
+
+            # The timeout set by prepare() must still be in place when the
+            # request goes out, so other meters on a shared client wait.
+            lock = self.client.lock if isinstance(self.client, pool.SharedClient) else contextlib.nullcontext()
+
+            with lock:
+                saved = adaptive.prepare(self.client, key)
+                start = time.perf_counter()
+
+                try:
+                    if stats is None:
+                        result = read(address=address, count=length, slave=unit)
+                    else:
+                        result = self._timed(read, function, length, address=address, count=length, slave=unit)
+                except ModbusIOException as e:
+                    adaptive.failure(key)
+                    error = e
+                    continue
+                finally:
+                    adaptive.restore(self.client, saved)
+
+            if result is None:
+                adaptive.failure(key)
                 continue
-            result = self.client.read_holding_registers(address=address, count=length, slave=self.unit)
 
-            if result is None or result.isError():
+            adaptive.success(key, time.perf_counter() - start)
+
+            if result.isError():
                 continue
             if not hasattr(result, "registers") or len(result.registers) != length:
                 continue
 
-            return result.registers  # Returns raw registers
-
-        return None
+            return result.registers
 
+        if error is not None:
+            raise error
 
+        return None
 
-    def _write_holding_register(self, address, value):
-        return self.client.write_registers(address=address, values=value)
-
-    def _encode_value(self, data, dtype):
-        builder = BinaryPayloadBuilder(byteorder=self.byteorder, wordorder=self.wordorder)
+    def _timed(self, request, function, length, **kwargs):
+        start = time.perf_counter()
 
         try:
-            if dtype == registerDataType.FLOAT32:
-                builder.add_32bit_float(data)
-            elif dtype == registerDataType.INT32:
-                builder.add_32bit_int(data)
-            elif dtype == registerDataType.UINT32:
-                builder.add_32bit_uint(data)
-            elif dtype == registerDataType.INT16:
-                builder.add_16bit_int(int(data))
-            else:
-                raise NotImplementedError(dtype)
-        except NotImplementedError:
+            result = request(**kwargs)
+        except ModbusIOException:
+            self.metrics.request(self.unit, function, time.perf_counter() - start, "timeout")
+            raise
+        except Exception:
+            self.metrics.request(self.unit, function, time.perf_counter() - start, "error")
             raise
 
-        return builder.to_registers()
+        self.metrics.request(self.unit, function, time.perf_counter() - start, _outcome(result, length))
 
-    def _decode_value(self, data, length, dtype, vtype):
-        try:
-            # Convert the registers in a byte sequence
-            if self.wordorder == Endian.LITTLE:
-                data = list(reversed(data))
-
-            raw_bytes = b''.join(word.to_bytes(2, byteorder='big' if self.byteorder == Endian.BIG else 'little') for word in data)
-
-            if dtype == registerDataType.FLOAT32:
-                result = struct.unpack(">f", raw_bytes)[0]
-            elif dtype == registerDataType.INT32:
-                result = struct.unpack(">i", raw_bytes)[0]
-            elif dtype == registerDataType.UINT32:
-                result = struct.unpack(">I", raw_bytes)[0]
-            elif dtype == registerDataType.INT16:
-                result = struct.unpack(">h", raw_bytes)[0]
-            else:
-                raise NotImplementedError(f"Unsupported data type: {dtype}")
+        return result
 
-            return vtype(result)
+    def _read_input_registers(self, address, length):
+        return self._read_registers(self.client.read_input_registers, metrics.READ_INPUT, address, length)
 
-        except Exception as e:
-            raise ValueError(f"Could not decode {dtype}: {e}")
+    def _read_holding_registers(self, address, length):
+        return self._read_registers(self.client.read_holding_registers, metrics.READ_HOLDING, address, length)
+
+    def _write_holding_register(self, address, value):
+        if self.metrics is None:
+            return self.client.write_registers(address=address, values=value, slave=self.unit)
 
+        return self._timed(self.client.write_registers, metrics.WRITE_MULTIPLE, None,
+                           address=address, values=value, slave=self.unit)
 
-    def _read(self, value):
-        address, length, rtype, dtype, vtype, label, fmt, batch, sf = value[:9]
+    def _encode_value(self, data, dtype, length=None):
+        if length is None:
+            length = 1 if dtype in (registerDataType.INT16, registerDataType.UINT16, registerDataType.FLOAT16) else 2
 
         try:
-            if rtype == registerType.INPUT:
-                return self._decode_value(self._read_input_registers(address, length), length, dtype, vtype)
-            elif rtype == registerType.HOLDING:
-                return self._decode_value(self._read_holding_registers(address, length), length, dtype, vtype)
-            else:
-                raise NotImplementedError(rtype)
+            return regmap.value_encoder(dtype, length, self.byteorder, self.wordorder)(data)
         except NotImplementedError:
             raise
+        except Exception as e:
+            raise ValueError(f"Could not encode {dtype}: {e}")
 
-    def _read_all(self, values, rtype):
-        addr_min = False
-        addr_max = False
+    def _encode_settings(self, settings):
+        register_map = self.register_map
+        words = {}
 
-        for k, v in values.items():
-            v_addr = v[0]
-            v_length = v[1]
+        for key, data in settings.items():
+            if key not in register_map:
+                raise KeyError(key)
 
-            if addr_min is False:
-                addr_min = v_addr
-            if addr_max is False:
-                addr_max = v_addr + v_length
+            field = register_map[key]
 
-            if v_addr < addr_min:
-                addr_min = v_addr
-            if (v_addr + v_length) > addr_max:
-                addr_max = v_addr + v_length
+            if field.rtype != registerType.HOLDING:
+                raise NotImplementedError(field.rtype)
 
-        results = {}
-        offset = addr_min
-        length = addr_max - addr_min
+            factor = self._factor(field)
+            words[key] = self._encode_value(data if factor is None else data / factor, field.dtype, field.length)
+
+        return words
 
+    def _write_plan(self, words):
+        fields = self.register_map.fields
+        return planner.plan_writes((key, fields[key].address, len(data)) for key, data in words.items())
+
+    def _decode_value(self, data, length, dtype, vtype):
+        try:
+            return regmap.value_decoder(dtype, length, vtype, self.byteorder, self.wordorder)(data)
+        except Exception as e:
+            raise ValueError(f"Could not decode {dtype}: {e}")
+
+    def _read(self, field):
         try:
-            if rtype == registerType.INPUT:
-                data = self._read_input_registers(offset, length)
-            elif rtype == registerType.HOLDING:
-                data = self._read_holding_registers(offset, length)
+            if field.rtype == registerType.INPUT:
+                return self._decode_value(self._read_input_registers(field.address, field.length), field.length, field.dtype, field.vtype)
+            elif field.rtype == registerType.HOLDING:
+                return self._decode_value(self._read_holding_registers(field.address, field.length), field.length, field.dtype, field.vtype)
             else:
-                raise NotImplementedError(rtype)
+                raise NotImplementedError(field.rtype)
+        except NotImplementedError:
+            raise
 
-            if not data:
-                return results
-            for k, v in values.items():
-                address, length, rtype, dtype, vtype, label, fmt, batch, sf = v[:9]
+    def _read_block(self, block):
+        """Reads the raw register words of a planned block, None if the read failed."""
 
-                relative_offset = address - addr_min
-                registers_slice = data[relative_offset:relative_offset + length]
+        if block.rtype == registerType.INPUT:
+            data = self._read_input_registers(block.address, block.count)
+        elif block.rtype == registerType.HOLDING:
+            data = self._read_holding_registers(block.address, block.count)
+        else:
+            raise NotImplementedError(block.rtype)
 
-                results[k] = self._decode_value(registers_slice, length, dtype, vtype)
+        if data and self.metrics is not None:
+            self.metrics.block(self.unit, _function(block.rtype), block.count, block.used)
 
-        except NotImplementedError:
-            raise
+        return data
 
-        return results
+    def _read_all(self, block, scaling=False):
+        data = self._read_block(block)
+
+        if not data:
+            return {}
 
-    def _write(self, value, data):
-        address, length, rtype, dtype, vtype, label, fmt, batch, sf = value
+        return block.decode(data, scaling, self.normalise)
 
+    def _write(self, field, data):
         try:
-            if rtype == registerType.HOLDING:
-                return self._write_holding_register(address, self._encode_value(data, dtype))
+            if field.rtype == registerType.HOLDING:
+                return self._write_holding_register(field.address, self._encode_value(data, field.dtype, field.length))
             else:
-                raise NotImplementedError(rtype)
+                raise NotImplementedError(field.rtype)
         except NotImplementedError:
             raise
 
@@ -339,38 +489,136 @@ class Meter:
     def connected(self):
         return self.client.is_socket_open()
 
+    @property
+    def register_map(self):
+        registers = self.__dict__.get("registers")
+
+        if registers is None:
+            return regmap.for_model(type(self))
+
+        compiled = self.__dict__.get("_register_map")
+
+        if compiled is None or compiled.source is not registers:
+            compiled = self._register_map = regmap.RegisterMap(registers, self.byteorder, self.wordorder)
+
+        return compiled
+
     def get_scaling(self, key):
-        address, length, rtype, dtype, vtype, label, fmt, batch, sf = self.registers[key]
-        return sf
+        return self.register_map[key].scale
+
+    def get_unit(self, key):
+        field = self.register_map[key]
+        return field.normalised_unit if self.normalise else field.unit
+
+    def _factor(self, field):
+        return field.normalised_factor if self.normalise else field.factor
 
     def read(self, key, scaling=False):
-        if key not in self.registers:
+        register_map = self.register_map
+
+        if key not in register_map:
             raise KeyError(key)
 
-        if scaling:
-            return self._read(self.registers[key]) * self.get_scaling(key)
+        field = register_map[key]
+        factor = self._factor(field)
+
+        if scaling and factor is not None:
+            return self._read(field) * factor
         else:
-            return self._read(self.registers[key])
+            return self._read(field)
 
     def write(self, key, data):
-        if key not in self.registers:
+        register_map = self.register_map
+
+        if key not in register_map:
             raise KeyError(key)
 
-        return self._write(self.registers[key], data / self.get_scaling(key))
+        field = register_map[key]
+        factor = self._factor(field)
+
+        return self._write(field, data if factor is None else data / factor)
+
+    def write_many(self, settings, verify=True):
+        """Writes {key: value} holding-register settings, merging adjacent registers into one write.
+
+        Returns {key: True if acknowledged}; with verify, also read back unchanged.
+        """
+
+        words = self._encode_settings(settings)
+        results = {}
+
+        for block in self._write_plan(words):
+            try:
+                response = self._write_holding_register(block.address, [w for key in block.keys for w in words[key]])
+                written = response is not None and not response.isError()
+            except ModbusIOException:
+                written = False
+
+            results.update(dict.fromkeys(block.keys, written))
+
+        if verify:
+            results.update(self._verify(words, [key for key, written in results.items() if written]))
+
+        return results
+
+    def _verify(self, words, keys):
+        results = dict.fromkeys(keys, False)
+
+        if not keys:
+            return results
+
+        for block in self.register_map.plan(registerType.HOLDING, self.max_registers, self.max_gap, keys):
+            try:
+                data = self._read_holding_registers(block.address, block.count)
+            except ModbusIOException:
+                continue
+
+            if not data:
+                continue
+
+            for key, offset, _ in block.fields:
+                results[key] = list(data[offset:offset + len(words[key])]) == words[key]
+
+        return results
+
+    def plan(self, rtype=registerType.INPUT):
+        return self.register_map.plan(rtype, self.max_registers, self.max_gap)
 
     def read_all(self, rtype=registerType.INPUT, scaling=False):
-        registers = {k: v for k, v in self.registers.items() if (v[2] == rtype)}
+        register_map = self.register_map
         results = {}
 
-        for batch in range(1, max(len(registers), 2)):
-            register_batch = {k: v for k, v in registers.items() if (v[7] == batch)}
+        for block in register_map.plan(rtype, self.max_registers, self.max_gap):
+            results.update(self._read_all(block, scaling))
+
+        return results
 
-            if not register_batch:
-                break
+    def read_record(self, rtype=registerType.INPUT, scaling=False):
+        """Returns the read_all dict together with the same values as a NumPy structured record, see vector.records."""
 
-            results.update(self._read_all(register_batch, rtype))
+        results = self.read_all(rtype, scaling)
 
-        if scaling:
-            return {k: v * self.get_scaling(k) for k, v in results.items()}
-        else:
-            return {k: v for k, v in results.items()}
+        return results, vector.records([results], self.register_map.rtypes[rtype])[0]
+
+    def read_many(self, keys, scaling=False):
+        """Reads only `keys`, merged into the fewest block reads per register type."""
+
+        register_map = self.register_map
+        keys = frozenset(keys)
+
+        for key in keys:
+            if key not in register_map:
+                raise KeyError(key)
+
+        results = {}
+
+        for rtype in register_map.rtypes:
+            for block in register_map.plan(rtype, self.max_registers, self.max_gap, keys):
+                results.update(self._read_all(block, scaling))
+
+        return results
+
+    def stream(self, keys=None, interval=1.0, rtype=registerType.INPUT, scaling=False, samples=None):
+        """Yields a timestamped stream.Sample every `interval` seconds, see stream.stream."""
+
+        return stream.stream(self, keys, interval, rtype, scaling, samples)
@@ -0,0 +1,162 @@
+import bisect
+import json
+import threading
+
+READ_HOLDING = 3
+READ_INPUT = 4
+WRITE_MULTIPLE = 16
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+COUNTERS = {
+    "requests": "Modbus requests sent",
+    "retries": "Requests repeated after a failed attempt",
+    "reconnects": "Reconnects before a request",
+    "timeouts": "Requests that got no response",
+    "errors": "Requests answered with an exception or a malformed response",
+    "registers_fetched": "Registers transferred by block reads",
+    "registers_used": "Registers of block reads that belong to a decoded field",
+}
+
+
+class Histogram:
+    """Cumulative latency histogram with fixed bucket bounds, in seconds."""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds=BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def __repr__(self):
+        return f"Histogram(count={self.count}, sum={self.sum:.3f})"
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            total += count
+            yield bound, total
+
+
+class Metrics:
+    """Per-transaction instrumentation of one or more meters.
+
+    Assign it to Meter.metrics (meters created with parent= share it) to record
+    request latencies and retry, reconnect, timeout and error counts per unit and
+    function code.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self.lock = threading.Lock()
+        self.latency = {}
+        self.counters = {name: {} for name in COUNTERS}
+
+    def __repr__(self):
+        return f"Metrics({sum(self.counters['requests'].values())} requests)"
+
+    def _add(self, counter, labels, value=1):
+        counter[labels] = counter.get(labels, 0) + value
+
+    def request(self, unit, function, seconds, outcome=None):
+        """Records one request; `outcome` is None on success, or "timeout" or "error"."""
+
+        labels = (unit, function)
+
+        with self.lock:
+            histogram = self.latency.get(labels)
+
+            if histogram is None:
+                histogram = self.latency[labels] = Histogram(self.buckets)
+
+            histogram.observe(seconds)
+            self._add(self.counters["requests"], labels)
+
+            if outcome is not None:
+                self._add(self.counters[f"{outcome}s"], labels)
+
+    def retry(self, unit, function):
+        with self.lock:
+            self._add(self.counters["retries"], (unit, function))
+
+    def reconnect(self, unit, function):
+        with self.lock:
+            self._add(self.counters["reconnects"], (unit, function))
+
+    def block(self, unit, function, fetched, used):
+        labels = (unit, function)
+
+        with self.lock:
+            self._add(self.counters["registers_fetched"], labels, fetched)
+            self._add(self.counters["registers_used"], labels, used)
+
+    def reset(self):
+        with self.lock:
+            self.latency = {}
+            self.counters = {name: {} for name in COUNTERS}
+
+    def as_dict(self):
+        with self.lock:
+            series = {}
+
+            for name, counter in self.counters.items():
+                for labels, value in counter.items():
+                    series.setdefault(labels, {})[name] = value
+
+            for labels, histogram in self.latency.items():
+                series.setdefault(labels, {})["latency"] = {
+                    "count": histogram.count,
+                    "sum": histogram.sum,
+                    "buckets": {_le(bound): count for bound, count in histogram.cumulative()},
+                }
+
+        return {
+            "series": [
+                dict({"unit": unit, "function": function}, **values)
+                for (unit, function), values in sorted(series.items())
+            ]
+        }
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.as_dict(), **kwargs)
+
+    def to_prometheus(self, prefix="sdm_modbus"):
+        """Renders every metric in the Prometheus text exposition format."""
+
+        lines = []
+
+        with self.lock:
+            name = f"{prefix}_request_duration_seconds"
+            lines.append(f"# HELP {name} Modbus request latency")
+            lines.append(f"# TYPE {name} histogram")
+
+            for (unit, function), histogram in sorted(self.latency.items()):
+                labels = f'unit="{unit}",function="{function}"'
+
+                for bound, count in histogram.cumulative():
+                    lines.append(f'{name}_bucket{{{labels},le="{_le(bound)}"}} {count}')
+
+                lines.append(f"{name}_sum{{{labels}}} {histogram.sum}")
+                lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+
+            for counter, description in COUNTERS.items():
+                name = f"{prefix}_{counter}_total"
+                lines.append(f"# HELP {name} {description}")
+                lines.append(f"# TYPE {name} counter")
+
+                for (unit, function), value in sorted(self.counters[counter].items()):
+                    lines.append(f'{name}{{unit="{unit}",function="{function}"}} {value}')
+
+        return "\n".join(lines) + "\n"
+
+
+def _le(bound):
+    return "+Inf" if bound == float("inf") else repr(bound)
@@ -0,0 +1,488 @@
+import array
+import asyncio
+import concurrent.futures
+import functools
+import math
+import operator
+from multiprocessing import shared_memory
+
+from sdm_modbus_modified import meter
+from sdm_modbus_modified import registry
+from sdm_modbus_modified import regmap
+from sdm_modbus_modified import vector
+
+BATCH_SIZE = 4096
+
+DECODE = "decode"
+AGGREGATE = "aggregate"
+
+
+class RawReading:
+    """The raw register words of one unit and register type, as read by the I/O tier.
+
+    `blocks` holds an array("H") per block of the model's default read plan,
+    None where the read failed; `key` identifies the unit in results.
+    """
+
+    __slots__ = ("key", "model", "rtype", "max_registers", "max_gap", "blocks")
+
+    def __init__(self, key, model, rtype, max_registers, max_gap, blocks):
+        self.key = key
+        self.model = model
+        self.rtype = rtype
+        self.max_registers = max_registers
+        self.max_gap = max_gap
+        self.blocks = blocks
+
+    def __repr__(self):
+        return f"RawReading({self.key}, {self.model}, {self.rtype}, {len(self.blocks)} blocks)"
+
+
+class Records:
+    """Decoded values of many units of one model and register type.
+
+    `values` is a structured array with one record per unit, in the order of
+    `keys`; values of failed blocks are NaN, or empty bytes.
+    """
+
+    __slots__ = ("model", "rtype", "keys", "values")
+
+    def __init__(self, model, rtype, keys, values):
+        self.model = model
+        self.rtype = rtype
+        self.keys = keys
+        self.values = values
+
+    def __repr__(self):
+        return f"Records({self.model}, {self.rtype}, units={len(self.keys)})"
+
+    def __len__(self):
+        return len(self.keys)
+
+    def as_dicts(self):
+        """Returns {reading key: {register key: value}}, for callers that want read_all dicts."""
+
+        names = self.values.dtype.names
+
+        return {key: dict(zip(names, record)) for key, record in zip(self.keys, self.values.tolist())}
+
+
+class Aggregate:
+    """Count, sum, minimum and maximum of one numeric key over many units."""
+
+    __slots__ = ("count", "total", "minimum", "maximum")
+
+    def __init__(self, count=0, total=0.0, minimum=math.inf, maximum=-math.inf):
+        self.count = count
+        self.total = total
+        self.minimum = minimum
+        self.maximum = maximum
+
+    def __repr__(self):
+        return f"Aggregate(count={self.count}, mean={self.mean}, minimum={self.minimum}, maximum={self.maximum})"
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+
+        if value < self.minimum:
+            self.minimum = value
+        if value > self.maximum:
+            self.maximum = value
+
+    def merge(self, other):
+        self.count += other.count
+        self.total += other.total
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+
+    def as_dict(self):
+        return {"count": self.count, "mean": self.mean, "minimum": self.minimum, "maximum": self.maximum}
+
+
+def model_name(model):
+    """Returns the registry name a worker process resolves `model` by, also for the asyncio variants of models."""
+
+    for base in model.__mro__:
+        name = registry.name_of(base)
+
+        if name is not None:
+            return name
+
+    raise ValueError(f"{model.__name__} is not in the registry, see registry.register")
+
+
+def collect(device, rtypes=(meter.registerType.INPUT,), key=None):
+    """Reads the default plan of `device` without decoding it, returns a RawReading per register type."""
+
+    register_map = device.register_map
+    name = model_name(type(device))
+    readings = []
+
+    for rtype in rtypes:
+        plan = register_map.plan(rtype, device.max_registers, device.max_gap)
+        blocks = tuple(_words(device._read_block(block)) for block in plan)
+        readings.append(RawReading(device.unit if key is None else key, name, rtype, device.max_registers, device.max_gap, blocks))
+
+    return readings
+
+
+async def collect_async(device, rtypes=(meter.registerType.INPUT,), key=None):
+    """collect() for an aio.AsyncMeter."""
+
+    register_map = device.register_map
+    name = model_name(type(device))
+    readings = []
+
+    for rtype in rtypes:
+        plan = register_map.plan(rtype, device.max_registers, device.max_gap)
+        blocks = tuple([_words(await device._read_block(block)) for block in plan])
+        readings.append(RawReading(device.unit if key is None else key, name, rtype, device.max_registers, device.max_gap, blocks))
+
+    return readings
+
+
+def decode(readings, scaling=False, normalise=False):
+    """Decodes RawReadings in this process with vector.decode, returns one Records per model and register type."""
+
+    results = []
+
+    for (name, rtype, max_registers, max_gap), members in _groups(readings).items():
+        plan = _plan(name, rtype, max_registers, max_gap)
+        columns, valid = _columns(name, plan, members)
+        results.append(Records(name, rtype, [reading.key for reading in members], _decode(plan, columns, valid, scaling, normalise)))
+
+    return results
+
+
+def aggregate(records):
+    """Returns {model name: {key: Aggregate}} over every unit of each model, from decoded Records."""
+
+    merged = {}
+
+    for one in records:
+        _merge_aggregates(merged, one.model, _aggregate(one.values))
+
+    return merged
+
+
+class Pipeline:
+    """Decodes, scales and aggregates raw register blocks, in this process or in a pool of workers.
+
+    With `workers`, the words go through one shared memory segment to worker
+    processes, `batch_size` units per job. Workers know the models in the
+    registry and the profile directories in `profiles`.
+    """
+
+    def __init__(self, workers=0, batch_size=BATCH_SIZE, scaling=False, normalise=False, profiles=(), mp_context=None):
+        self.batch_size = batch_size
+        self.scaling = scaling
+        self.normalise = normalise
+        self.executor = None
+
+        if workers:
+            self.executor = concurrent.futures.ProcessPoolExecutor(
+                workers, mp_context=mp_context, initializer=_initialize, initargs=(tuple(profiles),)
+            )
+
+    def __repr__(self):
+        return f"Pipeline(batch_size={self.batch_size}, scaling={self.scaling}, normalise={self.normalise})"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+
+    def decode(self, readings):
+        """Returns a Records per model and register type."""
+
+        if self.executor is None:
+            return decode(readings, self.scaling, self.normalise)
+
+        segment, jobs = self._submit(readings, DECODE)
+
+        try:
+            return _merge_records([(job, future.result()) for job, future in jobs])
+        finally:
+            _release(segment)
+
+    def aggregate(self, readings):
+        """Returns {model name: {key: Aggregate}} over every unit of each model."""
+
+        if self.executor is None:
+            return aggregate(decode(readings, self.scaling, self.normalise))
+
+        segment, jobs = self._submit(readings, AGGREGATE)
+
+        try:
+            merged = {}
+
+            for (group, _), future in jobs:
+                _merge_aggregates(merged, group[0], future.result())
+
+            return merged
+        finally:
+            _release(segment)
+
+    async def decode_async(self, readings):
+        if self.executor is None:
+            return self.decode(readings)
+
+        segment, jobs = self._submit(readings, DECODE)
+
+        try:
+            results = await asyncio.gather(*(asyncio.wrap_future(future) for _, future in jobs))
+            return _merge_records(list(zip((job for job, _ in jobs), results)))
+        finally:
+            _release(segment)
+
+    async def aggregate_async(self, readings):
+        if self.executor is None:
+            return self.aggregate(readings)
+
+        segment, jobs = self._submit(readings, AGGREGATE)
+
+        try:
+            merged = {}
+
+            for (group, _), aggregates in zip((job for job, _ in jobs),
+                                              await asyncio.gather(*(asyncio.wrap_future(future) for _, future in jobs))):
+                _merge_aggregates(merged, group[0], aggregates)
+
+            return merged
+        finally:
+            _release(segment)
+
+    async def cycle(self, poller, aggregate=False):
+        """Polls every bus of a Poller once, returns its Records or, with aggregate, the aggregates per model.
+
+        Units that failed are left out; their errors are in poller.errors.
+        """
+
+        readings = [reading for units in (await poller.collect()).values() for unit in units.values() if unit for reading in unit]
+
+        if aggregate:
+            return await self.aggregate_async(readings)
+
+        return await self.decode_async(readings)
+
+    def _submit(self, readings, mode):
+        numpy = vector._require()
+        groups = _groups(readings)
+        plans = {group: _plan(*group) for group in groups}
+        size = sum(len(members) * _stride(plans[group]) for group, members in groups.items())
+        segment = shared_memory.SharedMemory(create=True, size=max(1, size * 2))
+        jobs = []
+
+        try:
+            offset = 0
+
+            for group, members in groups.items():
+                plan = plans[group]
+                stride = _stride(plan)
+                columns, valid = _columns(group[0], plan, members)
+                words = numpy.ndarray((len(members), stride), dtype=numpy.uint16, buffer=segment.buf, offset=offset * 2)
+                _fill(plan, words, columns)
+                del words
+
+                for start in range(0, len(members), self.batch_size):
+                    rows = min(self.batch_size, len(members) - start)
+                    job = (group, offset + start * stride, rows, valid[start:start + rows])
+                    future = self.executor.submit(_run, segment.name, job, self.scaling, self.normalise, mode)
+                    jobs.append(((group, [reading.key for reading in members[start:start + rows]]), future))
+
+                offset += len(members) * stride
+        except BaseException:
+            _release(segment)
+            raise
+
+        return segment, jobs
+
+
+def _groups(readings):
+    groups = {}
+
+    for reading in readings:
+        groups.setdefault((reading.model, reading.rtype, reading.max_registers, reading.max_gap), []).append(reading)
+
+    return groups
+
+
+def _stride(plan):
+    return sum(block.count for block in plan)
+
+
+def _words(data):
+    return array.array("H", data) if data else None
+
+
+def _columns(name, plan, members):
+    # Returns the words of each block of the plan as a (units, block.count)
+    # array, and the mask of blocks that were read.
+    numpy = vector._require()
+    valid = numpy.ones((len(members), len(plan)), dtype=bool)
+    readings = [reading.blocks for reading in members]
+    columns = []
+
+    if set(map(len, readings)) != {len(plan)}:
+        raise ValueError(f"Readings of {name} do not match its read plan")
+
+    for index, block in enumerate(plan):
+        column = list(map(operator.itemgetter(index), readings))
+
+        if None in column:
+            zeros = _zeros(block.count)
+
+            for row, data in enumerate(column):
+                if data is None:
+                    valid[row, index] = False
+                    column[row] = zeros
+
+        try:
+            # array("H") blocks, as collect() returns them, are joined as bytes.
+            column = numpy.frombuffer(b"".join(column), dtype=numpy.uint16)
+        except TypeError:
+            try:
+                column = numpy.asarray(column, dtype=numpy.uint16)
+            except (ValueError, OverflowError):
+                column = None
+
+        if column is None or column.size != len(members) * block.count:
+            raise ValueError(f"Readings of {name} do not match its read plan at {hex(block.address)}")
+
+        columns.append(column.reshape(len(members), block.count))
+
+    return columns, valid
+
+
+def _split(plan, words):
+    columns = []
+    position = 0
+
+    for block in plan:
+        columns.append(words[:, position:position + block.count])
+        position += block.count
+
+    return columns
+
+
+def _fill(plan, words, columns):
+    for target, column in zip(_split(plan, words), columns):
+        target[:] = column
+
+
+def _decode(plan, columns, valid, scaling, normalise):
+    numpy = vector._require()
+    fields = [field for block in plan for field, _ in block.entries if field.format is not None]
+    result = numpy.empty(len(valid), dtype=vector.dtype(fields))
+
+    for index, (block, column) in enumerate(zip(plan, columns)):
+        decoded = vector.decode(block, column, scaling, normalise)
+        missing = ~valid[:, index]
+
+        for key in decoded.dtype.names:
+            values = result[key]
+            values[:] = decoded[key]
+
+            if missing.any():
+                values[missing] = numpy.nan if values.dtype.kind == "f" else b""
+
+    return result
+
+
+def _aggregate(values):
+    numpy = vector._require()
+    aggregates = {}
+
+    for key in values.dtype.names:
+        column = values[key]
+
+        if column.dtype.kind != "f":
+            continue
+
+        column = column[~numpy.isnan(column)]
+
+        if len(column):
+            aggregates[key] = Aggregate(len(column), float(column.sum()), float(column.min()), float(column.max()))
+
+    return aggregates
+
+
+@functools.lru_cache(maxsize=None)
+def _zeros(count):
+    return array.array("H", bytes(2 * count))
+
+
+def _release(segment):
+    try:
+        segment.close()
+    finally:
+        segment.unlink()
+
+
+def _merge_records(results):
+    numpy = vector._require()
+    groups = {}
+
+    for (group, keys), values in results:
+        groups.setdefault(group, []).append((keys, values))
+
+    return [
+        Records(group[0], group[1], [key for keys, _ in batches for key in keys], numpy.concatenate([values for _, values in batches]))
+        for group, batches in groups.items()
+    ]
+
+
+def _merge_aggregates(merged, name, aggregates):
+    model = merged.setdefault(name, {})
+
+    for key, one in aggregates.items():
+        if key in model:
+            model[key].merge(one)
+        else:
+            model[key] = one
+
+
+def _initialize(directories):
+    if directories:
+        from sdm_modbus_modified import profiles
+
+        for directory in directories:
+            profiles.load_directory(directory)
+
+
+@functools.lru_cache(maxsize=None)
+def _plan(name, rtype, max_registers, max_gap):
+    model = registry.get(name)
+
+    return tuple(regmap.for_model(model).plan(rtype, max_registers, max_gap))
+
+
+def _run(segment_name, job, scaling, normalise, mode):
+    # Runs in a worker: decodes its rows of the shared segment column-wise
+    # and sends back the packed records, or only their aggregates.
+    numpy = vector._require()
+    group, offset, rows, valid = job
+    plan = _plan(*group)
+    segment = shared_memory.SharedMemory(name=segment_name)
+
+    try:
+        words = numpy.ndarray((rows, _stride(plan)), dtype=numpy.uint16, buffer=segment.buf, offset=offset * 2).copy()
+    finally:
+        segment.close()
+
+    values = _decode(plan, _split(plan, words), valid, scaling, normalise)
+
+    if mode == DECODE:
+        return values
+
+    return _aggregate(values)
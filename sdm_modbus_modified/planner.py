@@ -0,0 +1,136 @@
+MAX_REGISTERS = 125
+MAX_GAP = 32
+MAX_WRITE_REGISTERS = 123
+
+
+class ReadBlock:
+    """One contiguous register read: `fields` holds (key, offset, length) relative to `address`."""
+
+    __slots__ = ("address", "count", "fields")
+
+    def __init__(self, address, count, fields):
+        self.address = address
+        self.count = count
+        self.fields = fields
+
+    def __repr__(self):
+        return f"ReadBlock({hex(self.address)}, count={self.count}, fields={len(self.fields)})"
+
+    @property
+    def keys(self):
+        return tuple(key for key, _, _ in self.fields)
+
+    @property
+    def used(self):
+        used = set()
+
+        for _, offset, length in self.fields:
+            used.update(range(offset, offset + length))
+
+        return len(used)
+
+
+class ReadPlan:
+    """The set of block reads needed to fetch a group of registers."""
+
+    __slots__ = ("blocks",)
+
+    def __init__(self, blocks):
+        self.blocks = tuple(blocks)
+
+    def __repr__(self):
+        return f"ReadPlan(transactions={self.transactions}, words={self.words}, used={self.used})"
+
+    def __iter__(self):
+        return iter(self.blocks)
+
+    def __len__(self):
+        return len(self.blocks)
+
+    @property
+    def transactions(self):
+        return len(self.blocks)
+
+    @property
+    def words(self):
+        return sum(block.count for block in self.blocks)
+
+    @property
+    def used(self):
+        return sum(block.used for block in self.blocks)
+
+
+def plan_reads(spans, max_registers=MAX_REGISTERS, max_gap=MAX_GAP):
+    """Groups (key, address, length) spans into the fewest block reads.
+
+    Unused gaps of up to `max_gap` words are read through, and a block holds at
+    most `max_registers` words unless a single register is longer.
+    """
+
+    if max_registers < 1:
+        raise ValueError(f"max_registers must be positive: {max_registers}")
+    if max_gap < 0:
+        raise ValueError(f"max_gap must not be negative: {max_gap}")
+
+    blocks = []
+    start = end = None
+    members = []
+
+    for key, address, length in sorted(spans, key=lambda span: (span[1], span[2])):
+        if (start is not None
+                and address - end <= max_gap
+                and max(end, address + length) - start <= max_registers):
+            end = max(end, address + length)
+            members.append((key, address, length))
+            continue
+
+        if start is not None:
+            blocks.append(_block(start, end, members))
+
+        start = address
+        end = address + length
+        members = [(key, address, length)]
+
+    if start is not None:
+        blocks.append(_block(start, end, members))
+
+    return ReadPlan(blocks)
+
+
+def plan_writes(spans, max_registers=MAX_WRITE_REGISTERS):
+    """Groups (key, address, length) spans into the fewest multi-register writes.
+
+    Only adjacent spans are merged; overlapping spans raise ValueError.
+    """
+
+    if max_registers < 1:
+        raise ValueError(f"max_registers must be positive: {max_registers}")
+
+    blocks = []
+    start = end = None
+    members = []
+
+    for key, address, length in sorted(spans, key=lambda span: span[1]):
+        if end is not None and address < end:
+            raise ValueError(f"{key} overlaps {members[-1][0]} at {hex(address)}")
+
+        if start is not None and address == end and end + length - start <= max_registers:
+            end += length
+            members.append((key, address, length))
+            continue
+
+        if start is not None:
+            blocks.append(_block(start, end, members))
+
+        start = address
+        end = address + length
+        members = [(key, address, length)]
+
+    if start is not None:
+        blocks.append(_block(start, end, members))
+
+    return ReadPlan(blocks)
+
+
+def _block(start, end, members):
+    return ReadBlock(start, end - start, tuple((key, address - start, length) for key, address, length in members))
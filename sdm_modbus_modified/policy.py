@@ -0,0 +1,175 @@
+import collections
+import threading
+import time
+
+from pymodbus.exceptions import ModbusIOException
+
+
+class Quarantined(ModbusIOException):
+    """Raised instead of a request to a unit that is quarantined until its next probe."""
+
+    def __init__(self, key, until):
+        bus, unit = key
+        super().__init__(f"Unit {unit} on {bus} quarantined, next probe in {max(0.0, until - time.monotonic()):.1f}s")
+        self.bus = bus
+        self.unit = unit
+        self.until = until
+
+
+class UnitState:
+    """Round-trip history and failure state of one unit id."""
+
+    __slots__ = ("rtts", "failures", "probes", "until")
+
+    def __init__(self, window):
+        self.rtts = collections.deque(maxlen=window)
+        self.failures = 0
+        self.probes = 0
+        self.until = None
+
+    def __repr__(self):
+        return f"UnitState(samples={len(self.rtts)}, failures={self.failures}, quarantined={self.until is not None})"
+
+
+class Policy:
+    """Adaptive timeout, retry and quarantine policy for the units of one or more buses.
+
+    Assign it to Meter.policy. Timeouts follow each unit's recent round trips,
+    failing units get one attempt, and after `threshold` failures a unit is
+    quarantined, probed with a growing `backoff`. Units are keyed by
+    (meter.bus_key, unit id).
+    """
+
+    def __init__(self, retries=3, percentile=0.95, margin=3.0, min_timeout=0.05, max_timeout=1.0,
+                 warmup=5, window=64, threshold=3, backoff=5.0, max_backoff=300.0, clock=time.monotonic):
+        self.retries = retries
+        self.percentile = percentile
+        self.margin = margin
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.warmup = warmup
+        self.window = window
+        self.threshold = threshold
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.units = {}
+
+    def __repr__(self):
+        return f"Policy({len(self.units)} units, {len(self.quarantined())} quarantined)"
+
+    def _state(self, key):
+        state = self.units.get(key)
+
+        if state is None:
+            state = self.units[key] = UnitState(self.window)
+
+        return state
+
+    def timeout(self, key):
+        state = self.units.get(key)
+
+        if state is None or len(state.rtts) < self.warmup:
+            return self.max_timeout
+
+        rtts = sorted(state.rtts)
+        rtt = rtts[min(len(rtts) - 1, int(len(rtts) * self.percentile))]
+
+        return min(self.max_timeout, max(self.min_timeout, rtt * self.margin))
+
+    def attempts(self, key):
+        state = self.units.get(key)
+
+        if state is None or not state.failures:
+            return self.retries
+
+        return 1
+
+    def allow(self, key):
+        """Returns whether a request to the unit `key` may go out now; raises Quarantined otherwise."""
+
+        state = self.units.get(key)
+
+        if state is None or state.until is None:
+            return True
+
+        if self.clock() < state.until:
+            raise Quarantined(key, state.until)
+
+        return True
+
+    def prepare(self, client, key):
+        """Sets the timeout of the next request on `client`, a pymodbus client or a wrapper of one.
+
+        Returns the previous settings, to be handed to restore() once the request is done.
+        """
+
+        params = getattr(client, "comm_params", None)
+        transaction = getattr(client, "transaction", None) or getattr(client, "ctx", None)
+        saved = (
+            params.timeout_connect if params is not None else None,
+            transaction.retries if transaction is not None else None,
+        )
+
+        if params is not None:
+            params.timeout_connect = self.timeout(key)
+
+        if transaction is not None:
+            transaction.retries = 0
+
+        return saved
+
+    def restore(self, client, saved):
+        """Puts back the client settings returned by prepare()."""
+
+        timeout, retries = saved
+
+        if timeout is not None:
+            client.comm_params.timeout_connect = timeout
+
+        if retries is not None:
+            (getattr(client, "transaction", None) or getattr(client, "ctx", None)).retries = retries
+
+    def success(self, key, seconds):
+        with self.lock:
+            state = self._state(key)
+            state.rtts.append(seconds)
+            state.failures = 0
+            state.probes = 0
+            state.until = None
+
+    def failure(self, key):
+        with self.lock:
+            state = self._state(key)
+            state.failures += 1
+
+            if state.failures >= self.threshold:
+                delay = min(self.max_backoff, self.backoff * 2 ** state.probes)
+                state.probes += 1
+                state.until = self.clock() + delay
+
+    def quarantined(self):
+        return [key for key, state in self.units.items() if state.until is not None]
+
+    def reset(self, key=None):
+        with self.lock:
+            if key is None:
+                self.units = {}
+            else:
+                self.units.pop(key, None)
+
+    def as_dict(self):
+        """Returns {bus key: {unit id: state}}."""
+
+        result = {}
+
+        for (bus, unit), state in sorted(self.units.items()):
+            result.setdefault(bus, {})[unit] = {
+                "samples": len(state.rtts),
+                "timeout": self.timeout((bus, unit)),
+                "failures": state.failures,
+                "quarantined": state.until is not None,
+            }
+
+        return result
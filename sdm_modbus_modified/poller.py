@@ -0,0 +1,160 @@
+import asyncio
+import time
+
+from sdm_modbus_modified import aio
+from sdm_modbus_modified import meter
+from sdm_modbus_modified import pipeline
+from sdm_modbus_modified import stream
+
+
+class PolledBus:
+    """One physical bus: an RS-485 segment behind a serial port or a TCP gateway."""
+
+    def __init__(self, name, root, devices, serialize=True):
+        self.name = name
+        self.root = root
+        self.serialize = serialize
+        self.lock = asyncio.Lock()
+        self.meters = {
+            unit: aio.asynchronous(model)(parent=root, unit=unit) for unit, model in devices.items()
+        }
+
+    def __repr__(self):
+        return f"PolledBus({self.name}, units={list(self.meters)})"
+
+
+class Poller:
+    """Polls a fleet of meters across many buses concurrently, one task per bus.
+
+    Units on one bus are read one at a time, unless it was added with
+    serialize=False. `cycle_times`, `read_times` and `errors` hold the duration
+    of the last pass per bus, when each unit's read completed and the exception
+    of each unit that failed.
+    """
+
+    def __init__(self, rtypes=(meter.registerType.INPUT,), scaling=False):
+        self.rtypes = tuple(rtypes)
+        self.scaling = scaling
+        self.buses = {}
+        self.cycle_times = {}
+        self.read_times = {}
+        self.errors = {}
+
+    def __repr__(self):
+        return f"Poller({list(self.buses.values())})"
+
+    @classmethod
+    def from_fleet(cls, fleet, **kwargs):
+        """Builds a Poller from {"gateways": [...], "buses": [...]}.
+
+        Each entry holds the connection keyword arguments of a Meter plus "devices",
+        a dict mapping unit id to model class.
+        """
+
+        poller = cls(**kwargs)
+
+        for gateway in fleet.get("gateways", ()):
+            gateway = dict(gateway)
+            poller.add_gateway(gateway.pop("host"), devices=gateway.pop("devices"), **gateway)
+
+        for bus in fleet.get("buses", ()):
+            bus = dict(bus)
+            poller.add_bus(bus.pop("device"), devices=bus.pop("devices"), **bus)
+
+        return poller
+
+    def add_gateway(self, host, devices, port=502, serialize=True, **kwargs):
+        name = f"{host}:{port}"
+        root = aio.AsyncMeter(host=host, port=port, **kwargs)
+        bus = self.buses[name] = PolledBus(name, root, devices, serialize)
+
+        return bus
+
+    def add_bus(self, device, devices, **kwargs):
+        root = aio.AsyncMeter(device=device, **kwargs)
+        bus = self.buses[device] = PolledBus(device, root, devices)
+
+        return bus
+
+    async def connect(self):
+        await asyncio.gather(*(bus.root.connect() for bus in self.buses.values()))
+
+    def disconnect(self):
+        for bus in self.buses.values():
+            bus.root.disconnect()
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *args):
+        self.disconnect()
+
+    async def _read_unit(self, bus, unit, device, raw=False):
+        results = {}
+
+        try:
+            if raw:
+                results = await pipeline.collect_async(device, self.rtypes, key=(bus.name, unit))
+            else:
+                for rtype in self.rtypes:
+                    results.update(await device.read_all(rtype, scaling=self.scaling))
+        except Exception as e:
+            self.read_times.setdefault(bus.name, {})[unit] = time.time()
+            self.errors.setdefault(bus.name, {})[unit] = e
+            return None
+
+        self.read_times.setdefault(bus.name, {})[unit] = time.time()
+        self.errors.get(bus.name, {}).pop(unit, None)
+
+        return results
+
+    async def _poll_bus(self, bus, raw=False):
+        results = {}
+        start = time.monotonic()
+
+        async with bus.lock:
+            if bus.serialize:
+                for unit, device in bus.meters.items():
+                    results[unit] = await self._read_unit(bus, unit, device, raw)
+            else:
+                values = await asyncio.gather(*(self._read_unit(bus, unit, device, raw) for unit, device in bus.meters.items()))
+                results = dict(zip(bus.meters, values))
+
+        self.cycle_times[bus.name] = time.monotonic() - start
+
+        return results
+
+    async def cycle(self):
+        """Polls every bus once and returns {bus name: {unit: read_all results or None}}."""
+
+        buses = list(self.buses.values())
+        results = await asyncio.gather(*(self._poll_bus(bus) for bus in buses))
+
+        return {bus.name: values for bus, values in zip(buses, results)}
+
+    async def collect(self):
+        """Polls every bus once like cycle without decoding, returns {bus name: {unit: [pipeline.RawReading] or None}}."""
+
+        buses = list(self.buses.values())
+        results = await asyncio.gather(*(self._poll_bus(bus, raw=True) for bus in buses))
+
+        return {bus.name: values for bus, values in zip(buses, results)}
+
+    async def run(self, interval=1.0, cycles=None):
+        """Async generator yielding the results of a cycle every `interval` seconds."""
+
+        count = 0
+
+        while cycles is None or count < cycles:
+            start = time.monotonic()
+
+            yield await self.cycle()
+
+            count += 1
+            await asyncio.sleep(max(0, interval - (time.monotonic() - start)))
+
+    def stream(self, interval=1.0, cycles=None, maxsize=0):
+        """Async generator yielding a stream.Sample per unit and cycle, see stream.stream_poller."""
+
+        return stream.stream_poller(self, interval, cycles, maxsize)
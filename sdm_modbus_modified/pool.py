@@ -0,0 +1,160 @@
+import threading
+import time
+
+IDLE_TIMEOUT = 30
+
+
+class SharedClient:
+    """A reference-counted pymodbus client shared by every Meter on one port or host.
+
+    Transactions hold `lock`, so threads never interleave frames on the bus. The
+    client is closed once unused for the pool's idle timeout. `options` are the
+    settings it was opened with.
+    """
+
+    def __init__(self, pool, key, client, options=None):
+        self.pool = pool
+        self.key = key
+        self.client = client
+        self.options = options or {}
+        self.lock = threading.RLock()
+        self.refs = 0
+        self.released = None
+
+    def __repr__(self):
+        return f"SharedClient({self.key}, refs={self.refs})"
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def retain(self):
+        with self.pool.lock:
+            self.refs += 1
+            self.released = None
+
+        return self
+
+    def connect(self):
+        with self.lock:
+            if self.client.is_socket_open():
+                return True
+
+            return self.client.connect()
+
+    def close(self):
+        self.pool.release(self)
+
+    def is_socket_open(self):
+        return self.client.is_socket_open()
+
+    def check(self):
+        """Reconnects the client if its socket or port has been closed, returns whether it is open."""
+
+        with self.lock:
+            if not self.client.is_socket_open():
+                self.client.connect()
+
+            return self.client.is_socket_open()
+
+    def read_input_registers(self, *args, **kwargs):
+        with self.lock:
+            return self.client.read_input_registers(*args, **kwargs)
+
+    def read_holding_registers(self, *args, **kwargs):
+        with self.lock:
+            return self.client.read_holding_registers(*args, **kwargs)
+
+    def write_registers(self, *args, **kwargs):
+        with self.lock:
+            return self.client.write_registers(*args, **kwargs)
+
+
+class ConnectionPool:
+    """Registry of SharedClients keyed by connection parameters."""
+
+    def __init__(self, idle_timeout=IDLE_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        self.lock = threading.RLock()
+        self.clients = {}
+
+    def __repr__(self):
+        return f"ConnectionPool({list(self.clients.values())})"
+
+    def acquire(self, key, factory, options=None):
+        """Returns the SharedClient for `key`, creating it with `factory()` if needed.
+
+        Raises ValueError if the client is already open with other `options`.
+        """
+
+        options = options or {}
+
+        with self.lock:
+            self.sweep()
+
+            shared = self.clients.get(key)
+
+            if shared is None:
+                shared = self.clients[key] = SharedClient(self, key, factory(), options)
+            elif shared.options != options:
+                raise ValueError(f"{key} is already open with {shared.options}, not {options}; "
+                                 "use the same settings or shared=False")
+
+            return shared.retain()
+
+    def release(self, shared):
+        with self.lock:
+            if shared.refs > 0:
+                shared.refs -= 1
+
+            if shared.refs:
+                return
+
+            shared.released = time.monotonic()
+
+        if self.idle_timeout <= 0:
+            self.sweep()
+        else:
+            timer = threading.Timer(self.idle_timeout, self.sweep)
+            timer.daemon = True
+            timer.start()
+
+    def sweep(self):
+        """Closes and forgets clients that have had no references for longer than the idle timeout."""
+
+        now = time.monotonic()
+
+        with self.lock:
+            for key, shared in list(self.clients.items()):
+                if shared.refs or shared.released is None:
+                    continue
+                if now - shared.released < self.idle_timeout:
+                    continue
+
+                del self.clients[key]
+
+                with shared.lock:
+                    shared.client.close()
+
+    def check(self):
+        """Health-checks every pooled client, reconnecting closed ones. Returns {key: open}."""
+
+        with self.lock:
+            clients = list(self.clients.items())
+
+        return {key: shared.check() for key, shared in clients}
+
+    def close(self):
+        with self.lock:
+            clients = list(self.clients.values())
+            self.clients.clear()
+
+        for shared in clients:
+            with shared.lock:
+                shared.client.close()
+
+
+default = ConnectionPool()
+
+
+def acquire(key, factory, options=None):
+    return default.acquire(key, factory, options)
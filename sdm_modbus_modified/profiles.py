@@ -0,0 +1,268 @@
+import hashlib
+import json
+import os
+import re
+
+from pymodbus.constants import Endian
+
+from sdm_modbus_modified import meter
+from sdm_modbus_modified import planner
+from sdm_modbus_modified import registry
+from sdm_modbus_modified import regmap
+
+CACHE_FORMAT = 1
+
+EXTENSIONS = (".json", ".toml", ".yaml", ".yml")
+
+ATTRIBUTES = ("model", "baud", "parity", "stopbits", "byteorder", "wordorder", "max_registers", "max_gap", "deadbands")
+
+VTYPES = {"int": int, "float": float, "bytes": bytes, "str": str}
+
+ORDERS = {"big": Endian.BIG, "little": Endian.LITTLE}
+
+FIELDS = ("address", "length", "type", "dtype", "vtype", "label", "unit", "batch", "scale", "decimals")
+
+_MISSING = object()
+
+_loaded = {}
+
+
+def __getattr__(name):
+    # Classes built from profiles resolve as attributes of this module, e.g. for snapshot.Snapshot.load.
+    try:
+        return _loaded[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+
+
+def default_cache_directory():
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "sdm_modbus_modified", "profiles")
+
+
+def load(path, cache=True, cache_directory=None, register=True):
+    """Builds a Meter subclass from a declarative register map profile (JSON, TOML or YAML).
+
+    A profile holds a registry `name`, optional class attributes and `registers`,
+    as register map tuples or tables with the names in FIELDS. The validated and
+    planned result is cached under `cache_directory` by the file's SHA-256, and
+    registered unless register is False.
+    """
+
+    with open(path, "rb") as f:
+        source = f.read()
+
+    digest = hashlib.sha256(source + str(CACHE_FORMAT).encode()).hexdigest()
+    cached = None
+
+    if cache:
+        cache_path = os.path.join(cache_directory or default_cache_directory(), f"{digest}.json")
+
+        try:
+            with open(cache_path) as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            cached = None
+
+    if cached is None or cached.get("format") != CACHE_FORMAT:
+        cached = compile_profile(_parse(path, source), path)
+
+        if cache:
+            _save(cache_path, cached)
+
+    cls = _build(cached)
+
+    if register:
+        registry.register(cached["name"], cls)
+
+    return cls
+
+
+def load_directory(directory, cache=True, cache_directory=None, register=True):
+    """Loads every profile in `directory`, returns {name: Meter class}."""
+
+    models = {}
+
+    for entry in sorted(os.listdir(directory)):
+        if entry.endswith(EXTENSIONS):
+            cls = load(os.path.join(directory, entry), cache, cache_directory, register)
+            models[registry.name_of(cls) or cls.__name__] = cls
+
+    return models
+
+
+def compile_profile(document, path="<profile>"):
+    """Validates a parsed profile and plans its reads, returns the JSON-serialisable compiled form."""
+
+    if not isinstance(document, dict) or "name" not in document or "registers" not in document:
+        raise ValueError(f"{path}: a profile needs a name and registers")
+
+    attributes = {key: document[key] for key in ATTRIBUTES if key in document}
+    attributes.setdefault("model", document["name"])
+
+    for key in ("byteorder", "wordorder"):
+        if attributes.get(key, "big") not in ORDERS:
+            raise ValueError(f"{path}: {key} must be one of {', '.join(ORDERS)}")
+
+    registers = {}
+
+    for key, spec in document["registers"].items():
+        try:
+            registers[key] = _register(key, spec)
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"{path}: register {key}: {e}") from None
+
+    max_registers = attributes.get("max_registers", planner.MAX_REGISTERS)
+    max_gap = attributes.get("max_gap", planner.MAX_GAP)
+    plans = {}
+
+    for rtype in meter.registerType:
+        spans = [(key, entry[0], entry[1]) for key, entry in registers.items() if entry[2] == rtype.name]
+        plans[rtype.name] = [
+            [block.address, block.count, [list(member) for member in block.fields]]
+            for block in planner.plan_reads(spans, max_registers, max_gap)
+        ]
+
+    return {
+        "format": CACHE_FORMAT,
+        "name": document["name"],
+        "attributes": attributes,
+        "registers": registers,
+        "plans": plans,
+    }
+
+
+def dump(model, path, name=None):
+    """Writes the register map of a Meter class as a JSON profile that load() turns back into an equivalent class."""
+
+    document = {"name": name or registry.name_of(model) or model.__name__, "model": model.model}
+
+    for key in ("baud", "parity", "stopbits", "max_registers", "max_gap"):
+        document[key] = getattr(model, key)
+
+    for key in ("byteorder", "wordorder"):
+        document[key] = "little" if getattr(model, key) == Endian.LITTLE else "big"
+
+    document["registers"] = {
+        key: [value[0], value[1], value[2].name.lower(), value[3].name, value[4].__name__, *value[5:]]
+        for key, value in model.registers.items()
+    }
+
+    with open(path, "w") as f:
+        json.dump(document, f, indent=1, ensure_ascii=False)
+
+
+def _register(key, spec):
+    if isinstance(spec, dict):
+        unknown = set(spec) - set(FIELDS)
+
+        if unknown:
+            raise ValueError(f"unknown fields {', '.join(sorted(unknown))}")
+
+        spec = [spec.get(name, _MISSING) for name in FIELDS]
+
+        while spec and spec[-1] is _MISSING:
+            spec.pop()
+    else:
+        spec = list(spec)
+
+    if len(spec) < 4 or len(spec) > len(FIELDS) or _MISSING in spec[:4]:
+        raise ValueError("needs at least address, length, type and dtype")
+
+    address = int(spec[0], 0) if isinstance(spec[0], str) else int(spec[0])
+    length = int(spec[1])
+    rtype = _member(meter.registerType, spec[2])
+    dtype = _member(meter.registerDataType, spec[3])
+
+    defaults = [_vtype_name(dtype), key, "", 1, 1]
+    rest = [default if value is _MISSING else value for value, default in zip(spec[4:9] + [_MISSING] * 5, defaults)]
+
+    if rest[0] not in VTYPES:
+        raise ValueError(f"vtype must be one of {', '.join(VTYPES)}")
+
+    entry = [address, length, rtype.name, dtype.name, *rest]
+
+    if len(spec) > 9 and spec[9] is not _MISSING:
+        entry.append(spec[9])
+
+    return entry
+
+
+def _member(enum, name):
+    try:
+        return enum[str(name).upper()]
+    except KeyError:
+        raise ValueError(f"{name!r} is not one of {', '.join(member.name for member in enum)}") from None
+
+
+def _vtype_name(dtype):
+    if dtype in (meter.registerDataType.FLOAT16, meter.registerDataType.FLOAT32):
+        return "float"
+    elif dtype in (meter.registerDataType.BYTES, meter.registerDataType.STRING):
+        return "bytes"
+    else:
+        return "int"
+
+
+def _build(compiled):
+    attributes = dict(compiled["attributes"])
+
+    for key in ("byteorder", "wordorder"):
+        attributes[key] = ORDERS[attributes.get(key, "big")]
+
+    registers = {
+        key: (entry[0], entry[1], meter.registerType[entry[2]], meter.registerDataType[entry[3]],
+              VTYPES[entry[4]], *entry[5:])
+        for key, entry in compiled["registers"].items()
+    }
+
+    class_name = re.sub(r"\W", "_", compiled["name"])
+    cls = type(class_name, (meter.Meter,), dict(attributes, registers=registers, __module__=__name__))
+
+    regmap.install(cls, {
+        meter.registerType[rtype_name]: [
+            planner.ReadBlock(address, count, tuple(tuple(member) for member in fields)) for address, count, fields in blocks
+        ]
+        for rtype_name, blocks in compiled["plans"].items()
+    })
+    _loaded[class_name] = cls
+
+    return cls
+
+
+def _parse(path, source):
+    if path.endswith(".json"):
+        return json.loads(source)
+    elif path.endswith(".toml"):
+        try:
+            import tomllib
+        except ImportError:
+            try:
+                import tomli as tomllib
+            except ImportError:
+                raise ImportError("tomli is required for TOML profiles before Python 3.11, install sdm_modbus_modified[toml]") from None
+
+        return tomllib.loads(source.decode())
+    elif path.endswith((".yaml", ".yml")):
+        try:
+            import yaml
+        except ImportError:
+            raise ImportError("PyYAML is required for YAML profiles, install sdm_modbus_modified[yaml]") from None
+
+        return yaml.safe_load(source)
+    else:
+        raise ValueError(f"{path}: unknown profile format, expected one of {', '.join(EXTENSIONS)}")
+
+
+def _save(path, compiled):
+    directory = os.path.dirname(path)
+
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    tmp = f"{path}.tmp"
+
+    with open(tmp, "w") as f:
+        json.dump(compiled, f, separators=(",", ":"))
+
+    os.replace(tmp, path)
@@ -0,0 +1,293 @@
+import bisect
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+import time
+from array import array
+
+CHUNK_ROWS = 3600
+MAGIC = b"SDMC"
+VERSION = 1
+
+_header = struct.Struct("<4sHI")
+
+
+class Chunk:
+    """A closed block of rows: a float64 timestamp column plus one column per key, in memory or mmapped from `path`."""
+
+    def __init__(self, keys, rows, start, end, path=None, offset=0, columns=None, byteorder=sys.byteorder):
+        self.keys = tuple(keys)
+        self.rows = rows
+        self.start = start
+        self.end = end
+        self.path = path
+        self.offset = offset
+        self.columns = columns
+        self.byteorder = byteorder
+
+    def __repr__(self):
+        return f"Chunk({self.path or 'memory'}, rows={self.rows}, keys={len(self.keys)})"
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            magic, version, size = _header.unpack(f.read(_header.size))
+
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{path} is not a recorder chunk")
+
+            header = json.loads(f.read(size))
+
+        offset = _aligned(_header.size + size)
+
+        return cls(header["keys"], header["rows"], header["start"], header["end"], path, offset,
+                   byteorder=header["byteorder"])
+
+    def write(self, path):
+        header = json.dumps({
+            "keys": self.keys,
+            "rows": self.rows,
+            "start": self.start,
+            "end": self.end,
+            "byteorder": self.byteorder,
+        }).encode()
+        offset = _aligned(_header.size + len(header))
+        tmp = f"{path}.tmp"
+
+        with open(tmp, "wb") as f:
+            f.write(_header.pack(MAGIC, VERSION, len(header)))
+            f.write(header)
+            f.write(bytes(offset - f.tell()))
+
+            for column in self.columns:
+                column[:self.rows].tofile(f)
+
+        os.replace(tmp, path)
+
+        self.path = path
+        self.offset = offset
+        self.columns = None
+
+    def read(self, start, end, keys):
+        """Returns (timestamps, {key: column}) for the rows with start <= timestamp < end."""
+
+        if self.path is None:
+            return self._slice(self.columns, start, end, keys)
+
+        with open(self.path, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                size = 8 * self.rows
+
+                with memoryview(mapped) as view:
+                    columns = [view[self.offset + size * i:self.offset + size * (i + 1)].cast("d") for i in range(len(self.keys) + 1)]
+
+                    try:
+                        timestamps, values = self._slice(columns, start, end, keys)
+                    finally:
+                        for column in columns:
+                            column.release()
+
+        if self.byteorder != sys.byteorder:
+            timestamps.byteswap()
+
+            for column in values.values():
+                column.byteswap()
+
+        return timestamps, values
+
+    def _slice(self, columns, start, end, keys):
+        timestamps = columns[0]
+        rows = self.rows
+        low = 0 if start is None else bisect.bisect_left(timestamps, start, 0, rows)
+        high = rows if end is None else bisect.bisect_left(timestamps, end, low, rows)
+        index = {key: i for i, key in enumerate(self.keys, 1)}
+        values = {}
+
+        for key in keys:
+            i = index.get(key)
+
+            if i is None:
+                values[key] = array("d", [math.nan]) * (high - low)
+            else:
+                values[key] = _copy(columns[i], low, high)
+
+        return _copy(timestamps, low, high), values
+
+
+class Recorder:
+    """Columnar time-series store for the readings of one meter.
+
+    Rows go to an array("d") column per key, NaN where a key is missing; only
+    numbers are recorded, bytes and strings are left out. Every `chunk_rows`
+    rows the chunk is closed and, with a `directory`, written to its own file
+    named `name`-NNNNNNNN.col. Rows of the open chunk are only on disk after
+    flush() or close(), a crash loses them. Timestamps must be appended in
+    increasing order.
+    """
+
+    def __init__(self, directory=None, name="meter", keys=None, chunk_rows=CHUNK_ROWS):
+        self.directory = directory
+        self.name = name
+        self.chunk_rows = chunk_rows
+        self.chunks = []
+        self.sequence = 0
+
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+            pattern = re.compile(rf"{re.escape(name)}-(\d{{8}})\.col")
+
+            for filename in sorted(os.listdir(directory)):
+                match = pattern.fullmatch(filename)
+
+                if match:
+                    self.chunks.append(Chunk.load(os.path.join(directory, filename)))
+                    self.sequence = max(self.sequence, int(match.group(1)) + 1)
+
+            self.chunks.sort(key=lambda chunk: chunk.start)
+
+        self._open(keys or ())
+
+    def __repr__(self):
+        return f"Recorder({self.directory or 'memory'}/{self.name}, chunks={len(self.chunks)}, rows={self.rows})"
+
+    def __len__(self):
+        return self.rows
+
+    @property
+    def rows(self):
+        return sum(chunk.rows for chunk in self.chunks) + self._rows
+
+    @property
+    def keys(self):
+        keys = dict.fromkeys(self._keys)
+
+        for chunk in self.chunks:
+            keys.update(dict.fromkeys(chunk.keys))
+
+        return tuple(keys)
+
+    def _open(self, keys):
+        self._keys = tuple(keys)
+        self._index = {key: i for i, key in enumerate(self._keys, 1)}
+        self._columns = [array("d", bytes(8 * self.chunk_rows)) for _ in range(len(self._keys) + 1)]
+        self._rows = 0
+
+    def flush(self):
+        """Closes the open chunk, writing it to disk when the recorder has a directory."""
+
+        if not self._rows:
+            return
+
+        timestamps = self._columns[0]
+        chunk = Chunk(self._keys, self._rows, timestamps[0], timestamps[self._rows - 1], columns=self._columns)
+
+        if self.directory is None:
+            chunk.columns = [column[:self._rows] for column in self._columns]
+        else:
+            chunk.write(os.path.join(self.directory, f"{self.name}-{self.sequence:08d}.col"))
+            self.sequence += 1
+
+        self.chunks.append(chunk)
+        self._open(self._keys)
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def append(self, values, timestamp=None):
+        """Appends one row: a {key: value} dict as returned by Meter.read_all, without its non-numeric values."""
+
+        if timestamp is None:
+            timestamp = time.time()
+
+        values = {key: value for key, value in values.items() if isinstance(value, (int, float))}
+        index = self._index
+
+        if any(key not in index for key in values):
+            self.flush()
+            self._open(self._keys + tuple(key for key in values if key not in index))
+            index = self._index
+
+        row = self._rows
+        columns = self._columns
+        columns[0][row] = timestamp
+
+        for column in columns[1:]:
+            column[row] = math.nan
+
+        for key, value in values.items():
+            columns[index[key]][row] = value
+
+        self._rows = row + 1
+
+        if self._rows == self.chunk_rows:
+            self.flush()
+
+    def record(self, sample):
+        """Appends a stream.Sample; failed samples are skipped."""
+
+        if sample.values is not None:
+            self.append(sample.values, sample.timestamp)
+
+    def poll(self, device, rtype=None, scaling=False):
+        """Reads every register of `rtype` from `device` with read_all and appends the row."""
+
+        timestamp = time.time()
+
+        if rtype is None:
+            values = device.read_all(scaling=scaling)
+        else:
+            values = device.read_all(rtype, scaling=scaling)
+
+        self.append(values, timestamp)
+
+        return values
+
+    def query(self, start=None, end=None, keys=None):
+        """Returns (timestamps, {key: array("d")}) for the rows with start <= timestamp < end.
+
+        Keys default to every key recorded; rows from chunks without a key hold NaN.
+        """
+
+        keys = self.keys if keys is None else tuple(keys)
+        timestamps = array("d")
+        values = {key: array("d") for key in keys}
+        chunks = list(self.chunks)
+
+        if self._rows:
+            chunks.append(Chunk(self._keys, self._rows, self._columns[0][0], self._columns[0][self._rows - 1],
+                                columns=self._columns))
+
+        for chunk in chunks:
+            if start is not None and chunk.end < start:
+                continue
+            if end is not None and chunk.start >= end:
+                continue
+
+            chunk_timestamps, chunk_values = chunk.read(start, end, keys)
+            timestamps.extend(chunk_timestamps)
+
+            for key in keys:
+                values[key].extend(chunk_values[key])
+
+        return timestamps, values
+
+
+def _copy(column, low, high):
+    result = array("d")
+    result.frombytes(memoryview(column)[low:high].cast("B"))
+    return result
+
+
+def _aligned(offset):
+    return (offset + 7) & ~7
@@ -0,0 +1,79 @@
+import importlib
+
+# Model name -> (module, class name). Modules are only imported when a model is resolved.
+MODELS = {
+    "SDM72V2": ("sdm", "SDM72V2"),
+    "SDM72": ("sdm", "SDM72"),
+    "SDM120": ("sdm", "SDM120"),
+    "SDM230": ("sdm", "SDM230"),
+    "SDM630": ("sdm", "SDM630"),
+    "SDM54-2T": ("sdm", "SDM54_2T"),
+    "GNM3D": ("garo", "GNM3D"),
+    "ESP-P1": ("espp1", "ESPP1"),
+    "TAC4300-CT": ("taiyedq", "TAC4300_CT"),
+    "WS100-19": ("ws100", "WS100_19XX"),
+}
+
+ALIASES = {
+    "ESP-P1-MODBUS": "ESP-P1",
+}
+
+
+def _key(name):
+    return name.strip().upper().replace("_", "-")
+
+
+_names = {_key(alias): name for alias, name in ALIASES.items()}
+_registered = {}
+
+for _name, (_module, _class) in MODELS.items():
+    _names[_key(_name)] = _name
+    _names[_key(_class)] = _name
+
+
+def names():
+    return list(MODELS) + [name for name in _registered if name not in MODELS]
+
+
+def register(name, model):
+    """Registers a Meter class under `name`, e.g. one built by profiles.load, taking precedence over MODELS."""
+
+    _registered[name] = model
+    _names[_key(name)] = name
+    _names.setdefault(_key(model.__name__), name)
+
+
+def canonical(name):
+    """Returns the registered name of a model name, class name or alias, e.g. "ws100_19xx" -> "WS100-19"."""
+
+    try:
+        return _names[_key(name)]
+    except KeyError:
+        raise KeyError(f"Unknown model: {name}") from None
+
+
+def get(name):
+    """Returns the Meter class of a model, importing only the module that defines it."""
+
+    name = canonical(name)
+
+    if name in _registered:
+        return _registered[name]
+
+    module_name, class_name = MODELS[name]
+
+    return getattr(importlib.import_module(f"sdm_modbus_modified.{module_name}"), class_name)
+
+
+def name_of(model):
+    """Returns the registered name of a Meter class, or None."""
+
+    for name, registered in _registered.items():
+        if registered is model:
+            return name
+
+    for name, (module_name, class_name) in MODELS.items():
+        if model.__name__ == class_name and model.__module__ == f"sdm_modbus_modified.{module_name}":
+            return name
+
+    return None
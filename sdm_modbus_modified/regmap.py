@@ -0,0 +1,357 @@
+import functools
+import logging
+import struct
+from types import MappingProxyType
+
+from pymodbus.constants import Endian
+
+from sdm_modbus_modified import meter
+from sdm_modbus_modified import planner
+
+logger = logging.getLogger(__name__)
+
+# Units converted by Meter.normalise, with the factor applied on top of the scale.
+NORMALISED = {
+    "W": ("kW", 0.001),
+    "VA": ("kVA", 0.001),
+    "var": ("kvar", 0.001),
+    "VAr": ("kVAr", 0.001),
+    "Wh": ("kWh", 0.001),
+    "VAh": ("kVAh", 0.001),
+    "varh": ("kvarh", 0.001),
+    "VArh": ("kVArh", 0.001),
+    "mA": ("A", 0.001),
+}
+
+
+class Field:
+    """One compiled entry of a register map."""
+
+    __slots__ = ("key", "address", "length", "rtype", "dtype", "vtype", "label", "unit", "batch", "scale", "decimals", "factor",
+                 "normalised_unit", "normalised_factor", "format")
+
+    def __init__(self, key, value):
+        address, length, rtype, dtype, vtype, label, fmt, batch, sf = value[:9]
+
+        self.key = key
+        self.address = address
+        self.length = length
+        self.rtype = rtype
+        self.dtype = dtype
+        self.vtype = vtype
+        self.label = label
+        self.unit = fmt
+        self.batch = batch
+        self.scale = sf
+        self.decimals = value[9] if len(value) > 9 else None
+        self.factor = None if sf is None else sf * 10 ** -self.decimals if self.decimals else sf
+
+        if self.factor is not None and isinstance(fmt, str) and fmt in NORMALISED:
+            self.normalised_unit, multiplier = NORMALISED[fmt]
+            self.normalised_factor = self.factor * multiplier
+        else:
+            self.normalised_unit = fmt
+            self.normalised_factor = self.factor
+
+        self.format = _format(dtype, length)
+
+    def __repr__(self):
+        return f"Field({self.key}, {hex(self.address)}, {self.length}, {self.rtype}, {self.dtype})"
+
+
+class Block(planner.ReadBlock):
+    """A planned block read, decoded in one pass by a single precompiled struct.
+
+    Fields whose type and length cannot be decoded are left out and listed in
+    `skipped`.
+    """
+
+    __slots__ = ("rtype", "entries", "orders", "skipped", "_words", "_values", "_extras", "_names", "_conversions",
+                 "_scales", "_normalised")
+
+    def __init__(self, rtype, block, fields, byteorder=Endian.BIG, wordorder=Endian.BIG):
+        super().__init__(block.address, block.count, block.fields)
+
+        self.rtype = rtype
+        self.entries = tuple((fields[key], offset) for key, offset, _ in block.fields)
+
+        pack, unpack = _orders(byteorder, wordorder)
+        self.orders = pack, unpack
+        layout = []
+        names = []
+        extras = []
+        overlapping = []
+        skipped = []
+        position = 0
+
+        for field, offset in self.entries:
+            if field.format is None:
+                logger.warning("Skipping %s: cannot decode %s of length %d", field.key, field.dtype, field.length)
+                skipped.append(field.key)
+                continue
+
+            start = offset * 2
+
+            if start < position:
+                extras.append((struct.Struct(unpack + field.format), start))
+                overlapping.append(field)
+                continue
+            if start > position:
+                layout.append(f"{start - position}x")
+
+            layout.append(field.format)
+            names.append(field)
+            position = start + field.length * 2
+
+        if position < self.count * 2:
+            layout.append(f"{self.count * 2 - position}x")
+
+        names.extend(overlapping)
+
+        self.skipped = tuple(skipped)
+        self._words = struct.Struct(f"{pack}{self.count}H")
+        self._values = struct.Struct(unpack + "".join(layout))
+        self._extras = tuple(extras)
+        self._names = tuple(field.key for field in names)
+        self._conversions = tuple((i, field.vtype) for i, field in enumerate(names) if _native(field.format) is not field.vtype)
+        self._scales = tuple((i, field.factor) for i, field in enumerate(names) if field.factor not in (None, 1))
+        self._normalised = tuple(
+            (i, field.normalised_factor) for i, field in enumerate(names) if field.normalised_factor not in (None, 1)
+        )
+
+    def decode(self, data, scaling=False, normalise=False):
+        try:
+            raw = self._words.pack(*data)
+            values = self._values.unpack(raw)
+
+            if self._extras:
+                values += tuple(s.unpack_from(raw, offset)[0] for s, offset in self._extras)
+
+            scales = (self._normalised if normalise else self._scales) if scaling else ()
+
+            if self._conversions or scales:
+                values = list(values)
+
+                for i, vtype in self._conversions:
+                    values[i] = _convert(vtype, values[i])
+
+                for i, factor in scales:
+                    values[i] *= factor
+
+        except Exception as e:
+            raise ValueError(f"Could not decode block at {hex(self.address)}: {e}")
+
+        return dict(zip(self._names, values))
+
+
+class RegisterMap:
+    """A register map compiled once and shared by every meter of a model.
+
+    Fields are indexed by key, register type and legacy batch; read plans are
+    cached per register type, read policy and key selection.
+    """
+
+    def __init__(self, registers, byteorder, wordorder):
+        fields = {key: Field(key, value) for key, value in registers.items()}
+
+        self.source = registers
+        self.byteorder = byteorder
+        self.wordorder = wordorder
+
+        self.fields = MappingProxyType(fields)
+        self.rtypes = MappingProxyType({
+            rtype: tuple(f for f in fields.values() if f.rtype == rtype) for rtype in meter.registerType
+        })
+
+        batches = {}
+
+        for f in fields.values():
+            batches.setdefault((f.rtype, f.batch), []).append(f)
+
+        self.batches = MappingProxyType({k: tuple(v) for k, v in batches.items()})
+        self.units = MappingProxyType({key: f.unit for key, f in fields.items()})
+        self.normalised_units = MappingProxyType({key: f.normalised_unit for key, f in fields.items()})
+        self._plans = {}
+
+    def __repr__(self):
+        return f"RegisterMap({len(self.fields)} registers)"
+
+    def __contains__(self, key):
+        return key in self.fields
+
+    def __getitem__(self, key):
+        return self.fields[key]
+
+    def __iter__(self):
+        return iter(self.fields)
+
+    def __len__(self):
+        return len(self.fields)
+
+    def plan(self, rtype, max_registers=planner.MAX_REGISTERS, max_gap=planner.MAX_GAP, keys=None):
+        if keys is not None:
+            keys = frozenset(keys)
+
+        cache_key = (rtype, max_registers, max_gap, keys)
+
+        try:
+            return self._plans[cache_key]
+        except KeyError:
+            pass
+
+        if keys is None:
+            fields = self.rtypes[rtype]
+        else:
+            fields = [self.fields[k] for k in keys if self.fields[k].rtype == rtype]
+
+        plan = planner.plan_reads(((f.key, f.address, f.length) for f in fields), max_registers, max_gap)
+        plan = self._plans[cache_key] = planner.ReadPlan(
+            Block(rtype, block, self.fields, self.byteorder, self.wordorder) for block in plan
+        )
+
+        return plan
+
+    def add_plan(self, rtype, blocks, max_registers=planner.MAX_REGISTERS, max_gap=planner.MAX_GAP):
+        """Installs a plan of planner.ReadBlocks computed earlier for all registers of `rtype`, e.g. from a cache."""
+
+        self._plans[(rtype, max_registers, max_gap, None)] = planner.ReadPlan(
+            Block(rtype, block, self.fields, self.byteorder, self.wordorder) for block in blocks
+        )
+
+
+_compiled = {}
+_maps = {}
+_precomputed = {}
+
+
+def for_model(cls):
+    """Returns the RegisterMap of a Meter class, compiling it on first use; classes with the same registers share it."""
+
+    try:
+        return _compiled[cls]
+    except KeyError:
+        pass
+
+    key = (id(cls.registers), cls.byteorder, cls.wordorder)
+    compiled = _maps.get(key)
+
+    if compiled is None or compiled.source is not cls.registers:
+        compiled = _maps[key] = RegisterMap(cls.registers, cls.byteorder, cls.wordorder)
+
+        for rtype, blocks in _precomputed.get(cls, {}).items():
+            compiled.add_plan(rtype, blocks, cls.max_registers, cls.max_gap)
+
+    _compiled[cls] = compiled
+
+    return compiled
+
+
+def install(cls, plans):
+    """Sets read plans computed earlier for `cls`, {rtype: [planner.ReadBlock]}, used when its map is compiled."""
+
+    _compiled.pop(cls, None)
+    _precomputed[cls] = plans
+
+
+@functools.lru_cache(maxsize=None)
+def value_decoder(dtype, length, vtype, byteorder=Endian.BIG, wordorder=Endian.BIG):
+    """Returns a function decoding the register words of one value."""
+
+    fmt = _format(dtype, length)
+
+    if fmt is None:
+        raise NotImplementedError(f"Unsupported data type: {dtype}")
+
+    pack, unpack = _orders(byteorder, wordorder)
+    words = struct.Struct(f"{pack}{length}H")
+    value = struct.Struct(unpack + fmt)
+
+    if _native(fmt) is vtype:
+        return lambda data: value.unpack(words.pack(*data))[0]
+    else:
+        return lambda data: _convert(vtype, value.unpack(words.pack(*data))[0])
+
+
+@functools.lru_cache(maxsize=None)
+def value_encoder(dtype, length, byteorder=Endian.BIG, wordorder=Endian.BIG):
+    """Returns a function encoding one value into its register words, the inverse of value_decoder."""
+
+    fmt = _format(dtype, length)
+
+    if fmt is None and dtype != meter.registerDataType.BYTES:
+        # Fields declared wider or narrower than their type are written at the
+        # type's own width, e.g. one word for the INT16 reset_history of SDM72V2.
+        fmt = _code(dtype, length)
+        length = None if fmt is None else struct.calcsize(fmt) // 2
+
+    if fmt is None:
+        raise NotImplementedError(f"Unsupported data type: {dtype}")
+
+    pack, unpack = _orders(byteorder, wordorder)
+    words = struct.Struct(f"{pack}{length}H")
+    value = struct.Struct(unpack + fmt)
+
+    if _native(fmt) is int:
+        return lambda data: list(words.unpack(value.pack(int(data))))
+    else:
+        return lambda data: list(words.unpack(value.pack(data)))
+
+
+def _orders(byteorder, wordorder):
+    # Packing the words in the byte order that makes the wordorder and byteorder
+    # swaps cancel out lets every value be unpacked with the wordorder alone.
+    little_words = wordorder == Endian.LITTLE
+    little_bytes = byteorder == Endian.LITTLE
+
+    return ("<" if little_words != little_bytes else ">"), ("<" if little_words else ">")
+
+
+def _native(fmt):
+    if fmt in ("f", "e"):
+        return float
+    elif fmt.endswith("s"):
+        return bytes
+    else:
+        return int
+
+
+def _convert(vtype, value):
+    # NaN and infinities have no int value and stay floats, as in vector.decode.
+    try:
+        return vtype(value)
+    except (ValueError, OverflowError):
+        return value
+
+
+def _format(dtype, length):
+    fmt = _code(dtype, length)
+
+    if fmt is None or struct.calcsize(fmt) != length * 2:
+        return None
+
+    return fmt
+
+
+def _code(dtype, length):
+    if dtype == meter.registerDataType.FLOAT32:
+        fmt = "f"
+    elif dtype == meter.registerDataType.INT32:
+        fmt = "i"
+    elif dtype == meter.registerDataType.UINT32:
+        fmt = "I"
+    elif dtype == meter.registerDataType.INT16:
+        fmt = "h"
+    elif dtype == meter.registerDataType.UINT16:
+        fmt = "H"
+    elif dtype == meter.registerDataType.INT64:
+        fmt = "q"
+    elif dtype == meter.registerDataType.UINT64:
+        fmt = "Q"
+    elif dtype == meter.registerDataType.FLOAT16:
+        fmt = "e"
+    elif dtype == meter.registerDataType.BYTES:
+        fmt = f"{length * 2}s"
+    else:
+        return None
+
+    return fmt
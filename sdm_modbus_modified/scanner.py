@@ -0,0 +1,167 @@
+import asyncio
+import time
+
+import pymodbus.exceptions
+
+from sdm_modbus_modified import aio
+from sdm_modbus_modified import meter
+
+PROBE_TIMEOUT = 0.1
+REPROBES = 1
+BACKOFF = 2.0
+UNITS = range(1, 248)
+
+
+class BusScan:
+    """Scan result of one bus.
+
+    `units` maps each id that answered to its latency in seconds, `exceptions`
+    to the exception code it answered with; `timeouts` lists silent ids.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.units = {}
+        self.exceptions = {}
+        self.timeouts = []
+        self.rounds = 0
+        self.duration = 0
+        self.error = None
+
+    def __repr__(self):
+        return f"BusScan({self.name}, found={self.found}, duration={self.duration:.3f}s)"
+
+    @property
+    def found(self):
+        return sorted(self.units)
+
+
+class Scanner:
+    """Finds the responding unit ids on serial buses and TCP gateways.
+
+    Each id gets one short probe without retries; ids that timed out are probed
+    again up to `reprobes` times with a timeout growing by `backoff`. Buses are
+    scanned concurrently.
+    """
+
+    def __init__(self, units=UNITS, probe=(meter.registerType.INPUT, 0x0000, 2),
+                 timeout=PROBE_TIMEOUT, reprobes=REPROBES, backoff=BACKOFF):
+        self.units = list(units)
+        self.probe = probe
+        self.timeout = timeout
+        self.reprobes = reprobes
+        self.backoff = backoff
+        self.buses = {}
+
+    def __repr__(self):
+        return f"Scanner({list(self.buses)}, units={len(self.units)})"
+
+    def add_bus(self, device, **kwargs):
+        self.buses[device] = dict(kwargs, device=device)
+
+    def add_gateway(self, host, port=502, **kwargs):
+        self.buses[f"{host}:{port}"] = dict(kwargs, host=host, port=port)
+
+    async def _probe(self, client, unit):
+        rtype, address, count = self.probe
+        start = time.monotonic()
+
+        try:
+            if rtype == meter.registerType.INPUT:
+                response = await client.read_input_registers(address, count=count, slave=unit)
+            elif rtype == meter.registerType.HOLDING:
+                response = await client.read_holding_registers(address, count=count, slave=unit)
+            else:
+                raise NotImplementedError(rtype)
+        except (pymodbus.exceptions.ModbusException, asyncio.TimeoutError):
+            return None, None
+
+        latency = time.monotonic() - start
+
+        if response is None:
+            return None, None
+        if response.isError():
+            return latency, getattr(response, "exception_code", None)
+
+        return latency, None
+
+    async def _scan_bus(self, name, kwargs):
+        scan = BusScan(name)
+        pending = list(self.units)
+        timeout = self.timeout
+        start = time.monotonic()
+
+        for _ in range(self.reprobes + 1):
+            if not pending:
+                break
+
+            root = aio.AsyncMeter(**dict(kwargs, timeout=timeout))
+            client_args = {"retries": 0}
+
+            if root.framer is not None:
+                client_args["framer"] = root.framer
+
+            client = root._create_client(**client_args)
+
+            if hasattr(client, "set_max_no_responses"):
+                client.set_max_no_responses(len(pending) + 1)
+
+            try:
+                if not await client.connect():
+                    scan.error = ConnectionError(f"could not connect to {name}")
+                    break
+
+                timed_out = []
+
+                for unit in pending:
+                    if not client.connected:
+                        await client.connect()
+
+                    latency, exception = await self._probe(client, unit)
+
+                    if latency is None:
+                        timed_out.append(unit)
+                        continue
+
+                    scan.units[unit] = latency
+
+                    if exception is not None:
+                        scan.exceptions[unit] = exception
+            finally:
+                client.close()
+
+            pending = timed_out
+            scan.rounds += 1
+
+            slowest = max(scan.units.values(), default=0)
+            timeout = max(timeout * self.backoff, slowest * 3)
+
+        scan.timeouts = pending
+        scan.duration = time.monotonic() - start
+
+        return scan
+
+    async def scan(self):
+        """Scans every bus concurrently and returns {bus name: BusScan}."""
+
+        names = list(self.buses)
+        scans = await asyncio.gather(*(self._scan_bus(name, self.buses[name]) for name in names))
+
+        return dict(zip(names, scans))
+
+    def run(self):
+        return asyncio.run(self.scan())
+
+
+def scan(device=None, host=None, port=502, **kwargs):
+    """Scans a single serial port or TCP gateway, returns its BusScan."""
+
+    options = {k: kwargs.pop(k) for k in ("units", "probe", "timeout", "reprobes", "backoff") if k in kwargs}
+    scanner = Scanner(**options)
+
+    if device:
+        scanner.add_bus(device, **kwargs)
+    else:
+        scanner.add_gateway(host, port, **kwargs)
+
+    return next(iter(scanner.run().values()))
@@ -0,0 +1,151 @@
+import time
+
+from sdm_modbus_modified import meter
+
+
+class Schedule:
+    """One polling interval and the register keys read at that rate."""
+
+    def __init__(self, interval, keys, start):
+        self.interval = interval
+        self.keys = frozenset(keys)
+        self.due = start
+
+    def __repr__(self):
+        return f"Schedule({self.interval}s, {len(self.keys)} registers)"
+
+    def advance(self, now):
+        # Fixed rate: missed ticks are skipped rather than queued up.
+        while self.due <= now:
+            self.due += self.interval
+
+
+class Scheduler:
+    """Reads the registers of one meter at per-key poll intervals.
+
+    Keys of every schedule due at a tick are read together with Meter.read_many,
+    and the results are passed to on_read() callbacks and yielded by run().
+    """
+
+    def __init__(self, device, scaling=False, clock=time.monotonic, sleep=time.sleep):
+        self.device = device
+        self.scaling = scaling
+        self.clock = clock
+        self.sleep = sleep
+        self.schedules = {}
+        self.callbacks = []
+        self.errors = 0
+        self.last_error = None
+
+    def __repr__(self):
+        return f"Scheduler({self.device}, {list(self.schedules.values())})"
+
+    def _resolve(self, selectors):
+        register_map = self.device.register_map
+        keys = set()
+
+        for selector in selectors:
+            if isinstance(selector, meter.registerType):
+                keys.update(f.key for f in register_map.rtypes[selector])
+            elif isinstance(selector, tuple):
+                keys.update(f.key for f in register_map.batches.get(selector, ()))
+            elif isinstance(selector, str):
+                if selector not in register_map:
+                    raise KeyError(selector)
+
+                keys.add(selector)
+            else:
+                keys.update(self._resolve(selector))
+
+        return keys
+
+    def every(self, interval, *selectors):
+        """Polls the selected registers every `interval` seconds.
+
+        A selector is a key, a registerType, an (rtype, batch) tuple or an iterable
+        of those; repeated calls with the same interval add to that schedule.
+        """
+
+        if interval <= 0:
+            raise ValueError(f"interval must be positive, got {interval}")
+
+        keys = self._resolve(selectors)
+        schedule = self.schedules.get(interval)
+
+        if schedule is None:
+            self.schedules[interval] = Schedule(interval, keys, self.clock())
+        else:
+            schedule.keys = schedule.keys | keys
+
+        return self
+
+    def on_read(self, callback):
+        """Calls callback(timestamp, results) after every tick that read registers."""
+
+        self.callbacks.append(callback)
+        return callback
+
+    def next_due(self):
+        return min((s.due for s in self.schedules.values()), default=None)
+
+    def due(self, now=None):
+        """Returns the keys of every schedule due at `now`."""
+
+        if now is None:
+            now = self.clock()
+
+        keys = set()
+
+        for schedule in self.schedules.values():
+            if schedule.due <= now:
+                keys |= schedule.keys
+
+        return keys
+
+    def tick(self, now=None):
+        """Reads every due register once and returns the results, {} if nothing is due."""
+
+        if now is None:
+            now = self.clock()
+
+        due = [s for s in self.schedules.values() if s.due <= now]
+
+        if not due:
+            return {}
+
+        keys = frozenset().union(*(s.keys for s in due))
+
+        for schedule in due:
+            schedule.advance(now)
+
+        try:
+            results = self.device.read_many(keys, scaling=self.scaling)
+        except Exception as e:
+            self.errors += 1
+            self.last_error = e
+            return {}
+
+        for callback in self.callbacks:
+            callback(now, results)
+
+        return results
+
+    def run(self, ticks=None):
+        """Generator yielding (timestamp, results) for every tick, sleeping until the next one is due."""
+
+        count = 0
+
+        while self.schedules and (ticks is None or count < ticks):
+            delay = self.next_due() - self.clock()
+
+            if delay > 0:
+                self.sleep(delay)
+
+            now = self.clock()
+            results = self.tick(now)
+            count += 1
+
+            yield now, results
+
+    def __iter__(self):
+        return self.run()
@@ -0,0 +1,473 @@
+import asyncio
+import math
+import os
+import random
+import re
+import struct
+import threading
+import time
+import tty
+
+from sdm_modbus_modified import meter
+from sdm_modbus_modified import regmap
+
+REFRESH = 0.5
+
+ILLEGAL_FUNCTION = 1
+ILLEGAL_ADDRESS = 2
+ILLEGAL_VALUE = 3
+DEVICE_FAILURE = 4
+
+_line_to_line = re.compile(r"l(12|23|31)|l\d_l\d|line_to_line")
+_mbap = struct.Struct(">HHHB")
+
+
+class SimulatorError(Exception):
+    """A Modbus exception response, `code` being the exception code."""
+
+    def __init__(self, code):
+        super().__init__(f"Modbus exception {code}")
+        self.code = code
+
+
+class SimulatedMeter:
+    """Register image of one simulated unit, generated from a model's register map.
+
+    Measurements follow a slowly varying load around 50 Hz and 230 V; they are
+    the input registers, or the holding registers of a model without input
+    registers. Other holding registers start at 0 and keep what is written.
+    Reads must start and end on mapped registers, and with `strict` cover only
+    mapped ones.
+    """
+
+    def __init__(self, model, unit, seed=None, strict=False):
+        self.model = model
+        self.unit = unit
+        self.strict = strict
+        self.register_map = regmap.for_model(model)
+        self.random = random.Random(unit if seed is None else seed)
+        self.current = self.random.uniform(1, 20)
+        self.power_factor = self.random.uniform(0.85, 1)
+        self.energy = self.random.uniform(100, 10000)
+        self.phase = self.random.uniform(0, 2 * math.pi)
+        self.started = time.monotonic()
+        self.refreshed = None
+
+        self.images = {rtype: {} for rtype in meter.registerType}
+        self.mapped = {rtype: set() for rtype in meter.registerType}
+        self.fields = {rtype: [] for rtype in meter.registerType}
+
+        for field in self.register_map.fields.values():
+            self.mapped[field.rtype].update(range(field.address, field.address + field.length))
+
+            if field.format is not None:
+                encoder = regmap.value_encoder(field.dtype, field.length, model.byteorder, model.wordorder)
+                self.fields[field.rtype].append((field, encoder))
+
+        if self.fields[meter.registerType.INPUT]:
+            self.measured = meter.registerType.INPUT
+
+            for field, encoder in self.fields[meter.registerType.HOLDING]:
+                self._store(field, encoder, 0)
+        else:
+            self.measured = meter.registerType.HOLDING
+
+    def __repr__(self):
+        return f"SimulatedMeter({self.model.__name__}, unit={self.unit})"
+
+    def _value(self, field, elapsed):
+        unit = field.unit if isinstance(field.unit, str) else None
+        wobble = math.sin(elapsed / 10 + self.phase)
+        current = self.current * (1 + 0.1 * wobble)
+        apparent = 230 * current
+
+        if unit == "Hz":
+            return 50 + 0.02 * wobble
+        elif unit == "V":
+            return (400 if _line_to_line.search(field.key) else 230) + 2 * wobble
+        elif unit == "A":
+            return current
+        elif unit == "mA":
+            return current * 1000
+        elif unit == "W":
+            return apparent * self.power_factor
+        elif unit == "VA":
+            return apparent
+        elif unit in ("VAr", "var"):
+            return apparent * math.sqrt(1 - self.power_factor ** 2)
+        elif unit in ("kWh", "kVArh", "kvarh", "kVAh"):
+            return self.energy + elapsed * apparent / 3.6e6
+        elif unit == "Wh":
+            return (self.energy + elapsed * apparent / 3.6e6) * 1000
+        elif unit == "%":
+            return 2 + wobble
+        elif unit == "°":
+            return math.degrees(math.acos(self.power_factor))
+        elif "power_factor" in field.key:
+            return self.power_factor
+        else:
+            return 0
+
+    def _store(self, field, encoder, value):
+        if field.dtype == meter.registerDataType.BYTES:
+            raw = b"SIM".ljust(field.length * 2, b"\0")
+        elif field.scale:
+            raw = value / (field.scale * 10 ** -(field.decimals or 0))
+        else:
+            raw = 0
+
+        try:
+            words = encoder(raw)
+        except (struct.error, OverflowError, ValueError):
+            words = [0] * field.length
+
+        image = self.images[field.rtype]
+
+        for i, word in enumerate(words):
+            image[field.address + i] = word
+
+    def refresh(self, now=None):
+        if now is None:
+            now = time.monotonic()
+
+        if self.refreshed is not None and now - self.refreshed < REFRESH:
+            return
+
+        elapsed = now - self.started
+
+        for field, encoder in self.fields[self.measured]:
+            self._store(field, encoder, self._value(field, elapsed))
+
+        self.refreshed = now
+
+    def _check(self, rtype, address, count):
+        mapped = self.mapped[rtype]
+
+        if address not in mapped or address + count - 1 not in mapped:
+            raise SimulatorError(ILLEGAL_ADDRESS)
+
+        if self.strict and any(a not in mapped for a in range(address, address + count)):
+            raise SimulatorError(ILLEGAL_ADDRESS)
+
+    def read(self, rtype, address, count):
+        self._check(rtype, address, count)
+
+        if rtype == self.measured:
+            self.refresh()
+
+        image = self.images[rtype]
+
+        return [image.get(a, 0) for a in range(address, address + count)]
+
+    def write(self, address, words):
+        self._check(meter.registerType.HOLDING, address, len(words))
+
+        image = self.images[meter.registerType.HOLDING]
+
+        for i, word in enumerate(words):
+            image[address + i] = word
+
+
+class Simulator:
+    """Modbus slave simulator serving SimulatedMeters over TCP and a pty-backed RTU link.
+
+    Requests can be delayed (`latency`, `jitter`), fail (`error_rate`) or be
+    dropped (`drop_rate`); unknown unit ids never answer. Use serve_tcp/serve_rtu
+    on a running event loop, or start/stop for a background thread.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, drop_rate=0.0, strict=False, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.strict = strict
+        self.random = random.Random(seed)
+        self.meters = {}
+        self.requests = 0
+        self.errors = 0
+        self.drops = 0
+        self._servers = []
+        self._links = []
+        self._connections = set()
+        self._loop = None
+        self._thread = None
+
+    def __repr__(self):
+        return f"Simulator(units={len(self.meters)}, requests={self.requests})"
+
+    def add(self, model, units, seed=None):
+        """Adds a SimulatedMeter of `model` at every unit id of `units` (an int or an iterable)."""
+
+        if isinstance(units, int):
+            units = [units]
+
+        added = []
+
+        for unit in units:
+            device = self.meters[unit] = SimulatedMeter(model, unit, seed, self.strict)
+            added.append(device)
+
+        return added
+
+    def handle(self, unit, pdu):
+        """Returns the response PDU for a request PDU, or None for a unit that does not exist."""
+
+        device = self.meters.get(unit)
+
+        if device is None or not pdu:
+            return None
+
+        function = pdu[0]
+
+        try:
+            if function in (3, 4):
+                if len(pdu) != 5:
+                    raise SimulatorError(ILLEGAL_VALUE)
+
+                address, count = struct.unpack(">HH", pdu[1:5])
+
+                if not 1 <= count <= 125:
+                    raise SimulatorError(ILLEGAL_VALUE)
+
+                rtype = meter.registerType.HOLDING if function == 3 else meter.registerType.INPUT
+                words = device.read(rtype, address, count)
+
+                return struct.pack(f">BB{count}H", function, count * 2, *words)
+            elif function == 6:
+                address, value = struct.unpack(">HH", pdu[1:5])
+                device.write(address, [value])
+
+                return pdu[:5]
+            elif function == 16:
+                address, count, size = struct.unpack(">HHB", pdu[1:6])
+
+                if size != count * 2 or len(pdu) != 6 + size:
+                    raise SimulatorError(ILLEGAL_VALUE)
+
+                device.write(address, list(struct.unpack(f">{count}H", pdu[6:])))
+
+                return pdu[:5]
+            else:
+                raise SimulatorError(ILLEGAL_FUNCTION)
+        except SimulatorError as e:
+            return bytes((function | 0x80, e.code))
+        except struct.error:
+            return bytes((function | 0x80, ILLEGAL_VALUE))
+
+    async def respond(self, unit, pdu):
+        """handle() with the configured latency, jitter, errors and drops applied."""
+
+        self.requests += 1
+        delay = self.latency
+
+        if self.jitter:
+            delay = max(0.0, delay + self.random.gauss(0, self.jitter))
+        if delay:
+            await asyncio.sleep(delay)
+
+        if unit not in self.meters:
+            return None
+        if self.drop_rate and self.random.random() < self.drop_rate:
+            self.drops += 1
+            return None
+        if self.error_rate and self.random.random() < self.error_rate:
+            self.errors += 1
+            return bytes((pdu[0] | 0x80, DEVICE_FAILURE))
+
+        return self.handle(unit, pdu)
+
+    async def _serve_connection(self, reader, writer):
+        self._connections.add(asyncio.current_task())
+
+        try:
+            while True:
+                header = await reader.readexactly(_mbap.size)
+                transaction, protocol, length, unit = _mbap.unpack(header)
+                pdu = await reader.readexactly(length - 1)
+                response = await self.respond(unit, pdu)
+
+                if response is not None:
+                    writer.write(_mbap.pack(transaction, protocol, len(response) + 1, unit) + response)
+                    await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._connections.discard(asyncio.current_task())
+            writer.close()
+
+    async def serve_tcp(self, host="127.0.0.1", port=5020):
+        """Starts a Modbus TCP server, returns the (host, port) it listens on; port 0 picks a free one."""
+
+        server = await asyncio.start_server(self._serve_connection, host, port)
+        self._servers.append(server)
+
+        return server.sockets[0].getsockname()[:2]
+
+    async def serve_rtu(self, baud=None):
+        """Opens a pty carrying Modbus RTU frames, returns its device path; `baud` delays responses like a serial line."""
+
+        master, slave = os.openpty()
+        tty.setraw(slave)
+        os.set_blocking(master, False)
+
+        link = _RtuLink(self, master, slave, baud)
+        self._links.append(link)
+        asyncio.get_running_loop().add_reader(master, link.receive)
+
+        return os.ttyname(slave)
+
+    async def close(self):
+        for server in self._servers:
+            server.close()
+
+        for task in list(self._connections):
+            task.cancel()
+
+        await asyncio.gather(*self._connections, return_exceptions=True)
+
+        for server in self._servers:
+            await server.wait_closed()
+
+        for link in self._links:
+            link.close()
+
+        self._servers = []
+        self._links = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    def start(self, host="127.0.0.1", port=0, rtu=False, baud=None):
+        """Runs the simulator on a background thread.
+
+        Returns (host, port) of the TCP server, or the pty path with rtu=True.
+        """
+
+        ready = threading.Event()
+        result = []
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+
+            if rtu:
+                result.append(self._loop.run_until_complete(self.serve_rtu(baud)))
+            else:
+                result.append(self._loop.run_until_complete(self.serve_tcp(host, port)))
+
+            ready.set()
+            self._loop.run_forever()
+            self._loop.run_until_complete(self.close())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        ready.wait()
+
+        return result[0]
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop = None
+            self._thread = None
+
+
+class _RtuLink:
+
+    def __init__(self, simulator, master, slave, baud):
+        self.simulator = simulator
+        self.master = master
+        self.slave = slave
+        self.baud = baud
+        self.buffer = bytearray()
+        self.busy = asyncio.Lock()
+
+    def close(self):
+        asyncio.get_event_loop().remove_reader(self.master)
+        os.close(self.master)
+        os.close(self.slave)
+
+    def receive(self):
+        try:
+            self.buffer += os.read(self.master, 4096)
+        except BlockingIOError:
+            return
+
+        while True:
+            size = _request_size(self.buffer)
+
+            if size is None or len(self.buffer) < size:
+                return
+
+            frame = bytes(self.buffer[:size])
+
+            if crc(frame[:-2]) != frame[-2:]:
+                # Out of sync or corrupted: drop a byte and look for the next frame.
+                del self.buffer[0]
+                continue
+
+            del self.buffer[:size]
+            asyncio.ensure_future(self.answer(frame[0], frame[1:-2]))
+
+    async def answer(self, unit, pdu):
+        async with self.busy:
+            response = await self.simulator.respond(unit, pdu)
+
+            if response is None or unit == 0:
+                return
+
+            frame = bytes((unit,)) + response
+            frame += crc(frame)
+
+            if self.baud:
+                await asyncio.sleep(len(frame) * 11 / self.baud)
+
+            os.write(self.master, frame)
+
+
+def _request_size(buffer):
+    if len(buffer) < 2:
+        return None
+
+    function = buffer[1]
+
+    if function in (3, 4, 6):
+        return 8
+    elif function == 16:
+        return 9 + buffer[6] if len(buffer) >= 7 else None
+    else:
+        return 4
+
+
+def _crc_table():
+    table = []
+
+    for i in range(256):
+        value = i
+
+        for _ in range(8):
+            value = (value >> 1) ^ 0xA001 if value & 1 else value >> 1
+
+        table.append(value)
+
+    return table
+
+
+_table = _crc_table()
+
+
+def crc(data):
+    """Modbus RTU CRC-16 of `data`, as the two bytes appended to a frame."""
+
+    value = 0xFFFF
+
+    for byte in data:
+        value = (value >> 8) ^ _table[(value ^ byte) & 0xFF]
+
+    return struct.pack("<H", value)
@@ -0,0 +1,298 @@
+import asyncio
+import gzip
+import importlib
+import json
+import math
+import os
+import time
+
+from sdm_modbus_modified import detect
+from sdm_modbus_modified import meter
+from sdm_modbus_modified import regmap
+
+FORMAT = 1
+
+
+class MeterSnapshot:
+    """The raw holding-register blocks read from one unit, decoded on demand with its model's map."""
+
+    __slots__ = ("bus", "unit", "model", "blocks", "error")
+
+    def __init__(self, bus, unit, model, blocks, error=None):
+        self.bus = bus
+        self.unit = unit
+        self.model = model
+        self.blocks = blocks
+        self.error = error
+
+    def __repr__(self):
+        return f"MeterSnapshot({self.bus}, unit={self.unit}, model={self.model.__name__}, blocks={len(self.blocks)})"
+
+    def words(self, address, length):
+        for start, data in self.blocks:
+            if start <= address and address + length <= start + len(data):
+                return data[address - start:address - start + length]
+
+        return None
+
+    def values(self):
+        """Returns {key: scaled value} for every holding register covered by the blocks read."""
+
+        register_map = regmap.for_model(self.model)
+        values = {}
+
+        for field in register_map.rtypes[meter.registerType.HOLDING]:
+            data = self.words(field.address, field.length)
+
+            if data is None or field.format is None:
+                continue
+
+            value = regmap.value_decoder(field.dtype, field.length, field.vtype,
+                                         register_map.byteorder, register_map.wordorder)(data)
+            values[field.key] = value if field.factor is None else value * field.factor
+
+        return values
+
+
+class Difference:
+    __slots__ = ("bus", "unit", "key", "expected", "actual")
+
+    def __init__(self, bus, unit, key, expected, actual):
+        self.bus = bus
+        self.unit = unit
+        self.key = key
+        self.expected = expected
+        self.actual = actual
+
+    def __repr__(self):
+        return f"Difference({self.bus}, unit={self.unit}, {self.key}: expected {self.expected!r}, actual {self.actual!r})"
+
+    def as_dict(self):
+        return {"bus": self.bus, "unit": self.unit, "key": self.key, "expected": self.expected, "actual": self.actual}
+
+
+class DesiredState:
+    """Expected holding-register values, in scaled units, from the most general to the most specific.
+
+    `defaults` apply to every meter, `models` per model name and `units` per
+    detect.bus_key and unit id.
+    """
+
+    def __init__(self, defaults=None, models=None, units=None):
+        self.defaults = defaults or {}
+        self.models = models or {}
+        self.units = units or {}
+
+    def __repr__(self):
+        return f"DesiredState(defaults={len(self.defaults)}, models={list(self.models)})"
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            state = json.load(f)
+
+        return cls(state.get("defaults"), state.get("models"), state.get("units"))
+
+    def expected(self, bus, unit, model):
+        register_map = regmap.for_model(model)
+        settings = {key: value for key, value in self.defaults.items() if key in register_map}
+
+        for name in (model.__name__, model.model):
+            settings.update((key, value) for key, value in self.models.get(name, {}).items() if key in register_map)
+
+        settings.update(self.units.get(bus, {}).get(str(unit), {}))
+
+        return settings
+
+
+class Snapshot:
+    """Holding registers of many meters at one point in time, kept as raw block words and decoded on demand."""
+
+    def __init__(self, taken=None):
+        self.taken = time.time() if taken is None else taken
+        self.meters = {}
+
+    def __repr__(self):
+        return f"Snapshot({len(self.meters)} meters, taken={self.taken:.0f})"
+
+    def __len__(self):
+        return len(self.meters)
+
+    def __iter__(self):
+        return iter(self.meters.values())
+
+    def __getitem__(self, bus_unit):
+        return self.meters[bus_unit]
+
+    def add(self, entry):
+        self.meters[(entry.bus, entry.unit)] = entry
+
+    def values(self):
+        return {bus_unit: entry.values() for bus_unit, entry in self.meters.items()}
+
+    def save(self, path):
+        document = {
+            "format": FORMAT,
+            "taken": self.taken,
+            "meters": [
+                {
+                    "bus": entry.bus,
+                    "unit": entry.unit,
+                    "model": f"{entry.model.__module__}.{entry.model.__name__}",
+                    "blocks": [[address, list(data)] for address, data in entry.blocks],
+                    "error": entry.error,
+                }
+                for entry in self.meters.values()
+            ],
+        }
+
+        tmp = f"{path}.tmp"
+
+        with gzip.open(tmp, "wt") as f:
+            json.dump(document, f, separators=(",", ":"))
+
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with gzip.open(path, "rt") as f:
+            document = json.load(f)
+
+        if document.get("format") != FORMAT:
+            raise ValueError(f"{path}: unsupported snapshot format {document.get('format')}")
+
+        snapshot = cls(document["taken"])
+
+        for entry in document["meters"]:
+            module_name, _, class_name = entry["model"].rpartition(".")
+            model = getattr(importlib.import_module(module_name), class_name)
+            blocks = [(address, tuple(data)) for address, data in entry["blocks"]]
+            snapshot.add(MeterSnapshot(entry["bus"], entry["unit"], model, blocks, entry.get("error")))
+
+        return snapshot
+
+    def diff(self, desired):
+        """Lists the Differences from a DesiredState (or its dict form) or from an earlier Snapshot.
+
+        A key that could not be read has actual None.
+        """
+
+        if isinstance(desired, dict):
+            desired = DesiredState(desired.get("defaults"), desired.get("models"), desired.get("units"))
+
+        differences = []
+
+        for (bus, unit), entry in self.meters.items():
+            actual = entry.values()
+
+            if isinstance(desired, Snapshot):
+                other = desired.meters.get((bus, unit))
+                expected = other.values() if other is not None else {}
+            else:
+                expected = desired.expected(bus, unit, entry.model)
+
+            for key, value in expected.items():
+                current = actual.get(key)
+
+                if not _equal(value, current):
+                    differences.append(Difference(bus, unit, key, value, current))
+
+        return differences
+
+
+def _equal(expected, actual):
+    if isinstance(expected, (int, float)) and isinstance(actual, (int, float)):
+        return math.isclose(expected, actual, rel_tol=1e-6, abs_tol=1e-9)
+
+    return expected == actual
+
+
+def read(device, bus=None):
+    """Reads every holding register of `device` in planned block reads, returns a MeterSnapshot."""
+
+    blocks = []
+    error = None
+
+    for block in device.plan(meter.registerType.HOLDING):
+        try:
+            data = device._read_holding_registers(block.address, block.count)
+        except Exception as e:
+            error = repr(e)
+            continue
+
+        if data:
+            blocks.append((block.address, tuple(data)))
+
+    return MeterSnapshot(bus or detect.bus_key(device), device.unit, _model(type(device)), blocks, error)
+
+
+async def read_async(device, bus=None):
+    blocks = []
+    error = None
+
+    for block in device.plan(meter.registerType.HOLDING):
+        try:
+            data = await device._read_holding_registers(block.address, block.count)
+        except Exception as e:
+            error = repr(e)
+            continue
+
+        if data:
+            blocks.append((block.address, tuple(data)))
+
+    return MeterSnapshot(bus or detect.bus_key(device), device.unit, _model(type(device)), blocks, error)
+
+
+def take(buses, snapshot=None):
+    """Snapshots every meter of one or more bus.Bus objects, one pass per bus."""
+
+    from sdm_modbus_modified import bus as bus_module
+
+    if isinstance(buses, bus_module.Bus):
+        buses = [buses]
+
+    if snapshot is None:
+        snapshot = Snapshot()
+
+    for one in buses:
+        name = detect.bus_key(one.root)
+
+        with one._lock:
+            if not one.root.connected():
+                one.root.connect()
+
+            for device in one.meters.values():
+                snapshot.add(read(device, name))
+
+    return snapshot
+
+
+async def take_async(poller, snapshot=None):
+    """Snapshots every meter of a poller.Poller, all buses concurrently."""
+
+    if snapshot is None:
+        snapshot = Snapshot()
+
+    async def take_bus(polled):
+        name = detect.bus_key(polled.root)
+
+        async with polled.lock:
+            if polled.serialize:
+                return [await read_async(device, name) for device in polled.meters.values()]
+
+            return await asyncio.gather(*(read_async(device, name) for device in polled.meters.values()))
+
+    for entries in await asyncio.gather(*(take_bus(polled) for polled in poller.buses.values())):
+        for entry in entries:
+            snapshot.add(entry)
+
+    return snapshot
+
+
+def _model(cls):
+    # Snapshots of asyncio meters are stored under their synchronous model class.
+    for base in cls.__mro__:
+        if base.__module__ != "sdm_modbus_modified.aio" and base is not meter.Meter:
+            return base
+
+    return cls
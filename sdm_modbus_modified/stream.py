@@ -0,0 +1,181 @@
+import asyncio
+import time
+
+from sdm_modbus_modified import meter
+
+
+class Sample:
+    """One timestamped reading of one meter.
+
+    `timestamp` is the time.time() the read started, or completed for Poller
+    streams; `missed` counts the ticks skipped since the previous sample.
+    `values` is None when the read failed, and `error` holds the exception.
+    """
+
+    __slots__ = ("timestamp", "unit", "model", "sequence", "missed", "values", "error")
+
+    def __init__(self, timestamp, unit, model, sequence, missed, values, error=None):
+        self.timestamp = timestamp
+        self.unit = unit
+        self.model = model
+        self.sequence = sequence
+        self.missed = missed
+        self.values = values
+        self.error = error
+
+    def __repr__(self):
+        return f"Sample({self.model}@{self.unit}, t={self.timestamp:.3f}, seq={self.sequence}, values={self.values})"
+
+
+def _read(device, keys, rtype, scaling):
+    if keys is None:
+        return device.read_all(rtype, scaling=scaling)
+    else:
+        return device.read_many(keys, scaling=scaling)
+
+
+def _tick(due, interval, now):
+    # Returns the wait before the tick at `due`, the ticks missed since it and
+    # the next due time. Ticks that passed meanwhile are skipped.
+    delay = max(0, due - now)
+    now = max(now, due)
+    missed = int((now - due) // interval) if interval else 0
+
+    return delay, missed, due + (missed + 1) * interval
+
+
+def _ticks(interval, samples, clock, sleep):
+    # Pull-based: the next tick is only waited for once the consumer asks for
+    # it, so a slow consumer holds back the bus instead of filling a buffer.
+    due = clock()
+    count = 0
+
+    while samples is None or count < samples:
+        delay, missed, due = _tick(due, interval, clock())
+
+        if delay:
+            sleep(delay)
+
+        count += 1
+
+        yield missed
+
+
+async def _ticks_async(interval, samples, clock=time.monotonic, sleep=asyncio.sleep):
+    # The asyncio counterpart of _ticks, for AsyncMeter.stream.
+    due = clock()
+    count = 0
+
+    while samples is None or count < samples:
+        delay, missed, due = _tick(due, interval, clock())
+
+        if delay:
+            await sleep(delay)
+
+        count += 1
+
+        yield missed
+
+
+def stream(device, keys=None, interval=1.0, rtype=None, scaling=False, samples=None,
+           clock=time.monotonic, sleep=time.sleep):
+    """Generator yielding a Sample of `device` every `interval` seconds.
+
+    Reads `keys` with read_many, or every register of `rtype` with read_all.
+    Stops after `samples` samples, or never when it is None.
+    """
+
+    rtype = meter.registerType.INPUT if rtype is None else rtype
+    keys = None if keys is None else frozenset(keys)
+
+    for sequence, missed in enumerate(_ticks(interval, samples, clock, sleep)):
+        timestamp = time.time()
+
+        try:
+            values = _read(device, keys, rtype, scaling)
+            error = None
+        except Exception as e:
+            values = None
+            error = e
+
+        yield Sample(timestamp, device.unit, device.model, sequence, missed, values, error)
+
+
+def stream_fleet(devices, keys=None, interval=1.0, rtype=None, scaling=False, samples=None,
+                 clock=time.monotonic, sleep=time.sleep):
+    """Generator yielding one Sample per meter of `devices` every `interval` seconds.
+
+    Meters are read one after another; `keys` may map a meter to its own keys.
+    """
+
+    devices = list(devices)
+    rtype = meter.registerType.INPUT if rtype is None else rtype
+
+    for sequence, missed in enumerate(_ticks(interval, samples, clock, sleep)):
+        for device in devices:
+            device_keys = keys.get(device) if isinstance(keys, dict) else keys
+            timestamp = time.time()
+
+            try:
+                values = _read(device, device_keys, rtype, scaling)
+                error = None
+            except Exception as e:
+                values = None
+                error = e
+
+            yield Sample(timestamp, device.unit, device.model, sequence, missed, values, error)
+
+
+async def stream_poller(poller, interval=1.0, cycles=None, maxsize=0):
+    """Async generator yielding a Sample per unit of every Poller cycle.
+
+    The poller waits once `maxsize` samples (one cycle by default) are queued.
+    Timestamps are when each unit's read completed.
+    """
+
+    units = sum(len(bus.meters) for bus in poller.buses.values())
+    queue = asyncio.Queue(maxsize or max(units, 1))
+    done = object()
+
+    async def produce():
+        sequence = 0
+
+        try:
+            async for results in poller.run(interval, cycles):
+                for name, values in results.items():
+                    bus = poller.buses[name]
+
+                    read_times = poller.read_times.get(name, {})
+
+                    for unit, unit_values in values.items():
+                        error = poller.errors.get(name, {}).get(unit) if unit_values is None else None
+                        sample = Sample(read_times[unit], unit, bus.meters[unit].model, sequence, 0, unit_values, error)
+                        await queue.put(sample)
+
+                sequence += 1
+        finally:
+            try:
+                queue.put_nowait(done)
+            except asyncio.QueueFull:
+                pass
+
+    task = asyncio.ensure_future(produce())
+
+    try:
+        while True:
+            if task.done() and queue.empty():
+                break
+
+            sample = await queue.get()
+
+            if sample is done:
+                break
+
+            yield sample
+    finally:
+        task.cancel()
+
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
@@ -0,0 +1,299 @@
+import argparse
+import asyncio
+import fnmatch
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+import pymodbus
+
+import sdm_modbus_modified
+from sdm_modbus_modified import meter, pipeline, poller, regmap, simulator, ws100
+from sdm_modbus_modified.detect import MODELS
+
+
+DTYPES = [
+    (meter.registerDataType.FLOAT32, 2, float),
+    (meter.registerDataType.INT32, 2, int),
+    (meter.registerDataType.UINT32, 2, int),
+    (meter.registerDataType.INT16, 1, int),
+    (meter.registerDataType.UINT16, 1, int),
+    (meter.registerDataType.INT64, 4, int),
+    (meter.registerDataType.UINT64, 4, int),
+]
+
+# Import stages timed in fresh interpreters, from an empty one to a constructed meter.
+IMPORT_STAGES = {
+    "interpreter": "pass",
+    "package": "import sdm_modbus_modified",
+    "model": "import sdm_modbus_modified; sdm_modbus_modified.model('SDM630')",
+    "meter": "import sdm_modbus_modified; sdm_modbus_modified.SDM630(host={host!r}, port={port}).disconnect()",
+}
+
+BATCH_SIZES = [8, 16, 32, 64, 125]
+FLEET_SIZES = [10, 100, 1000]
+UNITS_PER_GATEWAY = 200
+PIPELINE_UNITS = 10000
+
+def measure(name, function, repeat, number=1, **params):
+    """Times `number` calls of function() `repeat` times, returns the result record in seconds per call."""
+
+    times = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+
+        for _ in range(number):
+            function()
+
+        times.append((time.perf_counter() - start) / number)
+
+    times.sort()
+
+    return {
+        "name": name,
+        "params": params,
+        "repeat": repeat,
+        "number": number,
+        "mean": statistics.fmean(times),
+        "min": times[0],
+        "p50": times[len(times) // 2],
+        "p95": times[min(len(times) - 1, int(len(times) * 0.95))],
+    }
+
+def bench_decode(address, repeat, number):
+    device = sdm_modbus_modified.Meter(host=address[0], port=address[1])
+    results = []
+
+    for dtype, length, vtype in DTYPES:
+        data = [0x4248, 0x1234, 0x5678, 0x9abc][:length]
+        results.append(measure("decode_value", lambda: device._decode_value(data, length, dtype, vtype),
+                               repeat, number, dtype=dtype.name))
+
+    device.disconnect()
+
+    return results
+
+def bench_read_all_batches(address, repeat):
+    results = []
+
+    for size in BATCH_SIZES:
+        device = sdm_modbus_modified.SDM630(host=address[0], port=address[1], unit=1, max_registers=size)
+        blocks = list(device.plan())
+
+        results.append(measure("_read_all", lambda: [device._read_all(block) for block in blocks],
+                               repeat, max_registers=size, transactions=len(blocks)))
+        device.disconnect()
+
+    return results
+
+def bench_read_all_models(address, repeat):
+    results = []
+
+    for unit, model in enumerate(MODELS, 1):
+        device = model(host=address[0], port=address[1], unit=unit)
+        rtype = meter.registerType.HOLDING if model is sdm_modbus_modified.ESPP1 else meter.registerType.INPUT
+
+        results.append(measure("read_all", lambda: device.read_all(rtype), repeat,
+                               model=model.__name__, transactions=len(device.plan(rtype))))
+        device.disconnect()
+
+    return results
+
+def bench_ws100(address, repeat):
+    unit = MODELS.index(ws100.WS100_19XX) + 1
+    device = ws100.WS100_19XX(host=address[0], port=address[1], unit=unit)
+    result = measure("ws100_read_all_scaled", device.read_all_scaled, repeat)
+    device.disconnect()
+
+    return [result]
+
+def bench_import(address, repeat):
+    results = []
+
+    for stage, code in IMPORT_STAGES.items():
+        code = code.format(host=address[0], port=address[1])
+        command = [sys.executable, "-c", f"{code}; import sys; print(len(sys.modules))"]
+        modules = int(subprocess.run(command, check=True, capture_output=True, text=True).stdout)
+
+        results.append(measure("import_time", lambda: subprocess.run(command, check=True, capture_output=True),
+                               repeat, stage=stage, modules=modules))
+
+    return results
+
+def bench_block_decode(repeat, number):
+    results = []
+
+    for model in MODELS:
+        register_map = regmap.for_model(model)
+
+        for rtype in meter.registerType:
+            try:
+                blocks = [(block, [0] * block.count) for block in register_map.plan(rtype)]
+
+                for block, data in blocks:
+                    block.decode(data)
+            except ValueError:
+                continue
+
+            if blocks:
+                results.append(measure("block_decode", lambda: [block.decode(data) for block, data in blocks],
+                                       repeat, number, model=model.__name__, rtype=rtype.name))
+                results.append(measure("block_decode_scaled", lambda: [block.decode(data, True, True) for block, data in blocks],
+                                       repeat, number, model=model.__name__, rtype=rtype.name))
+
+    return results
+
+def bench_pipeline(address, repeat, units=PIPELINE_UNITS):
+    host, port = address
+    device = sdm_modbus_modified.SDM630(host=host, port=port, unit=MODELS.index(sdm_modbus_modified.SDM630) + 1)
+    readings = pipeline.collect(device, meter.registerType)
+    device.disconnect()
+
+    readings = [
+        pipeline.RawReading(unit, reading.model, reading.rtype, reading.max_registers, reading.max_gap, reading.blocks)
+        for unit in range(units) for reading in readings
+    ]
+    plans = {rtype: device.register_map.plan(rtype, device.max_registers, device.max_gap) for rtype in meter.registerType}
+
+    def decode_rows():
+        # The baseline: one Block.decode dict per block and unit.
+        return [
+            block.decode(data, True) for reading in readings for block, data in zip(plans[reading.rtype], reading.blocks)
+        ]
+
+    results = [measure("pipeline_per_row", decode_rows, repeat, units=units)]
+
+    for workers in sorted({0, 1, os.cpu_count() or 1}):
+        with pipeline.Pipeline(workers, scaling=True) as pipe:
+            pipe.decode(readings[:pipe.batch_size])
+
+            results.append(measure("pipeline_decode", lambda: pipe.decode(readings), repeat, units=units, workers=workers))
+            results.append(measure("pipeline_aggregate", lambda: pipe.aggregate(readings), repeat, units=units, workers=workers))
+
+    return results
+
+async def fleet_cycle(size, repeat, latency):
+    fleet = poller.Poller()
+    gateways = []
+
+    for first in range(0, size, UNITS_PER_GATEWAY):
+        units = range(1, min(UNITS_PER_GATEWAY, size - first) + 1)
+        gateway = simulator.Simulator(latency=latency)
+        gateway.add(sdm_modbus_modified.SDM630, units)
+        host, port = await gateway.serve_tcp(port=0)
+        fleet.add_gateway(host, {unit: sdm_modbus_modified.SDM630 for unit in units}, port=port, serialize=False)
+        gateways.append(gateway)
+
+    times = []
+    failed = 0
+
+    try:
+        async with fleet:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                results = await fleet.cycle()
+                times.append(time.perf_counter() - start)
+                failed += sum(values is None for bus in results.values() for values in bus.values())
+    finally:
+        for gateway in gateways:
+            await gateway.close()
+
+    times.sort()
+
+    return {
+        "name": "fleet_cycle",
+        "params": {"meters": size, "gateways": len(gateways), "latency": latency, "failed": failed},
+        "repeat": repeat,
+        "number": 1,
+        "mean": statistics.fmean(times),
+        "min": times[0],
+        "p50": times[len(times) // 2],
+        "p95": times[min(len(times) - 1, int(len(times) * 0.95))],
+    }
+
+def bench_fleet(repeat, latency, sizes):
+    return [asyncio.run(fleet_cycle(size, repeat, latency)) for size in sizes]
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Benchmark decode, read and fleet polling throughput against a local simulator.")
+
+    parser.add_argument("-o", "--output", type=str, default=None,
+                        help="Write the JSON results to this file instead of stdout")
+
+    parser.add_argument("-r", "--repeat", type=int, default=20,
+                        help="Repetitions per measurement (default: 20)")
+
+    parser.add_argument("-n", "--number", type=int, default=1000,
+                        help="Calls per repetition for in-memory measurements (default: 1000)")
+
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="Simulated response latency in seconds for fleet cycles (default: 0)")
+
+    parser.add_argument("--fleet", type=str, default=",".join(map(str, FLEET_SIZES)),
+                        help="Comma separated fleet sizes (default: 10,100,1000)")
+
+    parser.add_argument("--only", type=str, default="*",
+                        help="Only run benchmarks whose name matches this pattern, e.g. 'decode*'")
+
+    return parser.parse_args()
+
+def main():
+    args = parse_arguments()
+
+    sim = simulator.Simulator()
+
+    for unit, model in enumerate(MODELS, 1):
+        sim.add(model, unit)
+
+    address = sim.start()
+
+    benchmarks = {
+        "import_time": lambda: bench_import(address, max(1, args.repeat // 2)),
+        "decode_value": lambda: bench_decode(address, args.repeat, args.number),
+        "block_decode": lambda: bench_block_decode(args.repeat, args.number // 10 or 1),
+        "_read_all": lambda: bench_read_all_batches(address, args.repeat),
+        "read_all": lambda: bench_read_all_models(address, args.repeat),
+        "ws100_read_all_scaled": lambda: bench_ws100(address, args.repeat),
+        "pipeline": lambda: bench_pipeline(address, max(1, args.repeat // 10)),
+        "fleet_cycle": lambda: bench_fleet(max(1, args.repeat // 10), args.latency,
+                                           [int(size) for size in args.fleet.split(",") if size]),
+    }
+
+    results = []
+
+    try:
+        for name, run in benchmarks.items():
+            if not fnmatch.fnmatch(name, args.only):
+                continue
+
+            try:
+                results.extend(run())
+            except Exception as e:
+                results.append({"name": name, "error": repr(e)})
+    finally:
+        sim.stop()
+
+    report = {
+        "meta": {
+            "timestamp": time.time(),
+            "python": sys.version.split()[0],
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "pymodbus": pymodbus.__version__,
+        },
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
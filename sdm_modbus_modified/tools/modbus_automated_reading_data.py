@@ -1,11 +1,13 @@
 import argparse
 import sdm_modbus_modified
+from sdm_modbus_modified import detect, registry
 from sdm_modbus_modified.tools import modbus_scan, modbus_single_request_read_data
-import time
 
 
 
-def find_name_of_detected_devices(start_id,end_id,port,baudrate,parity):
+DEVICE_NAMES = {registry.get(name): name for name in ('SDM630', 'SDM54-2T', 'WS100-19')}
+
+def find_name_of_detected_devices(start_id,end_id,port,baudrate,parity,refresh=False):
     connected_devices_list = modbus_scan.modbus_scan(start_id=start_id,
                                                         end_id=end_id,
                                                         port=port,
@@ -13,21 +15,22 @@ def find_name_of_detected_devices(start_id,end_id,port,baudrate,parity):
                                                         parity=parity)
     models_of_detected_devices = dict()
 
-    for id in connected_devices_list:
-        device = sdm_modbus_modified.SDM630(device=port,baud=baudrate, unit=id, parity=parity)
-        data = device.read('l1_voltage')
-        
-        if data == 0 :
-            models_of_detected_devices[id] = 'WS100-19'
-        else :
-            models_of_detected_devices[id] = 'SDM'    
-            data = device.read('import_demand_power_active')
-            if data == 0:
-                models_of_detected_devices[id] = 'SDM54-2T'
-            else:
-                models_of_detected_devices[id] = 'SDM630'
-        device.disconnect()
-        time.sleep(1)
+    if not connected_devices_list:
+        print(models_of_detected_devices)
+        return models_of_detected_devices
+
+    detector = detect.Detector(cache=detect.FingerprintCache())
+    root = sdm_modbus_modified.Meter(device=port, baud=baudrate, parity=parity, unit=connected_devices_list[0])
+
+    for id, detection in detector.detect_bus(root, connected_devices_list, refresh).items():
+        if detection.model in DEVICE_NAMES:
+            models_of_detected_devices[id] = DEVICE_NAMES[detection.model]
+        elif detection.model is not None:
+            print(f'Skipping ID {id}: detected {detection.model.__name__}, which cannot be read by this tool')
+        else:
+            print(f'Skipping ID {id}: model not recognised')
+
+    root.disconnect()
     print(models_of_detected_devices)
     return models_of_detected_devices
 
@@ -48,7 +51,10 @@ def parse_arguments():
 
     parser.add_argument("--end_id", type=int, default=247,
                             help="End of Modbus slave ID range to scan (default: 247)")
-    
+
+    parser.add_argument("--refresh", action="store_true",
+                            help="Probe every device again instead of using cached fingerprints")
+
     args = parser.parse_args()
 
     return args
@@ -68,7 +74,8 @@ def main():
         end_id=args.end_id,
         port=args.port,
         baudrate=args.baudrate,
-        parity=args.parity
+        parity=args.parity,
+        refresh=args.refresh
     )
 
     read_data_connected_devices(devices_id_and_name,port=args.port,baudrate=args.baudrate,parity=args.parity)
@@ -1,30 +1,22 @@
-import pymodbus.exceptions
-import sdm_modbus_modified
-import time 
-import pymodbus
+import sdm_modbus_modified.scanner
 import argparse
 
-def modbus_scan(start_id,end_id,port,baudrate,parity):
-    connected_devices_id_list = list()
-    
-    for address in range(start_id, end_id +1):
-            device = sdm_modbus_modified.SDM630(device=port,baud=baudrate, unit=address, parity=parity)
-            if device.connected() :
-                 print("Device connected")
-
-            try:
-                device.read('l1_voltage')
-                print(f'Device detected at ID {address}')
-                print("")
-                connected_devices_id_list.append(address)
-                device.disconnect()
-                time.sleep(1)
-            except pymodbus.exceptions.ModbusIOException:
-                print(f"No Device at ID {address}")
-                device.disconnect()
-                print("")
-                
-    return connected_devices_id_list
+def modbus_scan(start_id,end_id,port,baudrate,parity,timeout=sdm_modbus_modified.scanner.PROBE_TIMEOUT):
+    result = sdm_modbus_modified.scanner.scan(device=port,
+                                              baud=baudrate,
+                                              parity=parity,
+                                              units=range(start_id, end_id + 1),
+                                              timeout=timeout)
+
+    if result.error:
+        print(f"Could not open {port}: {result.error}")
+
+    for address in result.found:
+        print(f'Device detected at ID {address} ({result.units[address] * 1000:.1f} ms)')
+
+    print(f"Scanned {end_id - start_id + 1} IDs in {result.duration:.2f} s")
+
+    return result.found
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Scan Modbus RTU network for responding devices (SDM-compatible).")
@@ -44,6 +36,9 @@ if __name__ == "__main__":
     parser.add_argument("--end_id", type=int, default=247,
                         help="End of Modbus slave ID range to scan (default: 247)")
 
+    parser.add_argument("-t", "--timeout", type=float, default=sdm_modbus_modified.scanner.PROBE_TIMEOUT,
+                        help=f"Probe timeout in seconds (default: {sdm_modbus_modified.scanner.PROBE_TIMEOUT})")
+
     args = parser.parse_args()
 
     modbus_scan(
@@ -51,5 +46,6 @@ if __name__ == "__main__":
         end_id=args.end_id,
         port=args.port,
         baudrate=args.baudrate,
-        parity=args.parity
+        parity=args.parity,
+        timeout=args.timeout
     )
\ No newline at end of file
@@ -0,0 +1,83 @@
+import argparse
+import asyncio
+from sdm_modbus_modified import profiles, registry, simulator
+
+
+def parse_units(text):
+    units = []
+
+    for part in text.split(","):
+        start, _, end = part.partition("-")
+        units.extend(range(int(start), int(end or start) + 1))
+
+    return units
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Simulate Modbus meters over TCP and/or a pty-backed RTU link.")
+
+    parser.add_argument("-m", "--model", action="append", required=True,
+                        help="MODEL=UNITS, e.g. SDM630=1-100 or WS100-19=101,105. Repeat for several models. "
+                             f"Models: {', '.join(registry.names())}")
+
+    parser.add_argument("-p", "--profiles", type=str, default=None,
+                        help="Directory of register map profiles (JSON, TOML or YAML) adding models")
+
+    parser.add_argument("--host", type=str, default="127.0.0.1",
+                        help="TCP listen address (default: 127.0.0.1)")
+
+    parser.add_argument("--port", type=int, default=5020,
+                        help="TCP port, 0 to disable TCP (default: 5020)")
+
+    parser.add_argument("--rtu", action="store_true",
+                        help="Also open a pty carrying Modbus RTU and print its device path")
+
+    parser.add_argument("--baud", type=int, default=None,
+                        help="Delay RTU responses as on a serial line at this baudrate")
+
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="Response latency in seconds (default: 0)")
+
+    parser.add_argument("--jitter", type=float, default=0.0,
+                        help="Standard deviation of the latency in seconds (default: 0)")
+
+    parser.add_argument("--error_rate", type=float, default=0.0,
+                        help="Share of requests answered with an exception (default: 0)")
+
+    parser.add_argument("--drop_rate", type=float, default=0.0,
+                        help="Share of requests left unanswered (default: 0)")
+
+    return parser.parse_args()
+
+async def serve(args):
+    sim = simulator.Simulator(latency=args.latency, jitter=args.jitter,
+                              error_rate=args.error_rate, drop_rate=args.drop_rate)
+
+    if args.profiles:
+        profiles.load_directory(args.profiles)
+
+    for spec in args.model:
+        name, _, units = spec.partition("=")
+        sim.add(registry.get(name), parse_units(units or "1"))
+
+    if args.port:
+        host, port = await sim.serve_tcp(args.host, args.port)
+        print(f"Modbus TCP on {host}:{port}")
+
+    if args.rtu:
+        print(f"Modbus RTU on {await sim.serve_rtu(args.baud)}")
+
+    print(f"Simulating {len(sim.meters)} units")
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await sim.close()
+
+def main():
+    try:
+        asyncio.run(serve(parse_arguments()))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import argparse
+import json
+from sdm_modbus_modified import bus, profiles, registry, snapshot
+from sdm_modbus_modified.tools.modbus_simulator import parse_units
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Snapshot the holding registers of a bus and diff them against a desired state.")
+
+    connection = parser.add_mutually_exclusive_group()
+
+    connection.add_argument("--device", type=str, default=None,
+                            help="Serial port of an RTU bus (e.g. /dev/ttyUSB0)")
+
+    connection.add_argument("--host", type=str, default=None,
+                            help="Modbus TCP gateway address")
+
+    parser.add_argument("--port", type=int, default=502,
+                        help="Modbus TCP port (default: 502)")
+
+    parser.add_argument("-b", "--baud", type=int, default=9600,
+                        help="Baudrate (default: 9600)")
+
+    parser.add_argument("--parity", type=str, default="N", choices=["N", "E", "O"],
+                        help="Parity: N (None), E (Even), O (Odd). Default: N")
+
+    parser.add_argument("-u", "--units", type=str, default=None,
+                        help="Unit ids to detect and snapshot, e.g. 1-100 or 1,5,9")
+
+    parser.add_argument("-m", "--model", action="append", default=[],
+                        help="MODEL=UNITS, skip detection for these units. "
+                             f"Models: {', '.join(registry.names())}")
+
+    parser.add_argument("-p", "--profiles", type=str, default=None,
+                        help="Directory of register map profiles (JSON, TOML or YAML) adding models")
+
+    parser.add_argument("-s", "--snapshot", type=str, default=None,
+                        help="Load this snapshot instead of reading the bus")
+
+    parser.add_argument("-o", "--output", type=str, default=None,
+                        help="Save the snapshot to this file (gzipped JSON)")
+
+    parser.add_argument("-d", "--desired", type=str, default=None,
+                        help="Desired state JSON, or an earlier snapshot (.gz), to diff against")
+
+    parser.add_argument("--json", action="store_true",
+                        help="Print the differences as JSON")
+
+    return parser.parse_args()
+
+def take(args):
+    if args.device:
+        connection = {"device": args.device, "baud": args.baud, "parity": args.parity}
+    else:
+        connection = {"host": args.host or "127.0.0.1", "port": args.port}
+
+    with bus.Bus(**connection) as meters:
+        for spec in args.model:
+            name, _, units = spec.partition("=")
+
+            for unit in parse_units(units or "1"):
+                meters.add(unit, registry.get(name))
+
+        if args.units:
+            meters.detect([unit for unit in parse_units(args.units) if unit not in meters])
+
+        return snapshot.take(meters)
+
+def main():
+    args = parse_arguments()
+
+    if args.profiles:
+        profiles.load_directory(args.profiles)
+
+    taken = snapshot.Snapshot.load(args.snapshot) if args.snapshot else take(args)
+
+    if args.output:
+        taken.save(args.output)
+
+    print(f"{len(taken)} meters, {sum(entry.error is not None for entry in taken)} with read errors")
+
+    if not args.desired:
+        return
+
+    if args.desired.endswith(".gz"):
+        desired = snapshot.Snapshot.load(args.desired)
+    else:
+        desired = snapshot.DesiredState.load(args.desired)
+
+    differences = taken.diff(desired)
+
+    if args.json:
+        print(json.dumps([difference.as_dict() for difference in differences], indent=2, default=repr))
+    else:
+        for difference in differences:
+            print(f"{difference.bus} unit {difference.unit}: {difference.key} = {difference.actual!r}, expected {difference.expected!r}")
+
+        print(f"{len(differences)} differences")
+
+if __name__ == "__main__":
+    main()
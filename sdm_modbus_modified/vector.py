@@ -0,0 +1,88 @@
+_CODES = {"f": "f4", "e": "f2", "i": "i4", "I": "u4", "h": "i2", "H": "u2", "q": "i8", "Q": "u8"}
+
+
+def _require():
+    # NumPy is optional and slow to import, so it is only loaded by the first array result.
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("NumPy is required for array results, install sdm_modbus_modified[numpy]") from None
+
+    return numpy
+
+
+def dtype(fields):
+    """Returns the structured dtype of records holding `fields`: float64 for numbers, fixed size bytes otherwise."""
+
+    numpy = _require()
+
+    return numpy.dtype([
+        (f.key, f"S{f.length * 2}" if f.format and f.format.endswith("s") else "f8") for f in fields
+    ])
+
+
+def records(rows, fields):
+    """Packs result dicts, one per meter, into a structured array; `fields` are the Field objects of the columns."""
+
+    numpy = _require()
+
+    result = numpy.zeros(len(rows), dtype=dtype(fields))
+
+    for f in fields:
+        column = result[f.key]
+
+        if column.dtype.kind == "f":
+            column[:] = [row.get(f.key, numpy.nan) for row in rows]
+        else:
+            column[:] = [row.get(f.key, b"") for row in rows]
+
+    return result
+
+
+def decode(block, data, scaling=False, normalise=False):
+    """Decodes the same planned block read from many meters at once.
+
+    `data` holds the `block.count` words of each meter; every field is one column
+    of a structured view, scaled in one multiplication.
+    """
+
+    numpy = _require()
+
+    pack, unpack = block.orders
+    fields = [field for field, _ in block.entries if field.format is not None]
+    names, formats, offsets = [], [], []
+
+    for field, offset in block.entries:
+        if field.format is None:
+            continue
+
+        names.append(field.key)
+        formats.append(f"S{field.length * 2}" if field.format.endswith("s") else unpack + _CODES[field.format])
+        offsets.append(offset * 2)
+
+    layout = numpy.dtype({"names": names, "formats": formats, "offsets": offsets, "itemsize": block.count * 2})
+    raw = numpy.ascontiguousarray(data, dtype=f"{pack}u2").reshape(-1, block.count).view(layout)[:, 0]
+
+    result = numpy.empty(len(raw), dtype=dtype(fields))
+
+    for f in fields:
+        column = raw[f.key]
+
+        if column.dtype.kind != "S":
+            # Truncated like int(value) and scaled in float64, as Block.decode does.
+            # Signalling NaNs are quietened silently, like struct does.
+            with numpy.errstate(invalid="ignore"):
+                if f.vtype is int and column.dtype.kind == "f":
+                    column = numpy.trunc(column)
+
+                column = column.astype("f8")
+
+            if scaling:
+                factor = f.normalised_factor if normalise else f.factor
+
+                if factor is not None and factor != 1:
+                    column *= factor
+
+        result[f.key] = column
+
+    return result
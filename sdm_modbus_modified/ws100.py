@@ -1,18 +1,19 @@
+import logging
+
 from sdm_modbus_modified import meter
 import pymodbus.exceptions
 
+logger = logging.getLogger(__name__)
+
 
 class WS100(meter.Meter):
     pass
 
 class WS100_19XX(WS100):
+    model = "WS100_19XX"
+    baud = 9600
 
-    def __init__(self, *args, **kwargs):
-        self.model = "WS100_19XX"
-        self.baud = 9600
-
-        super().__init__(*args, **kwargs)
-        self.registers = {
+    registers = {
         # ======================
         # Instant Measures
         # ======================
@@ -51,10 +52,10 @@ class WS100_19XX(WS100):
         # ======================
         # Power Demand
         # ======================
-            "forward_active_demand": (0x0176, 2, meter.registerType.INPUT, meter.registerDataType.INT32, int, "Forward Active Demand", "W", 2, 1,1),
-            "reverse_active_demand": (0x017A, 2, meter.registerType.INPUT, meter.registerDataType.INT32, int, "Reverse Active Demand", "W", 2, 1,1),
-            "forward_reactive_demand": (0x0180, 2, meter.registerType.INPUT, meter.registerDataType.INT32, int, "Forward Reactive Demand", "var", 2, 1,1),
-            "reverse_reactive_demand": (0x0184, 2, meter.registerType.INPUT, meter.registerDataType.INT32, int, "Reverse Reactive Demand", "var", 2, 1,1),
+        "forward_active_demand": (0x0176, 2, meter.registerType.INPUT, meter.registerDataType.INT32, int, "Forward Active Demand", "W", 2, 1,1),
+        "reverse_active_demand": (0x017A, 2, meter.registerType.INPUT, meter.registerDataType.INT32, int, "Reverse Active Demand", "W", 2, 1,1),
+        "forward_reactive_demand": (0x0180, 2, meter.registerType.INPUT, meter.registerDataType.INT32, int, "Forward Reactive Demand", "var", 2, 1,1),
+        "reverse_reactive_demand": (0x0184, 2, meter.registerType.INPUT, meter.registerDataType.INT32, int, "Reverse Reactive Demand", "var", 2, 1,1),
 
         # ======================
         # 3. Meter Parameters (Zählerparameter)
@@ -89,23 +90,46 @@ class WS100_19XX(WS100):
         "tariff_table_8": (0x1754, 12, meter.registerType.HOLDING, meter.registerDataType.BYTES, bytes, "Time Period Table 8", "", None, None, None),
         "time_zone_table": (0x1760, 12, meter.registerType.HOLDING, meter.registerDataType.BYTES, bytes, "Time Zone Table", "", None, None, None),
         "holidays_table": (0x176C, 21, meter.registerType.HOLDING, meter.registerDataType.BYTES, bytes, "Holidays Table", "", None, None, None),
-                }
+    }
 
     def read_scaled(self, key):
-            """Reads a register and scales the data"""
-            if key not in self.registers:
-                raise KeyError(key)
+        """Reads a register and scales the data"""
+        if key not in self.register_map:
+            raise KeyError(key)
 
-            value = self._read(self.registers[key])
-            _, _, _, _, _, _, _, _, scale, decimals = self.registers[key]
-            return value * scale * (10 ** -decimals)
+        field = self.register_map[key]
+        return scaled(field, self._read(field))
 
     def read_all_scaled(self):
-        """Reads all registers with their scales"""
+        """Reads all registers with their scales, one block read per planned block"""
         result = {}
-        for k in self.registers.keys():
+        for block in planned_blocks(self):
             try:
-                result[k] = self.read_scaled(k)
+                values = self._read_all(block, scaling=True)
             except pymodbus.exceptions.ModbusIOException:
-                print(f'Problem with register address: {k}')
+                values = {}
+            merge_scaled(result, block, values)
         return result
+
+
+def planned_blocks(device):
+    """Yields the planned blocks of every register type of `device`."""
+    register_map = device.register_map
+    for rtype in register_map.rtypes:
+        yield from register_map.plan(rtype, device.max_registers, device.max_gap)
+
+
+def merge_scaled(result, block, values):
+    """Adds the values read from `block` to `result`, logging the registers that could not be read."""
+    for k in block.keys:
+        if k in values:
+            result[k] = values[k]
+        else:
+            logger.warning("Problem with register address: %s", k)
+
+
+def scaled(field, value):
+    """Applies the precomputed scale * 10**-decimals of a field; parameters without a scale are returned as read."""
+    if field.factor is None:
+        return value
+    return value * field.factor
@@ -7,4 +7,9 @@ setup(
     install_requires=[
         'pymodbus',
     ],
+    extras_require={
+        'numpy': ['numpy'],
+        'toml': ['tomli; python_version < "3.11"'],
+        'yaml': ['PyYAML'],
+    },
 )
@@ -0,0 +1,74 @@
+import asyncio
+import logging
+
+import pytest
+
+from sdm_modbus_modified import aio, meter, regmap, simulator
+
+MODEL = aio.AsyncSDM630
+
+
+@pytest.fixture(autouse=True)
+def quiet(caplog):
+    caplog.set_level(logging.CRITICAL, logger="pymodbus")
+
+
+def _run(main):
+    async def serve():
+        sim = simulator.Simulator()
+        sim.add(MODEL, [1, 2])
+        host, port = await sim.serve_tcp(port=0)
+
+        try:
+            return await main(host, port)
+        finally:
+            await sim.close()
+
+    return asyncio.run(serve())
+
+
+def test_units_are_read_concurrently():
+    async def main(host, port):
+        devices = [MODEL(host=host, port=port, unit=unit) for unit in (1, 2)]
+
+        for device in devices:
+            await device.connect()
+
+        try:
+            return await asyncio.gather(*(device.read_all(scaling=True) for device in devices))
+        finally:
+            for device in devices:
+                device.disconnect()
+
+    results = _run(main)
+    keys = {f.key for f in regmap.for_model(MODEL).rtypes[meter.registerType.INPUT] if f.format is not None}
+
+    for values in results:
+        assert set(values) == keys
+        assert 45 < values["frequency"] < 65
+        assert 200 < values["l1_voltage"] < 260
+
+
+def test_read_and_read_many_agree_with_read_all():
+    async def main(host, port):
+        async with MODEL(host=host, port=port, unit=2) as device:
+            holding = await device.read_all(meter.registerType.HOLDING)
+            single = {key: await device.read(key) for key in holding}
+            many = await device.read_many(["serial_number", "frequency"])
+
+            return holding, single, many
+
+    holding, single, many = _run(main)
+
+    assert single == holding
+    assert many["serial_number"] == holding["serial_number"]
+    assert 45 < many["frequency"] < 65
+
+
+def test_unknown_key_raises():
+    async def main(host, port):
+        async with MODEL(host=host, port=port, unit=1) as device:
+            with pytest.raises(KeyError):
+                await device.read("no_such_register")
+
+    _run(main)
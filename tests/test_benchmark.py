@@ -0,0 +1,29 @@
+import json
+import subprocess
+import sys
+
+
+def _run(tmp_path, *args):
+    path = tmp_path / "results.json"
+    command = [sys.executable, "-m", "sdm_modbus_modified.tools.benchmark", "-r", "2", "-n", "10", "-o", str(path), *args]
+    subprocess.run(command, check=True, capture_output=True, timeout=120)
+
+    return json.loads(path.read_text())
+
+
+def test_selected_benchmarks_run_against_the_simulator(tmp_path):
+    report = _run(tmp_path, "--only", "*read_all*")
+    results = report["results"]
+
+    assert {r["name"] for r in results} == {"_read_all", "read_all", "ws100_read_all_scaled"}
+    assert not [r for r in results if "error" in r]
+    assert all(0 < r["min"] <= r["p50"] <= r["p95"] for r in results)
+    assert {r["params"]["model"] for r in results if r["name"] == "read_all"} >= {"SDM630", "WS100_19XX"}
+    assert report["meta"]["pymodbus"]
+
+
+def test_fleet_cycle_polls_the_requested_sizes(tmp_path):
+    results = _run(tmp_path, "--only", "fleet_cycle", "--fleet", "2,5")["results"]
+
+    assert [r["params"]["meters"] for r in results] == [2, 5]
+    assert not [r for r in results if "error" in r]
@@ -0,0 +1,52 @@
+import logging
+
+import pytest
+from pymodbus.client import ModbusTcpClient
+
+from sdm_modbus_modified import bus, registry, simulator
+
+SDM630 = registry.get("SDM630")
+SDM120 = registry.get("SDM120")
+
+
+@pytest.fixture
+def sim(caplog):
+    caplog.set_level(logging.CRITICAL, logger="pymodbus")
+    sim = simulator.Simulator()
+    sim.add(SDM630, [1])
+    sim.add(SDM120, [2])
+
+    yield sim
+
+    sim.stop()
+
+
+def _bus(sim, devices):
+    host, port = sim.start()
+    client = ModbusTcpClient(host, port=port, timeout=0.05, retries=0)
+
+    return bus.Bus(devices, host=host, port=port, retries=1, client=client)
+
+
+def test_units_of_any_model_share_the_bus_client(sim):
+    with _bus(sim, {1: SDM630, 2: SDM120, 9: SDM630}) as units:
+        results = units.read_all(scaling=True)
+        many = units.read_many(["frequency", "l1_voltage", "voltage"])
+
+        assert all(units[unit].client is units.root.client for unit in units)
+        assert set(units.errors) == {9}
+
+    assert 200 < results[1]["l1_voltage"] < 260
+    assert 200 < results[2]["voltage"] < 260
+    assert results[9] is None
+    assert set(many[1]) == {"frequency", "l1_voltage"}
+    assert set(many[2]) == {"frequency", "voltage"}
+
+
+def test_detected_units_are_added(sim):
+    with _bus(sim, {}) as units:
+        detections = units.detect([1, 2, 9])
+
+        assert {unit: type(units[unit]) for unit in units} == {1: SDM630, 2: SDM120}
+        assert detections[9].model is None
+        assert all(values for values in units.read_all().values())
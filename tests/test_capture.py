@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+from pymodbus.client import AsyncModbusTcpClient, ModbusTcpClient
+from pymodbus.exceptions import ModbusIOException
+
+from sdm_modbus_modified import capture, meter, registry, simulator
+
+MODEL = registry.get("SDM630")
+
+
+@pytest.fixture(autouse=True)
+def quiet(caplog):
+    caplog.set_level("CRITICAL", logger="pymodbus")
+
+
+def test_replay_serves_captured_reads(tmp_path):
+    path = tmp_path / "bus.cap"
+    sim = simulator.Simulator()
+    sim.add(MODEL, [1])
+    host, port = sim.start()
+
+    try:
+        device = MODEL(host=host, port=port, unit=1)
+
+        with capture.attach(device, path):
+            captured = device.read_all(meter.registerType.INPUT)
+            holding = device.read_all(meter.registerType.HOLDING)
+
+        capture.detach(device)
+        device.disconnect()
+    finally:
+        sim.stop()
+
+    records = list(capture.read(path))
+    replayed = MODEL(host="replay", client=capture.ReplayClient(path))
+
+    assert {r.function for r in records} == {capture.READ_INPUT, capture.READ_HOLDING}
+    assert all(r.registers is not None for r in records)
+    assert replayed.read_all(meter.registerType.INPUT) == captured
+    assert replayed.read_all(meter.registerType.HOLDING) == holding
+
+
+def test_failed_sync_read_is_logged_and_raised(tmp_path):
+    path = tmp_path / "bus.cap"
+    sim = simulator.Simulator()
+    sim.add(MODEL, [1])
+    host, port = sim.start()
+
+    try:
+        client = ModbusTcpClient(host, port=port, timeout=0.2, retries=0)
+
+        with capture.Capture(path) as log:
+            wrapped = capture.CaptureClient(client, log)
+
+            with pytest.raises(ModbusIOException):
+                wrapped.read_input_registers(0, count=2, slave=9)
+
+            assert wrapped.read_input_registers(0, count=2, slave=1).registers
+
+        client.close()
+    finally:
+        sim.stop()
+
+    failed, read = capture.read(path)
+
+    assert (failed.unit, failed.function, failed.registers) == (9, capture.READ_INPUT, None)
+    assert (read.unit, len(read.registers)) == (1, 2)
+
+
+def test_failed_async_read_is_logged_and_raised(tmp_path):
+    path = tmp_path / "bus.cap"
+
+    async def main():
+        sim = simulator.Simulator()
+        sim.add(MODEL, [1])
+        host, port = await sim.serve_tcp(port=0)
+        client = AsyncModbusTcpClient(host, port=port, timeout=0.2, retries=0)
+
+        try:
+            await client.connect()
+
+            with capture.Capture(path) as log:
+                with pytest.raises(ModbusIOException):
+                    await capture.CaptureClient(client, log).read_holding_registers(0, count=2, slave=9)
+        finally:
+            client.close()
+            await sim.close()
+
+    asyncio.run(main())
+
+    [failed] = capture.read(path)
+
+    assert (failed.unit, failed.function, failed.registers) == (9, capture.READ_HOLDING, None)
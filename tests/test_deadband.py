@@ -0,0 +1,67 @@
+import pytest
+
+from sdm_modbus_modified import deadband, meter, registry, simulator
+
+MODEL = registry.get("SDM630")
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def device(caplog):
+    caplog.set_level("CRITICAL", logger="pymodbus")
+    sim = simulator.Simulator()
+    sim.add(MODEL, [1])
+    host, port = sim.start()
+    device = MODEL(host=host, port=port, unit=1)
+
+    yield device
+
+    device.disconnect()
+    sim.stop()
+
+
+def test_keyframes_are_kept_per_key_across_register_types(device):
+    clock = Clock()
+    stage = deadband.Deadband(device, keyframe=60, clock=clock)
+    holding = device.read_all(meter.registerType.HOLDING)
+
+    for tick in range(7):
+        clock.now = tick * 30.0
+        stage.read_all(meter.registerType.INPUT)
+        emitted = stage.read_all(meter.registerType.HOLDING)
+
+        assert emitted == (holding if tick % 2 == 0 else {}), clock.now
+
+
+def test_single_reads_do_not_use_up_the_keyframe(device):
+    clock = Clock()
+    stage = deadband.Deadband(device, keyframe=60, clock=clock)
+    holding = device.read_all(meter.registerType.HOLDING)
+    key = next(iter(holding))
+
+    assert stage.read_all(meter.registerType.HOLDING) == holding
+
+    clock.now = 60.0
+    assert stage.read(key) == holding[key]
+    assert stage.read_all(meter.registerType.HOLDING) == {k: v for k, v in holding.items() if k != key}
+
+
+def test_values_within_the_deadband_are_held_back(device):
+    clock = Clock()
+    stage = deadband.Deadband(device, keyframe=60, deadbands={"V": 1000.0}, clock=clock)
+    voltages = {f.key for f in device.register_map.rtypes[meter.registerType.INPUT] if f.unit == "V"}
+
+    assert voltages <= set(stage.read_all(scaling=True))
+
+    clock.now = 30.0
+    assert not voltages & set(stage.read_all(scaling=True))
+
+    clock.now = 60.0
+    assert voltages <= set(stage.read_all(scaling=True))
@@ -0,0 +1,52 @@
+import json
+import logging
+
+import pytest
+from pymodbus.client import ModbusTcpClient
+
+from sdm_modbus_modified import detect, meter, registry, simulator
+
+UNITS = {1: "SDM630", 2: "SDM120", 3: "GNM3D", 4: "ESP-P1"}
+
+
+@pytest.fixture
+def root(caplog):
+    caplog.set_level(logging.CRITICAL, logger="pymodbus")
+    sim = simulator.Simulator()
+
+    for unit, name in UNITS.items():
+        sim.add(registry.get(name), [unit])
+
+    host, port = sim.start()
+    client = ModbusTcpClient(host, port=port, timeout=0.05, retries=0)
+    root = meter.Meter(host=host, port=port, retries=1, client=client)
+
+    yield sim, root
+
+    root.disconnect()
+    sim.stop()
+
+
+def test_bus_is_detected_once_and_then_served_from_the_cache(root, tmp_path):
+    sim, root = root
+    path = tmp_path / "fingerprints.json"
+    detections = detect.Detector(cache=detect.FingerprintCache(path)).detect_bus(root, [1, 2, 3, 4])
+
+    assert {unit: d.model for unit, d in detections.items()} == {unit: registry.get(name) for unit, name in UNITS.items()}
+    assert not any(d.cached for d in detections.values())
+    assert set(json.loads(path.read_text())[detect.bus_key(root)]) == {"1", "2", "3", "4"}
+
+    requests = sim.requests
+    cached = detect.Detector(cache=detect.FingerprintCache(path)).detect_bus(root, [1, 2])
+
+    assert all(d.cached for d in cached.values())
+    assert cached[2].model is registry.get("SDM120")
+    assert sim.requests == requests
+
+
+def test_silent_unit_is_not_identified(root):
+    _, root = root
+    detection = detect.Detector().detect(meter.Meter(parent=root, unit=9))
+
+    assert detection.model is None
+    assert detection.scores == {}
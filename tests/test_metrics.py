@@ -0,0 +1,62 @@
+import logging
+
+import pytest
+from pymodbus.client import ModbusTcpClient
+from pymodbus.exceptions import ModbusIOException
+
+from sdm_modbus_modified import meter, metrics, registry, simulator
+
+MODEL = registry.get("SDM630")
+
+
+@pytest.fixture
+def root(caplog):
+    caplog.set_level(logging.CRITICAL, logger="pymodbus")
+    sim = simulator.Simulator()
+    sim.add(MODEL, [1, 2])
+    host, port = sim.start()
+    client = ModbusTcpClient(host, port=port, timeout=0.05, retries=0)
+    root = MODEL(host=host, port=port, unit=1, retries=2, client=client, metrics=metrics.Metrics())
+
+    yield root
+
+    root.disconnect()
+    sim.stop()
+
+
+def test_block_reads_are_counted_per_unit(root):
+    child = MODEL(parent=root, unit=2)
+    blocks = root.plan(meter.registerType.INPUT)
+
+    root.read_all()
+    child.read_all()
+
+    assert child.metrics is root.metrics
+
+    series = {(s["unit"], s["function"]): s for s in root.metrics.as_dict()["series"]}
+
+    for unit in (1, 2):
+        values = series[(unit, metrics.READ_INPUT)]
+
+        assert values["requests"] == values["latency"]["count"] == len(blocks)
+        assert values["registers_fetched"] == sum(block.count for block in blocks)
+        assert values["registers_used"] == sum(block.used for block in blocks)
+        assert "timeouts" not in values and "errors" not in values
+
+
+def test_failures_are_counted_by_outcome(root):
+    assert root._read_input_registers(0x7000, 2) is None
+
+    with pytest.raises(ModbusIOException):
+        MODEL(parent=root, unit=9).read("frequency")
+
+    series = {(s["unit"], s["function"]): s for s in root.metrics.as_dict()["series"]}
+
+    assert series[(1, metrics.READ_INPUT)]["errors"] == 2
+    assert series[(1, metrics.READ_INPUT)]["retries"] == 1
+    assert series[(9, metrics.READ_INPUT)]["timeouts"] == 1
+
+    text = root.metrics.to_prometheus()
+
+    assert 'sdm_modbus_timeouts_total{unit="9",function="4"} 1' in text
+    assert 'sdm_modbus_request_duration_seconds_count{unit="1",function="4"} 2' in text
@@ -0,0 +1,39 @@
+import json
+import subprocess
+import sys
+
+import sdm_modbus_modified
+
+
+def _loaded(code):
+    script = f"import json, sys\n{code}\nprint(json.dumps(sorted(sys.modules)))"
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True)
+
+    return set(json.loads(result.stdout.splitlines()[-1]))
+
+
+def test_import_loads_no_model_and_no_pymodbus():
+    modules = _loaded("import sdm_modbus_modified")
+
+    assert "sdm_modbus_modified.registry" in modules
+    assert not {m for m in modules if m.startswith("pymodbus") or m == "numpy"}
+    assert not {"sdm_modbus_modified.meter", "sdm_modbus_modified.sdm", "sdm_modbus_modified.garo"} & modules
+
+
+def test_model_access_loads_only_its_module():
+    modules = _loaded("import sdm_modbus_modified\nsdm_modbus_modified.model('SDM630')")
+
+    assert "sdm_modbus_modified.sdm" in modules
+    assert not {"sdm_modbus_modified.garo", "sdm_modbus_modified.espp1", "sdm_modbus_modified.ws100"} & modules
+
+
+def test_star_import_keeps_the_previous_names():
+    namespace = {}
+    exec("from sdm_modbus_modified import *", namespace)
+
+    for name in ("Meter", "registerType", "registerDataType", "Endian", "SDM630", "GNM3D", "ModbusTcpClient",
+                 "ReadHoldingRegistersResponse"):
+        assert name in namespace, name
+
+    assert sdm_modbus_modified.meter.registerType is namespace["registerType"]
+    assert sdm_modbus_modified.ModbusSerialClient.__module__.startswith("pymodbus.client")
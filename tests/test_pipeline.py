@@ -0,0 +1,140 @@
+import array
+import logging
+import math
+import random
+
+import pytest
+
+from sdm_modbus_modified import meter, pipeline, registry, regmap, simulator
+
+numpy = pytest.importorskip("numpy")
+
+MODELS = ("SDM630", "SDM120", "WS100-19")
+
+
+def _readings(name, rtype, units, rng, sequence=array.array):
+    model = registry.get(name)
+    plan = regmap.for_model(model).plan(rtype, model.max_registers, model.max_gap)
+    readings = []
+
+    for unit in range(units):
+        blocks = tuple(sequence("H", [rng.randrange(0x10000) for _ in range(block.count)]) for block in plan)
+        readings.append(pipeline.RawReading((name, unit), name, rtype, model.max_registers, model.max_gap, blocks))
+
+    return plan, readings
+
+
+def _expected(plan, reading, scaling=True):
+    values = {}
+
+    for block, data in zip(plan, reading.blocks):
+        if data is not None:
+            values.update(block.decode(list(data), scaling))
+
+    return values
+
+
+def _check(records, plan, readings):
+    by_key = {reading.key: reading for reading in readings}
+    names = records.values.dtype.names
+
+    for key, record in zip(records.keys, records.values):
+        expected = _expected(plan, by_key[key])
+
+        for name in names:
+            if name not in expected:
+                assert math.isnan(record[name]) or record[name] == b"", name
+            elif isinstance(expected[name], bytes):
+                assert record[name] == expected[name].rstrip(b"\0"), name
+            elif math.isnan(expected[name]):
+                assert math.isnan(record[name]), name
+            else:
+                assert record[name] == expected[name], name
+
+
+@pytest.mark.parametrize("name", MODELS)
+def test_decode_matches_block_decode(name):
+    rng = random.Random(0)
+    plan, readings = _readings(name, meter.registerType.INPUT, 20, rng)
+    readings[3].blocks = (None,) + readings[3].blocks[1:]
+
+    (records,) = pipeline.decode(readings, scaling=True)
+
+    assert (records.model, records.rtype, len(records)) == (name, meter.registerType.INPUT, 20)
+    _check(records, plan, readings)
+
+
+def test_decode_accepts_plain_sequences():
+    plan, readings = _readings("SDM630", meter.registerType.HOLDING, 5, random.Random(1), lambda _, words: tuple(words))
+
+    (records,) = pipeline.decode(readings, scaling=True)
+
+    _check(records, plan, readings)
+
+
+def test_decode_rejects_readings_of_another_plan():
+    _, readings = _readings("SDM630", meter.registerType.INPUT, 2, random.Random(2))
+    readings[1].blocks = readings[1].blocks[:1] + (readings[1].blocks[1][:-1],) + readings[1].blocks[2:]
+
+    with pytest.raises(ValueError):
+        pipeline.decode(readings)
+
+
+def test_aggregate_matches_column_statistics():
+    plan, readings = _readings("SDM630", meter.registerType.INPUT, 50, random.Random(3))
+    aggregates = pipeline.aggregate(pipeline.decode(readings, scaling=True))["SDM630"]
+    rows = [_expected(plan, reading) for reading in readings]
+
+    for key, aggregate in aggregates.items():
+        column = [row[key] for row in rows if not math.isnan(row[key])]
+
+        assert aggregate.count == len(column)
+        assert aggregate.minimum == min(column)
+        assert aggregate.maximum == max(column)
+        assert aggregate.total == pytest.approx(math.fsum(column), rel=1e-9, abs=1e-9)
+
+
+def test_worker_pool_matches_in_process():
+    rng = random.Random(4)
+    readings = []
+
+    for name in ("SDM630", "SDM120"):
+        readings += _readings(name, meter.registerType.INPUT, 7, rng)[1]
+
+    readings[5].blocks = readings[5].blocks[:-1] + (None,)
+    expected = {records.model: records for records in pipeline.decode(readings, scaling=True)}
+
+    with pipeline.Pipeline(workers=1, batch_size=3, scaling=True) as pipe:
+        decoded = pipe.decode(readings)
+        aggregates = pipe.aggregate(readings)
+
+    for records in decoded:
+        assert records.keys == expected[records.model].keys
+        assert records.values.tobytes() == expected[records.model].values.tobytes()
+
+    assert {name: {key: one.as_dict() for key, one in model.items()} for name, model in aggregates.items()} == \
+        {name: {key: one.as_dict() for key, one in model.items()} for name, model in pipeline.aggregate(expected.values()).items()}
+
+
+def test_collect_from_simulator(caplog):
+    caplog.set_level(logging.CRITICAL, logger="pymodbus")
+    model = registry.get("SDM630")
+    sim = simulator.Simulator()
+    sim.add(model, [1])
+    host, port = sim.start()
+
+    try:
+        device = model(host=host, port=port, unit=1)
+        readings = pipeline.collect(device, meter.registerType)
+        device.disconnect()
+    finally:
+        sim.stop()
+
+    for reading in readings:
+        plan = device.register_map.plan(reading.rtype, device.max_registers, device.max_gap)
+        (records,) = pipeline.decode([reading], scaling=True)
+
+        assert records.keys == [1]
+        assert all(isinstance(block, array.array) for block in reading.blocks)
+        _check(records, plan, [reading])
+        assert records.as_dicts()[1].keys() == _expected(plan, reading).keys()
@@ -0,0 +1,73 @@
+import pytest
+
+from sdm_modbus_modified import meter, planner, registry, regmap
+
+MODELS = [registry.get(name) for name in registry.MODELS]
+
+
+def _spans(block):
+    return [(key, block.address + offset, length) for key, offset, length in block.fields]
+
+
+def test_plan_reads_merges_within_gap_and_size():
+    spans = [("a", 0, 2), ("b", 2, 2), ("c", 10, 2), ("d", 100, 2)]
+
+    plan = planner.plan_reads(spans, max_registers=20, max_gap=6)
+
+    assert [(block.address, block.count, block.keys) for block in plan] == [
+        (0, 12, ("a", "b", "c")),
+        (100, 2, ("d",)),
+    ]
+    assert (plan.transactions, plan.words, plan.used) == (2, 14, 8)
+
+
+def test_plan_reads_splits_at_max_registers():
+    spans = [(str(i), 2 * i, 2) for i in range(10)]
+
+    plan = planner.plan_reads(spans, max_registers=6, max_gap=0)
+
+    assert [block.count for block in plan] == [6, 6, 6, 2]
+    assert [key for block in plan for key in block.keys] == [str(i) for i in range(10)]
+
+
+def test_plan_reads_keeps_overlapping_spans_in_one_block():
+    plan = planner.plan_reads([("wide", 0, 4), ("low", 0, 2), ("high", 2, 2)], max_gap=0)
+
+    assert [(block.address, block.count, block.used) for block in plan] == [(0, 4, 4)]
+
+
+@pytest.mark.parametrize("max_registers, max_gap", [(0, 0), (10, -1)])
+def test_plan_reads_rejects_bad_policy(max_registers, max_gap):
+    with pytest.raises(ValueError):
+        planner.plan_reads([("a", 0, 2)], max_registers, max_gap)
+
+
+def test_plan_writes_merges_only_adjacent_spans():
+    plan = planner.plan_writes([("c", 5, 1), ("a", 0, 2), ("b", 2, 2)], max_registers=4)
+
+    assert [(block.address, block.count, block.keys) for block in plan] == [
+        (0, 4, ("a", "b")),
+        (5, 1, ("c",)),
+    ]
+
+
+def test_plan_writes_rejects_overlaps():
+    with pytest.raises(ValueError):
+        planner.plan_writes([("a", 0, 2), ("b", 1, 2)])
+
+
+@pytest.mark.parametrize("rtype", list(meter.registerType), ids=lambda rtype: rtype.name)
+@pytest.mark.parametrize("model", MODELS, ids=lambda model: model.__name__)
+def test_model_plans_cover_every_field_once(model, rtype):
+    register_map = regmap.for_model(model)
+    plan = register_map.plan(rtype, model.max_registers, model.max_gap)
+    planned = [span for block in plan for span in _spans(block)]
+
+    assert sorted(key for key, _, _ in planned) == sorted(f.key for f in register_map.rtypes[rtype])
+
+    for block in plan:
+        assert block.count <= model.max_registers or len(block.fields) == 1
+
+        for key, address, length in _spans(block):
+            field = register_map.fields[key]
+            assert (address, length) == (field.address, field.length)
@@ -0,0 +1,69 @@
+import pytest
+
+from sdm_modbus_modified import policy, registry, simulator
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_same_unit_on_two_buses_is_tracked_apart():
+    clock = Clock()
+    adaptive = policy.Policy(threshold=2, backoff=5.0, clock=clock)
+    first = ("/dev/ttyUSB0@9600N1", 1)
+    second = ("10.0.0.2:502", 1)
+
+    adaptive.failure(first)
+    adaptive.failure(first)
+    adaptive.success(second, 0.01)
+
+    with pytest.raises(policy.Quarantined) as raised:
+        adaptive.allow(first)
+
+    assert (raised.value.bus, raised.value.unit) == first
+    assert adaptive.allow(second)
+    assert adaptive.attempts(second) == adaptive.retries
+    assert adaptive.quarantined() == [first]
+
+    clock.now = 5.0
+    assert adaptive.allow(first)
+
+
+def test_timeout_follows_round_trips_after_warmup():
+    adaptive = policy.Policy(warmup=3, margin=2.0, min_timeout=0.05, max_timeout=1.0)
+    key = ("10.0.0.2:502", 7)
+
+    assert adaptive.timeout(key) == 1.0
+
+    for _ in range(3):
+        adaptive.success(key, 0.1)
+
+    assert adaptive.timeout(key) == pytest.approx(0.2)
+    assert adaptive.as_dict() == {"10.0.0.2:502": {7: {"samples": 3, "timeout": pytest.approx(0.2), "failures": 0, "quarantined": False}}}
+
+
+def test_policy_meter_leaves_a_shared_client_as_it_found_it(caplog):
+    caplog.set_level("CRITICAL", logger="pymodbus")
+    model = registry.get("SDM630")
+    sim = simulator.Simulator()
+    sim.add(model, [1, 2])
+    host, port = sim.start()
+
+    try:
+        plain = model(host=host, port=port, unit=1, timeout=2, shared=True)
+        adaptive = model(host=host, port=port, unit=2, timeout=2, shared=True, policy=policy.Policy(max_timeout=0.2))
+        client = plain.client.client
+        settings = (client.comm_params.timeout_connect, client.transaction.retries)
+
+        assert adaptive.client.client is client
+        assert adaptive.read_all()
+        assert (client.comm_params.timeout_connect, client.transaction.retries) == settings
+        assert plain.read_all()
+    finally:
+        plain.disconnect()
+        adaptive.disconnect()
+        sim.stop()
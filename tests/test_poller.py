@@ -0,0 +1,71 @@
+import asyncio
+import logging
+import time
+
+import pytest
+
+from sdm_modbus_modified import poller, registry, simulator
+
+
+@pytest.fixture(autouse=True)
+def quiet(caplog):
+    caplog.set_level(logging.CRITICAL, logger="pymodbus")
+
+
+def _run(main, latency=0.0):
+    async def serve():
+        sim = simulator.Simulator(latency=latency)
+        sim.add(registry.get("SDM630"), [1, 2])
+        sim.add(registry.get("SDM120"), [3])
+        first = await sim.serve_tcp(port=0)
+        second = await sim.serve_tcp(port=0)
+
+        try:
+            return await main(first, second)
+        finally:
+            await sim.close()
+
+    return asyncio.run(serve())
+
+
+def test_cycle_reads_every_unit_and_records_failures():
+    sdm630, sdm120 = registry.get("SDM630"), registry.get("SDM120")
+
+    async def main(first, second):
+        fleet = {"gateways": [
+            {"host": first[0], "port": first[1], "devices": {1: sdm630, 2: sdm630}},
+            {"host": second[0], "port": second[1], "devices": {3: sdm120, 9: sdm120}, "timeout": 0.2},
+        ]}
+
+        async with poller.Poller.from_fleet(fleet, scaling=True) as fleet_poller:
+            return await fleet_poller.cycle(), fleet_poller
+
+    results, fleet_poller = _run(main)
+    names = list(fleet_poller.buses)
+
+    assert set(results[names[0]]) == {1, 2}
+    assert all(45 < values["frequency"] < 65 for values in results[names[0]].values())
+    assert 200 < results[names[1]][3]["voltage"] < 260
+    assert results[names[1]][9] is None
+    assert set(fleet_poller.errors[names[1]]) == {9}
+    assert set(fleet_poller.read_times[names[1]]) == {3, 9}
+
+
+def test_buses_are_polled_concurrently():
+    sdm630 = registry.get("SDM630")
+
+    async def main(first, second):
+        fleet_poller = poller.Poller()
+        fleet_poller.add_gateway(first[0], {1: sdm630}, port=first[1])
+        fleet_poller.add_gateway(second[0], {2: sdm630}, port=second[1])
+
+        async with fleet_poller:
+            start = time.monotonic()
+            results = await fleet_poller.cycle()
+
+            return results, time.monotonic() - start, fleet_poller.cycle_times
+
+    results, elapsed, cycle_times = _run(main, latency=0.1)
+
+    assert all(values for bus in results.values() for values in bus.values())
+    assert elapsed < 0.8 * sum(cycle_times.values())
@@ -0,0 +1,70 @@
+import logging
+import threading
+
+import pytest
+from pymodbus.client import ModbusTcpClient
+
+from sdm_modbus_modified import meter, pool, registry, simulator
+
+MODEL = registry.get("SDM630")
+
+
+@pytest.fixture
+def address(caplog):
+    caplog.set_level(logging.CRITICAL, logger="pymodbus")
+    sim = simulator.Simulator()
+    sim.add(MODEL, [1, 2, 3])
+
+    yield sim.start()
+
+    sim.stop()
+
+
+def test_meters_on_one_host_share_a_client(address):
+    host, port = address
+    devices = [MODEL(host=host, port=port, unit=unit, shared=True) for unit in (1, 2, 3)]
+    shared = devices[0].client
+
+    try:
+        assert all(device.client is shared for device in devices)
+        assert shared.refs == 3
+
+        with pytest.raises(ValueError):
+            MODEL(host=host, port=port, unit=1, shared=True, timeout=5)
+
+        results = {}
+
+        def read(device):
+            results[device.unit] = device.read_all(meter.registerType.HOLDING)
+
+        threads = [threading.Thread(target=read, args=(device,)) for device in devices]
+
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert set(results) == {1, 2, 3}
+        assert all(values["serial_number"] == results[1]["serial_number"] for values in results.values())
+    finally:
+        for device in devices:
+            device.disconnect()
+
+    assert shared.refs == 0
+
+
+def test_released_client_is_closed_after_the_idle_timeout(address):
+    host, port = address
+    connections = pool.ConnectionPool(idle_timeout=0)
+    key = ("tcp", host, port)
+    shared = connections.acquire(key, lambda: ModbusTcpClient(host, port=port))
+
+    assert connections.acquire(key, lambda: None) is shared
+    assert shared.connect()
+
+    shared.close()
+    assert key in connections.clients
+
+    shared.close()
+    assert key not in connections.clients
+    assert not shared.is_socket_open()
@@ -0,0 +1,83 @@
+import logging
+
+import pytest
+
+from sdm_modbus_modified import meter, profiles, registry, simulator
+
+SDM630 = registry.get("SDM630")
+
+PROFILE = """
+name = "Test-Frequency-Meter"
+model = "TFM"
+max_gap = 0
+
+[registers.frequency]
+address = "0x46"
+length = 2
+type = "input"
+dtype = "float32"
+unit = "Hz"
+
+[registers.l1_voltage]
+address = 0
+length = 2
+type = "input"
+dtype = "float32"
+unit = "V"
+"""
+
+
+@pytest.fixture
+def address(caplog):
+    caplog.set_level(logging.CRITICAL, logger="pymodbus")
+    sim = simulator.Simulator()
+    sim.add(SDM630, [1])
+
+    yield sim.start()
+
+    sim.stop()
+
+
+def test_dumped_model_loads_back_equivalent(address, tmp_path):
+    path = tmp_path / "sdm630.json"
+    profiles.dump(SDM630, str(path), name="SDM630-profile")
+    loaded = profiles.load(str(path), cache_directory=str(tmp_path / "cache"), register=False)
+    host, port = address
+    devices = [loaded(host=host, port=port, unit=1), SDM630(host=host, port=port, unit=1)]
+    first, second = (device.read_all(meter.registerType.HOLDING) for device in devices)
+
+    for device in devices:
+        device.disconnect()
+
+    assert loaded.registers == SDM630.registers
+    assert first == second
+
+
+def test_toml_profile_is_registered_and_cached(address, tmp_path, monkeypatch):
+    path = tmp_path / "frequency.toml"
+    path.write_text(PROFILE)
+    cache = tmp_path / "cache"
+    loaded = profiles.load(str(path), cache_directory=str(cache))
+    host, port = address
+
+    assert registry.get("test-frequency-meter") is loaded
+    assert len(list(cache.iterdir())) == 1
+
+    device = loaded(host=host, port=port, unit=1)
+    values = device.read_all(scaling=True)
+    device.disconnect()
+
+    assert set(values) == {"frequency", "l1_voltage"}
+    assert 45 < values["frequency"] < 65
+    assert 200 < values["l1_voltage"] < 260
+
+    monkeypatch.setattr(profiles, "compile_profile", None)
+    assert profiles.load(str(path), cache_directory=str(cache), register=False).registers == loaded.registers
+
+
+def test_invalid_register_names_the_file_and_key(tmp_path):
+    path = tmp_path / "broken.json"
+    path.write_text('{"name": "broken", "registers": {"frequency": [70, 2, "coil", "float32"]}}')
+
+    with pytest.raises(ValueError, match=r"broken\.json: register frequency"):
+        profiles.load(str(path), cache=False, register=False)
@@ -0,0 +1,59 @@
+import math
+
+from sdm_modbus_modified import meter, recorder, registry, regmap
+
+
+def _read_all(model, rtype=meter.registerType.INPUT):
+    values = {}
+
+    for block in regmap.for_model(model).plan(rtype):
+        values.update(block.decode([0x4366] * block.count, scaling=True))
+
+    return values
+
+
+def test_append_read_all_with_bytes_fields(tmp_path):
+    values = _read_all(registry.get("WS100-19"))
+
+    assert any(isinstance(value, bytes) for value in values.values())
+
+    with recorder.Recorder(tmp_path, "ws100", chunk_rows=2) as store:
+        for i in range(5):
+            store.append(values, 1000.0 + i)
+
+    numeric = {key: value for key, value in values.items() if not isinstance(value, bytes)}
+    reopened = recorder.Recorder(tmp_path, "ws100")
+    timestamps, columns = reopened.query()
+
+    assert list(timestamps) == [1000.0, 1001.0, 1002.0, 1003.0, 1004.0]
+    assert set(reopened.keys) == set(numeric)
+
+    for key, value in numeric.items():
+        assert all(math.isclose(recorded, value, rel_tol=1e-12) for recorded in columns[key])
+
+
+def test_query_range_and_missing_keys():
+    store = recorder.Recorder(chunk_rows=3)
+
+    for i in range(7):
+        store.append({"voltage": 230.0 + i} if i < 4 else {"voltage": 230.0 + i, "current": float(i)}, float(i))
+
+    timestamps, columns = store.query(2.0, 6.0)
+
+    assert list(timestamps) == [2.0, 3.0, 4.0, 5.0]
+    assert list(columns["voltage"]) == [232.0, 233.0, 234.0, 235.0]
+    assert [math.isnan(value) for value in columns["current"]] == [True, True, False, False]
+
+
+def test_recorders_sharing_a_directory_load_only_their_chunks(tmp_path):
+    for name, base in (("bus-1", 0.0), ("bus-1-2", 100.0)):
+        with recorder.Recorder(tmp_path, name, chunk_rows=2) as store:
+            for i in range(3):
+                store.append({"voltage": base + i}, base + i)
+
+    (tmp_path / "bus-1-notes.col").write_bytes(b"")
+    reopened = recorder.Recorder(tmp_path, "bus-1")
+    timestamps, _ = reopened.query()
+
+    assert list(timestamps) == [0.0, 1.0, 2.0]
+    assert reopened.sequence == 2
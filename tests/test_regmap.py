@@ -0,0 +1,128 @@
+import logging
+import math
+import random
+
+import pytest
+
+from sdm_modbus_modified import meter, registry, regmap, simulator
+
+MODELS = [registry.get(name) for name in registry.MODELS]
+
+
+def _same(a, b):
+    return a == b or (isinstance(a, float) and isinstance(b, float) and math.isnan(a) and math.isnan(b))
+
+
+@pytest.mark.parametrize("rtype", list(meter.registerType), ids=lambda rtype: rtype.name)
+@pytest.mark.parametrize("model", MODELS, ids=lambda model: model.__name__)
+def test_block_decode_matches_value_decoder(model, rtype):
+    rng = random.Random(0)
+
+    for block in regmap.for_model(model).plan(rtype):
+        data = [rng.randrange(0x10000) for _ in range(block.count)]
+        values = block.decode(data)
+        scaled = block.decode(data, scaling=True)
+
+        for field, offset in block.entries:
+            if field.format is None:
+                assert field.key in block.skipped
+                assert field.key not in values
+                continue
+
+            decoder = regmap.value_decoder(field.dtype, field.length, field.vtype, model.byteorder, model.wordorder)
+            expected = decoder(data[offset:offset + field.length])
+
+            assert _same(values[field.key], expected), field.key
+
+            if field.factor not in (None, 1):
+                assert _same(scaled[field.key], expected * field.factor), field.key
+
+
+def test_unsupported_field_is_skipped_alone():
+    model = registry.get("SDM72V2")
+    values = {}
+
+    for block in regmap.for_model(model).plan(meter.registerType.HOLDING):
+        values.update(block.decode([0] * block.count))
+
+    assert "reset_history" not in values
+    assert "system_type" in values
+
+
+def test_nan_in_an_int_field_stays_nan():
+    model = registry.get("SDM630")
+    fields = regmap.for_model(model).fields
+    nan = regmap.value_encoder(fields["system_type"].dtype, 2, model.byteorder, model.wordorder)(math.nan)
+    three = regmap.value_encoder(fields["baud"].dtype, 2, model.byteorder, model.wordorder)(3)
+    block = next(b for b in regmap.for_model(model).plan(meter.registerType.HOLDING)
+                 if any(f.key == "system_type" for f, _ in b.entries))
+    offsets = {f.key: offset for f, offset in block.entries}
+    data = [0] * block.count
+    data[offsets["system_type"]:offsets["system_type"] + 2] = nan
+    data[offsets["baud"]:offsets["baud"] + 2] = three
+
+    values = block.decode(data)
+    decoder = regmap.value_decoder(fields["system_type"].dtype, 2, int, model.byteorder, model.wordorder)
+
+    assert math.isnan(values["system_type"])
+    assert math.isnan(decoder(nan))
+    assert values["baud"] == 3 and type(values["baud"]) is int
+
+
+def _sample(field):
+    if field.dtype == meter.registerDataType.BYTES:
+        return b"AB".ljust(field.length * 2, b"\0")
+    elif field.vtype is float:
+        return 1.5
+    else:
+        return 3
+
+
+@pytest.mark.parametrize("model", MODELS, ids=lambda model: model.__name__)
+def test_every_writable_field_encodes(model):
+    for field in regmap.for_model(model).fields.values():
+        if field.rtype != meter.registerType.HOLDING:
+            continue
+
+        value = _sample(field)
+        words = regmap.value_encoder(field.dtype, field.length, model.byteorder, model.wordorder)(value)
+        decoder = regmap.value_decoder(field.dtype, len(words), field.vtype, model.byteorder, model.wordorder)
+
+        assert all(0 <= word <= 0xFFFF for word in words), field.key
+        assert decoder(words) == value, field.key
+
+
+def test_type_narrower_than_field_encodes_at_natural_width():
+    encoder = regmap.value_encoder(meter.registerDataType.INT16, 2)
+
+    assert encoder(3) == [3]
+    assert encoder(-1) == [0xFFFF]
+
+
+def test_instances_share_one_compiled_map(caplog):
+    caplog.set_level(logging.CRITICAL, logger="pymodbus")
+    model = registry.get("SDM630")
+    sim = simulator.Simulator()
+    sim.add(model, [1, 2])
+    host, port = sim.start()
+
+    try:
+        first = model(host=host, port=port, unit=1)
+        second = model(host=host, port=port, unit=2)
+        custom = model(host=host, port=port, unit=2)
+        custom.registers = {key: model.registers[key] for key in ("frequency", "l1_voltage", "demand_period")}
+
+        assert first.register_map is second.register_map is regmap.for_model(model)
+        assert custom.register_map is not first.register_map
+
+        holding = first.read_all(meter.registerType.HOLDING)
+        assert holding == second.read_all(meter.registerType.HOLDING)
+        assert all(first.read(key) == value for key, value in holding.items())
+
+        assert set(custom.read_all()) == {"frequency", "l1_voltage"}
+        assert 45 < custom.read("frequency") < 65
+    finally:
+        first.disconnect()
+        second.disconnect()
+        custom.disconnect()
+        sim.stop()
@@ -0,0 +1,45 @@
+import logging
+
+import pytest
+
+from sdm_modbus_modified import meter, registry, scanner, simulator
+
+
+@pytest.fixture
+def sim(caplog):
+    caplog.set_level(logging.CRITICAL, logger="pymodbus")
+    sim = simulator.Simulator()
+    sim.add(registry.get("SDM630"), [3, 17])
+    sim.add(registry.get("SDM120"), [12])
+
+    yield sim
+
+    sim.stop()
+
+
+def test_scan_finds_answering_units(sim):
+    host, port = sim.start()
+    scan = scanner.scan(host=host, port=port, units=range(1, 21), timeout=0.05, reprobes=0)
+
+    assert scan.found == [3, 12, 17]
+    assert scan.exceptions == {}
+    assert sorted(scan.timeouts) == sorted(set(range(1, 21)) - {3, 12, 17})
+    assert scan.error is None
+
+
+def test_units_answering_with_an_exception_are_found(sim):
+    host, port = sim.start()
+    scan = scanner.scan(host=host, port=port, units=[3, 4, 12], probe=(meter.registerType.HOLDING, 0x7000, 2),
+                        timeout=0.05, reprobes=0)
+
+    assert scan.found == [3, 12]
+    assert scan.exceptions == {3: simulator.ILLEGAL_ADDRESS, 12: simulator.ILLEGAL_ADDRESS}
+
+
+def test_slow_units_are_found_by_a_reprobe(sim):
+    sim.latency = 0.05
+    host, port = sim.start()
+    scan = scanner.scan(host=host, port=port, units=[3, 12], timeout=0.01, reprobes=2, backoff=10)
+
+    assert scan.found == [3, 12]
+    assert scan.rounds == 2
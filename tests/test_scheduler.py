@@ -0,0 +1,62 @@
+import logging
+
+import pytest
+
+from sdm_modbus_modified import meter, registry, regmap, scheduler, simulator
+
+MODEL = registry.get("SDM630")
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def device(caplog):
+    caplog.set_level(logging.CRITICAL, logger="pymodbus")
+    sim = simulator.Simulator()
+    sim.add(MODEL, [1])
+    host, port = sim.start()
+    device = MODEL(host=host, port=port, unit=1)
+
+    yield device
+
+    device.disconnect()
+    sim.stop()
+
+
+def test_registers_are_read_at_their_own_intervals(device):
+    clock = Clock()
+    polls = scheduler.Scheduler(device, scaling=True, clock=clock, sleep=clock.sleep)
+    polls.every(1, "frequency", "l1_voltage").every(5, meter.registerType.HOLDING)
+    holding = {f.key for f in regmap.for_model(MODEL).rtypes[meter.registerType.HOLDING] if f.format is not None}
+    seen = []
+    polls.on_read(lambda timestamp, results: seen.append(timestamp))
+
+    ticks = list(polls.run(ticks=7))
+
+    assert [timestamp for timestamp, _ in ticks] == [0, 1, 2, 3, 4, 5, 6]
+    assert seen == [0, 1, 2, 3, 4, 5, 6]
+
+    for timestamp, results in ticks:
+        expected = {"frequency", "l1_voltage"} | (holding if timestamp % 5 == 0 else set())
+        assert set(results) == expected, timestamp
+        assert 45 < results["frequency"] < 65
+
+
+def test_missed_ticks_are_skipped(device):
+    clock = Clock()
+    polls = scheduler.Scheduler(device, clock=clock).every(1, "frequency")
+
+    assert polls.tick()
+    clock.now = 3.5
+    assert polls.tick()
+    assert polls.next_due() == 4
+    assert polls.tick() == {}
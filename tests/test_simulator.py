@@ -0,0 +1,53 @@
+import logging
+
+import pytest
+
+from sdm_modbus_modified import detect, meter, regmap, simulator
+
+RANGES = {
+    "Hz": (45.0, 65.0),
+    "V": (200.0, 420.0),
+    "A": (0.5, 25.0),
+}
+
+
+@pytest.fixture(scope="module")
+def address():
+    # caplog is function scoped, so restore the level by hand.
+    logger = logging.getLogger("pymodbus")
+    level = logger.level
+    logger.setLevel(logging.CRITICAL)
+
+    sim = simulator.Simulator()
+
+    for unit, model in enumerate(detect.MODELS, 1):
+        sim.add(model, [unit])
+
+    yield sim.start()
+
+    sim.stop()
+    logger.setLevel(level)
+
+
+@pytest.mark.parametrize("unit, model", list(enumerate(detect.MODELS, 1)), ids=[m.__name__ for m in detect.MODELS])
+def test_every_model_serves_plausible_measurements(address, unit, model):
+    host, port = address
+    device = model(host=host, port=port, unit=unit)
+    fields = regmap.for_model(model).fields
+    rtype = meter.registerType.INPUT if device.plan(meter.registerType.INPUT) else meter.registerType.HOLDING
+
+    try:
+        values = device.read_all(rtype, scaling=True)
+        detected = detect.Detector().detect(device)
+    finally:
+        device.disconnect()
+
+    measured = {k: v for k, v in values.items() if isinstance(fields[k].unit, str) and fields[k].unit in RANGES}
+
+    assert {fields[k].unit for k in measured} >= {"V", "A"}
+
+    for key, value in measured.items():
+        low, high = RANGES[fields[key].unit]
+        assert low <= value <= high, key
+
+    assert detected.model is model
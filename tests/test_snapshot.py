@@ -0,0 +1,55 @@
+import asyncio
+import logging
+
+import pytest
+
+from sdm_modbus_modified import bus, detect, poller, registry, simulator, snapshot
+
+MODEL = registry.get("SDM630")
+
+
+def _take_both(connection, add):
+    with bus.Bus({1: MODEL, 2: MODEL}, timeout=0.5, **connection) as one:
+        taken = snapshot.take(one)
+        key = detect.bus_key(one.root)
+
+    async def take_async():
+        fleet = poller.Poller()
+        add(fleet)
+
+        async with fleet:
+            return await snapshot.take_async(fleet)
+
+    return key, taken, asyncio.run(take_async())
+
+
+def _check(key, taken, taken_async):
+    assert {(entry.bus, entry.unit) for entry in taken} == {(key, 1), (key, 2)}
+    assert {(entry.bus, entry.unit) for entry in taken_async} == {(key, 1), (key, 2)}
+    assert all(entry.error is None for entry in list(taken) + list(taken_async))
+
+
+@pytest.fixture
+def sim(caplog):
+    caplog.set_level(logging.CRITICAL, logger="pymodbus")
+    sim = simulator.Simulator()
+    sim.add(MODEL, [1, 2])
+
+    yield sim
+
+    sim.stop()
+
+
+def test_take_and_take_async_use_the_same_gateway_key(sim):
+    host, port = sim.start()
+
+    _check(*_take_both({"host": host, "port": port},
+                       lambda fleet: fleet.add_gateway(host, {1: MODEL, 2: MODEL}, port=port, timeout=0.5)))
+
+
+def test_take_and_take_async_use_the_same_serial_key(sim):
+    pytest.importorskip("serial")
+    device = sim.start(rtu=True)
+
+    _check(*_take_both({"device": device},
+                       lambda fleet: fleet.add_bus(device, {1: MODEL, 2: MODEL}, timeout=0.5)))
@@ -0,0 +1,87 @@
+import asyncio
+import logging
+
+import pytest
+from pymodbus.client import ModbusTcpClient
+
+from sdm_modbus_modified import aio, registry, simulator, stream
+
+MODEL = registry.get("SDM630")
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def sim(caplog):
+    caplog.set_level(logging.CRITICAL, logger="pymodbus")
+    sim = simulator.Simulator()
+    sim.add(MODEL, [1, 2])
+
+    yield sim
+
+    sim.stop()
+
+
+def test_slow_consumer_skips_ticks(sim):
+    host, port = sim.start()
+    device = MODEL(host=host, port=port, unit=1)
+    clock = Clock()
+    samples = stream.stream(device, ["frequency"], interval=1.0, samples=4, clock=clock, sleep=clock.sleep)
+    received = []
+
+    for sample in samples:
+        received.append(sample)
+
+        if sample.sequence == 1:
+            clock.now += 2.5
+
+    device.disconnect()
+
+    assert [s.sequence for s in received] == [0, 1, 2, 3]
+    assert [s.missed for s in received] == [0, 0, 1, 0]
+    assert clock.now == 4.0
+    assert all(set(s.values) == {"frequency"} and s.error is None for s in received)
+    assert {(s.unit, s.model) for s in received} == {(1, MODEL.model)}
+
+
+def test_fleet_stream_reports_failed_units(sim):
+    host, port = sim.start()
+    root = MODEL(host=host, port=port, unit=1, retries=1, client=ModbusTcpClient(host, port=port, timeout=0.05, retries=0))
+    devices = [root, MODEL(parent=root, unit=2), MODEL(parent=root, unit=9)]
+    clock = Clock()
+
+    received = list(stream.stream_fleet(devices, ["l1_voltage"], samples=2, clock=clock, sleep=clock.sleep))
+    root.disconnect()
+
+    assert [(s.sequence, s.unit) for s in received] == [(0, 1), (0, 2), (0, 9), (1, 1), (1, 2), (1, 9)]
+
+    for sample in received:
+        if sample.unit == 9:
+            assert sample.values is None and sample.error is not None
+        else:
+            assert 200 < sample.values["l1_voltage"] < 260
+
+
+def test_async_stream(sim):
+    async def main():
+        host, port = await sim.serve_tcp(port=0)
+
+        try:
+            async with aio.AsyncSDM630(host=host, port=port, unit=2) as device:
+                return [sample async for sample in device.stream(["frequency"], interval=0.01, samples=3)]
+        finally:
+            await sim.close()
+
+    received = asyncio.run(main())
+
+    assert [s.sequence for s in received] == [0, 1, 2]
+    assert all(45 < s.values["frequency"] < 65 for s in received)
@@ -0,0 +1,32 @@
+import math
+import random
+
+import pytest
+
+from sdm_modbus_modified import meter, registry, regmap, vector
+
+numpy = pytest.importorskip("numpy")
+
+MODELS = [registry.get(name) for name in registry.MODELS]
+
+
+@pytest.mark.parametrize("scaling, normalise", [(False, False), (True, False), (True, True)])
+@pytest.mark.parametrize("model", MODELS, ids=lambda model: model.__name__)
+def test_decode_matches_block_decode(model, scaling, normalise):
+    rng = random.Random(0)
+
+    for rtype in meter.registerType:
+        for block in regmap.for_model(model).plan(rtype):
+            rows = [[rng.randrange(0x10000) for _ in range(block.count)] for _ in range(8)]
+            records = vector.decode(block, rows, scaling, normalise)
+
+            for record, data in zip(records, rows):
+                values = block.decode(data, scaling, normalise)
+
+                for key, value in values.items():
+                    if isinstance(value, bytes):
+                        assert record[key] == value.rstrip(b"\0"), key
+                    elif math.isnan(value):
+                        assert math.isnan(record[key]), key
+                    else:
+                        assert record[key] == value, key
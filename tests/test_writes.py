@@ -0,0 +1,35 @@
+import logging
+
+import pytest
+
+from sdm_modbus_modified import registry, simulator
+
+
+@pytest.fixture
+def sdm72v2(caplog):
+    caplog.set_level(logging.CRITICAL, logger="pymodbus")
+    sim = simulator.Simulator()
+    sim.add(registry.get("SDM72V2"), [1])
+    host, port = sim.start()
+    device = registry.get("SDM72V2")(host=host, port=port, unit=1)
+
+    yield device, sim
+
+    device.disconnect()
+    sim.stop()
+
+
+def test_write_int16_field_declared_two_registers_wide(sdm72v2):
+    device, sim = sdm72v2
+    field = device.register_map["reset_history"]
+
+    response = device.write("reset_history", 3)
+
+    assert not response.isError()
+    assert sim.meters[1].images[field.rtype][field.address] == 3
+
+
+def test_write_many_verifies_natural_width(sdm72v2):
+    device, _ = sdm72v2
+
+    assert device.write_many({"reset_history": 3, "system_type": 1}) == {"reset_history": True, "system_type": True}
@@ -0,0 +1,75 @@
+import asyncio
+import logging
+
+import pytest
+
+from sdm_modbus_modified import aio, registry, simulator, ws100
+
+MODEL = registry.get("WS100-19")
+
+
+@pytest.fixture(autouse=True)
+def quiet(caplog):
+    caplog.set_level(logging.CRITICAL, logger="pymodbus")
+
+
+def test_read_all_scaled_reads_one_request_per_block():
+    sim = simulator.Simulator()
+    sim.add(MODEL, [1])
+    host, port = sim.start()
+
+    try:
+        device = MODEL(host=host, port=port, unit=1)
+        blocks = list(ws100.planned_blocks(device))
+        requests = sim.requests
+        values = device.read_all_scaled()
+        requests = sim.requests - requests
+
+        assert requests == len(blocks)
+        assert set(values) == {key for block in blocks for key in block.keys}
+        assert 200 < values["voltage"] < 260
+        assert values["frequency"] == pytest.approx(device.read_scaled("frequency"), abs=0.1)
+        assert values["time_zone_table"] == device.read_scaled("time_zone_table")
+
+        device.disconnect()
+    finally:
+        sim.stop()
+
+
+def test_unreadable_blocks_are_logged_and_skipped(caplog):
+    caplog.set_level(logging.WARNING, logger=ws100.__name__)
+    sim = simulator.Simulator(strict=True)
+    sim.add(MODEL, [1])
+    host, port = sim.start()
+
+    try:
+        device = MODEL(host=host, port=port, unit=1, retries=1)
+        gapped = [block for block in ws100.planned_blocks(device) if block.used < block.count]
+        values = device.read_all_scaled()
+        device.disconnect()
+    finally:
+        sim.stop()
+
+    skipped = {key for block in gapped for key in block.keys}
+
+    assert gapped and values
+    assert not skipped & set(values)
+    assert {r.getMessage().rsplit(": ", 1)[1] for r in caplog.records if r.name == ws100.__name__} == skipped
+
+
+def test_async_read_all_scaled_matches_sync_keys():
+    async def main():
+        sim = simulator.Simulator()
+        sim.add(MODEL, [1])
+        host, port = await sim.serve_tcp(port=0)
+
+        try:
+            async with aio.AsyncWS100_19XX(host=host, port=port, unit=1) as device:
+                return await device.read_all_scaled(), list(ws100.planned_blocks(device))
+        finally:
+            await sim.close()
+
+    values, blocks = asyncio.run(main())
+
+    assert set(values) == {key for block in blocks for key in block.keys}
+    assert 45 < values["frequency"] < 65